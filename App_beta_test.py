@@ -1,12 +1,42 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import time
 import json
-from neo4j import GraphDatabase
-from openai import OpenAI
+import copy
+import html
+import logging
+import math
+import re
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from string import Template
 
-GRAPH_TAG = "kg-gold-v1" # les exercises "gold standard" vont être tagué par kg-gold-v1, et les autres noeuds en "kg-label-v1"
-NEO4J_DB = "neo4j"
+from coach.reference import GRAPH_TAG, NEO4J_DB, INJURY_KEYS, INJURY_MAP, EQUIPMENT_KEYS
+from coach.graph import (
+    SAFE_EXERCISES_QUERY,
+    SAFE_EXERCISES_MATERIALIZED_QUERY,
+    is_materialized,
+    safe_query_params,
+)
+from coach.feedback_sync import FeedbackQueue
+from coach.llm import (
+    OutcomeCounter, PrimedStream, TokenLedger, encode_exercises_for_prompt, hedged_call,
+    hydrate_exercise, hydrate_plan, usage_counts,
+)
+from coach.llm_router import ModelRouter, NoFallback, call_with_fallback
+from coach.local_planner import build_local_plan
+from coach.plan import ExerciseItem, parse_plan
+from coach.local_nlp import FastPathStats, extract_profile_locally
+from coach.plan_cache import PlanCache, plan_cache_key
+from coach.streaming import StreamingPlanParser, repair_plan_json
+from coach.tracing import Tracer, serve_metrics
+from coach.user_store import Neo4jUserBackend, SQLiteUserBackend, UserStore
+from coach.weekly_program import (
+    adjust_plan, build_program, current_week, is_current, profile_fingerprint, program_plans,
+)
+
+logger = logging.getLogger("coach")
 
 # ========================= 1. CONFIGURATION & DESIGN =========================
 
@@ -38,6 +68,15 @@ st.markdown("""
             text-transform: uppercase;
         }
 
+        /* Apparition des lettres de l'effet machine à écrire (animé côté navigateur) */
+        .intro-typing .tw-char {
+            opacity: 0;
+            animation: intro-typing-char 0s linear forwards;
+        }
+        @keyframes intro-typing-char {
+            to { opacity: 1; }
+        }
+
         /* Boutons : look un peu plus sportif */
         .stButton>button {
             border-radius: 8px;
@@ -58,90 +97,147 @@ with st.sidebar:
     st.markdown("---")
     st.caption("v3.0 • Powered by Neo4j & OpenAI")
 
-if "page" not in st.session_state:
-    st.session_state.page = "onboarding"
-if "user_profile" not in st.session_state:
-    st.session_state.user_profile = {}
-if "last_feedback" not in st.session_state:
-    st.session_state.last_feedback = None
-if "workout_plan" not in st.session_state:
-    st.session_state.workout_plan = None
-if "session_time" not in st.session_state:
-    st.session_state.session_time = 30
-if "sessions_done" not in st.session_state:
-    st.session_state.sessions_done = 0
-
-# --- Onboarding multi-étapes ---
-if "onboarding_step" not in st.session_state:
-    st.session_state.onboarding_step = "intro"  # intro -> goals -> equipment -> schedule_pain -> loading -> summary
-
-if "intro_typed" not in st.session_state:
-    st.session_state.intro_typed = False
-if "typed_goals" not in st.session_state:
-    st.session_state.typed_goals = False
-if "typed_equipment" not in st.session_state:
-    st.session_state.typed_equipment = False
-if "typed_schedule_pain" not in st.session_state:
-    st.session_state.typed_schedule_pain = False
-
-# Stockage temporaire des réponses onboarding
-if "onb_goals" not in st.session_state:
-    st.session_state.onb_goals = ""
-if "onb_equipment" not in st.session_state:
-    st.session_state.onb_equipment = ""
-if "onb_sessions_per_week" not in st.session_state:
-    st.session_state.onb_sessions_per_week = 3
-if "onb_pain" not in st.session_state:
-    st.session_state.onb_pain = ""
-
-# Pour la confirmation du profil
-if "summary_needs_correction" not in st.session_state:
-    st.session_state.summary_needs_correction = False
-if "summary_correction_note" not in st.session_state:
-    st.session_state.summary_correction_note = ""
-
-# --- CHARGEMENT DES SECRETS ---
-try:
-    NEO4J_URI = st.secrets["NEO4J_URI"]
-    NEO4J_USER = st.secrets["NEO4J_USER"]
-    NEO4J_PASSWORD = st.secrets["NEO4J_PASSWORD"]
-    OPENAI_API_KEY = st.secrets["OPENAI_API_KEY"]
-    OPENAI_BASE_URL = "https://openrouter.ai/api/v1"
-except Exception as e:
-    st.error(f"❌ Erreur de configuration des secrets : {e}")
-    st.stop()
+# --- ÉTAT DE SESSION (initialisé une seule fois par session) ---
+SESSION_DEFAULTS = {
+    "page": "onboarding",
+    "user_profile": {},
+    "last_feedback": None,
+    "workout_plan": None,
+    "session_time": 30,
+    "sessions_done": 0,
+    "weekly_program": None,
+    # Onboarding multi-étapes
+    "onboarding_step": "intro",  # intro -> goals -> equipment -> schedule_pain -> loading -> summary
+    "intro_typed": False,
+    "typed_goals": False,
+    "typed_equipment": False,
+    "typed_schedule_pain": False,
+    # Stockage temporaire des réponses onboarding
+    "onb_goals": "",
+    "onb_equipment": "",
+    "onb_sessions_per_week": 3,
+    "onb_pain": "",
+    # Pour la confirmation du profil
+    "summary_needs_correction": False,
+    "summary_correction_note": "",
+}
 
-# ========================= 2. DONNÉES DE RÉFÉRENCE =========================
+def init_session_state():
+    if st.session_state.get("_session_initialized"):
+        return
+    for key, value in SESSION_DEFAULTS.items():
+        if key not in st.session_state:
+            st.session_state[key] = copy.deepcopy(value)
+    st.session_state._session_initialized = True
+
+init_session_state()
+
+# --- CHARGEMENT DE LA CONFIGURATION ---
+# Les identifiants Neo4j / OpenAI ne sont lus qu'au premier besoin (cf. require_secret),
+# l'onboarding peut donc s'afficher avant tout accès aux backends.
+OPENAI_BASE_URL = "https://openrouter.ai/api/v1"
+
+def get_setting(name: str, default=None):
+    """Réglage optionnel de secrets.toml (valeur par défaut si absent)."""
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        return default
 
-INJURY_KEYS = [
-    "Mal de dos (Lombaires)",
-    "Genoux",
-    "Épaules",
-    "Hanches",
-    "Cou / Cervicales",
-    "Chevilles / Pieds",
-    "Poignets / Avant-bras",
-    "Hernie discale / Rachis",
-    "Aucune",
-]
-
-INJURY_MAP = {
-    "Mal de dos (Lombaires)": ["spine", "lumbar", "vertebrae", "erector", "lower back", "bas du dos"],
-    "Genoux": ["knee", "patella", "meniscus", "genou"],
-    "Épaules": ["rotator", "shoulder", "deltoid", "épaule"],
-    "Hanches": ["hip", "gluteus", "pelvis", "piriformis", "hanche"],
-    "Cou / Cervicales": ["cervical", "neck", "trapezius", "cou"],
-    "Chevilles / Pieds": ["ankle", "foot", "feet", "cheville", "pied"],
-    "Poignets / Avant-bras": ["wrist", "forearm", "poignet", "avant-bras"],
-    "Hernie discale / Rachis": ["herniated", "hernie", "sciatica", "sciatique", "disc", "discale", "rachis", "colonne"],
-    "Aucune": [],
+def require_secret(name: str):
+    try:
+        return st.secrets[name]
+    except Exception as e:
+        st.error(f"❌ Erreur de configuration des secrets : {e}")
+        st.stop()
+
+# Snapshot mémoire du catalogue (désactivable -> requête Neo4j à chaque check-in)
+CATALOG_SNAPSHOT = bool(get_setting("CATALOG_SNAPSHOT", True))
+CATALOG_TTL_SEC = float(get_setting("CATALOG_TTL_SEC", 600))
+SAFE_CACHE_SIZE = int(get_setting("SAFE_CACHE_SIZE", 256))
+# Affichage progressif de la séance pendant la génération
+STREAM_SESSION = bool(get_setting("STREAM_SESSION", True))
+# Pré-génération de la 1re séance en tâche de fond dès la validation du profil
+SPECULATIVE_SESSION = bool(get_setting("SPECULATIVE_SESSION", True))
+# Programme de la semaine (sessions_per_week séances générées d'avance, ajustées au check-in) ;
+# remplace la pré-génération de la 1re séance
+WEEKLY_PROGRAM = bool(get_setting("WEEKLY_PROGRAM", True))
+# Programme en échec : pas de nouvel essai avant ce délai (même semaine, même profil)
+WEEKLY_PROGRAM_RETRY_SEC = float(get_setting("WEEKLY_PROGRAM_RETRY_SEC", 600))
+BACKGROUND_WORKERS = int(get_setting("BACKGROUND_WORKERS", 4))
+# Cache disque des séances générées (PLAN_CACHE_VARIANTS > 1 = variété)
+PLAN_CACHE = bool(get_setting("PLAN_CACHE", True))
+PLAN_CACHE_PATH = get_setting("PLAN_CACHE_PATH", ".cache/plans.sqlite3")
+PLAN_CACHE_TTL_SEC = float(get_setting("PLAN_CACHE_TTL_SEC", 7 * 24 * 3600))
+PLAN_CACHE_MAX_ENTRIES = int(get_setting("PLAN_CACHE_MAX_ENTRIES", 5000))
+PLAN_CACHE_VARIANTS = int(get_setting("PLAN_CACHE_VARIANTS", 1))
+# Confiance minimale de l'extraction locale du profil (au-delà de 1 = toujours le LLM)
+PROFILE_FASTPATH_MIN_CONFIDENCE = float(get_setting("PROFILE_FASTPATH_MIN_CONFIDENCE", 0.75))
+# Zones douloureuses lues dans le texte libre (message du check-in, douleurs de l'onboarding)
+# et ajoutées aux zones à éviter ; seuil de similarité (0 à 1) pour retenir une zone
+PAIN_TEXT_ZONES = bool(get_setting("PAIN_TEXT_ZONES", True))
+PAIN_TEXT_THRESHOLD = float(get_setting("PAIN_TEXT_THRESHOLD", 0.58))
+# Budget de tokens par appel et par tâche (dépassement = warning dans les logs)
+TOKEN_BUDGETS = {
+    "profile": {"prompt": 900, "completion": 150},
+    "session": {"prompt": 1800, "completion": 1500},
 }
+for task, budget in dict(get_setting("TOKEN_BUDGETS", {})).items():
+    TOKEN_BUDGETS.setdefault(task, {}).update(budget)
+# Modèles par tâche (le plus rapide des modèles sains est choisi), délai max par appel,
+# disjoncteur (modèle écarté après trop d'erreurs) et pool HTTP du client OpenAI
+LLM_MODELS = {"profile": ["openai/gpt-4o-mini"], "session": ["openai/gpt-4o-mini"]}
+LLM_MODELS.update(dict(get_setting("LLM_MODELS", {})))
+LLM_TIMEOUT_SEC = {"profile": 20.0, "session": 60.0}
+LLM_TIMEOUT_SEC.update(dict(get_setting("LLM_TIMEOUT_SEC", {})))
+LLM_MAX_RETRIES = int(get_setting("LLM_MAX_RETRIES", 1))
+LLM_BREAKER_ERROR_RATE = float(get_setting("LLM_BREAKER_ERROR_RATE", 0.5))
+LLM_BREAKER_OPEN_SEC = float(get_setting("LLM_BREAKER_OPEN_SEC", 30))
+OPENAI_MAX_CONNECTIONS = int(get_setting("OPENAI_MAX_CONNECTIONS", 50))
+OPENAI_MAX_KEEPALIVE = int(get_setting("OPENAI_MAX_KEEPALIVE", 20))
+OPENAI_KEEPALIVE_EXPIRY_SEC = float(get_setting("OPENAI_KEEPALIVE_EXPIRY_SEC", 90))
+# Planificateur local (coach/local_planner.py) : mode hors ligne (aucun appel LLM),
+# repli si le LLM échoue / dépasse son délai, brouillon affiché pendant la génération
+OFFLINE_MODE = bool(get_setting("OFFLINE_MODE", False))
+LOCAL_PLAN_FALLBACK = bool(get_setting("LOCAL_PLAN_FALLBACK", True))
+LOCAL_PLAN_DRAFT = bool(get_setting("LOCAL_PLAN_DRAFT", True))
+# Séance : seconde requête identique si pas de réponse (1er morceau en streaming)
+# après ce délai, ~ p95 observé de llm.session (0 = désactivé)
+LLM_HEDGE_AFTER_SEC = float(get_setting("LLM_HEDGE_AFTER_SEC", 0))
+# Temps par étape : journal JSON lines, endpoint Prometheus /metrics, panneau latéral
+TRACE_LOG_PATH = get_setting("TRACE_LOG_PATH")
+METRICS_PORT = get_setting("METRICS_PORT")
+TRACE_PANEL = bool(get_setting("TRACE_PANEL", False))
+# Pool Neo4j (taille, durée de vie des connexions) et lectures avec nouvelles tentatives
+NEO4J_MAX_POOL_SIZE = int(get_setting("NEO4J_MAX_POOL_SIZE", 20))
+NEO4J_MAX_CONNECTION_LIFETIME_SEC = float(get_setting("NEO4J_MAX_CONNECTION_LIFETIME_SEC", 1800))
+NEO4J_ACQUISITION_TIMEOUT_SEC = float(get_setting("NEO4J_ACQUISITION_TIMEOUT_SEC", 10))
+NEO4J_READ_RETRIES = int(get_setting("NEO4J_READ_RETRIES", 2))
+# Préchauffage en tâche de fond après le premier affichage (connexions + snapshot)
+NEO4J_WARM_UP = bool(get_setting("NEO4J_WARM_UP", True))
+NEO4J_WARM_CONNECTIONS = int(get_setting("NEO4J_WARM_CONNECTIONS", 2))
+# Profils persistants : "sqlite" (local), "neo4j" ou "off"
+USER_STORE = str(get_setting("USER_STORE", "sqlite")).lower()
+USER_STORE_PATH = get_setting("USER_STORE_PATH", ".cache/users.sqlite3")
+USER_STORE_FLUSH_SEC = float(get_setting("USER_STORE_FLUSH_SEC", 2))
+# Historique des séances dans le graphe (journal local vidé par lots en tâche de fond)
+FEEDBACK_SYNC = bool(get_setting("FEEDBACK_SYNC", True))
+FEEDBACK_JOURNAL_PATH = get_setting("FEEDBACK_JOURNAL_PATH", ".cache/feedback_journal.sqlite3")
+FEEDBACK_FLUSH_SEC = float(get_setting("FEEDBACK_FLUSH_SEC", 5))
+# Images des exercices : vignettes en cache disque (MEDIA_PREWARM = tout le catalogue au démarrage)
+MEDIA_CACHE = bool(get_setting("MEDIA_CACHE", True))
+MEDIA_CACHE_PATH = get_setting("MEDIA_CACHE_PATH", ".cache/media")
+MEDIA_CACHE_MAX_MB = float(get_setting("MEDIA_CACHE_MAX_MB", 200))
+MEDIA_THUMB_WIDTH = int(get_setting("MEDIA_THUMB_WIDTH", 480))
+MEDIA_PREWARM = bool(get_setting("MEDIA_PREWARM", False))
+# Image injoignable : URL d'origine servie, pas de nouvel essai avant ce délai
+MEDIA_RETRY_SEC = float(get_setting("MEDIA_RETRY_SEC", 600))
 
-EQUIPMENT_KEYS = [
-    "Barbell", "Dumbbell", "Kettlebell", "Machine", "Cable",
-    "Bench", "Pull-up Bar", "Treadmill", "Rower", "Bands",
-    "Foam Roll", "Bodyweight"
-]
+# ========================= 2. DONNÉES DE RÉFÉRENCE =========================
+
+# À incrémenter à chaque modification du prompt de séance (invalide le cache des plans)
+SESSION_PROMPT_VERSION = "session-v2"
+# (INJURY_KEYS, INJURY_MAP, EQUIPMENT_KEYS : voir coach/reference.py)
 
 INTRO_TEXT = (
     "Bienvenue, je suis ton coach. Je t'aiderai à atteindre tes objectifs. "
@@ -157,26 +253,244 @@ EXPERIENCE_CHOICES = {
 }
 
 def typewriter(text: str, speed: float = 0.03):
-    """Affiche un texte lettre par lettre (effet machine à écrire) avec la classe intro-typing (Teko)."""
-    placeholder = st.empty()
-    out = ""
-    for ch in text:
-        out += ch
-        placeholder.markdown(
-            f'<p class="intro-typing">{out}</p>',
-            unsafe_allow_html=True
-        )
-        time.sleep(speed)
+    """
+    Affiche un texte lettre par lettre (effet machine à écrire) avec la classe intro-typing (Teko).
+    Un seul envoi au navigateur : chaque lettre apparaît via une animation CSS décalée.
+    """
+    spans = "".join(
+        ch if ch == " " else
+        f'<span class="tw-char" style="animation-delay:{i * speed * 1000:.0f}ms">{html.escape(ch)}</span>'
+        for i, ch in enumerate(text)
+    )
+    st.markdown(f'<p class="intro-typing">{spans}</p>', unsafe_allow_html=True)
 
 # ========================= 3. RESSOURCES PARTAGÉES (CACHE) =========================
 
+# Les backends lourds (openai, neo4j, numpy) sont importés au premier appel,
+# pas au démarrage : l'onboarding s'affiche sans les charger.
+
 @st.cache_resource
 def get_openai_client():
-    return OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+    """Client OpenAI du process : connexions HTTP gardées ouvertes et pool borné."""
+    from openai import DefaultHttpxClient, OpenAI, Timeout
+    from openai._constants import DEFAULT_CONNECTION_LIMITS
+
+    # Classes du transport HTTP sur lequel le SDK installé est construit (pas d'import direct d'httpx)
+    Limits = type(DEFAULT_CONNECTION_LIMITS)
+    http_client = DefaultHttpxClient(
+        limits=Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_SEC,
+        ),
+        # Délai par défaut ; chaque appel passe le sien (LLM_TIMEOUT_SEC)
+        timeout=Timeout(max(LLM_TIMEOUT_SEC.values()), connect=5.0),
+    )
+    return OpenAI(
+        api_key=require_secret("OPENAI_API_KEY"),
+        base_url=OPENAI_BASE_URL,
+        http_client=http_client,
+        max_retries=LLM_MAX_RETRIES,
+    )
+
+@st.cache_resource
+def get_model_router():
+    """Santé des modèles (latence, erreurs, disjoncteur), partagée par toutes les sessions."""
+    router = ModelRouter(
+        LLM_MODELS,
+        error_rate=LLM_BREAKER_ERROR_RATE,
+        open_sec=LLM_BREAKER_OPEN_SEC,
+    )
+    get_tracer().add_metric(
+        "coach_llm_open_circuits", "Modèles LLM écartés (disjoncteur ouvert ou en essai).",
+        router.open_circuits,
+    )
+    return router
+
+@st.cache_resource
+def get_neo4j_client():
+    """Driver Neo4j du process : pool dimensionné, connectivité vérifiée, connexions préchauffées."""
+    from coach.neo4j_client import Neo4jClient
+    client = Neo4jClient(
+        require_secret("NEO4J_URI"),
+        auth=(require_secret("NEO4J_USER"), require_secret("NEO4J_PASSWORD")),
+        database=NEO4J_DB,
+        max_pool_size=NEO4J_MAX_POOL_SIZE,
+        max_connection_lifetime_sec=NEO4J_MAX_CONNECTION_LIFETIME_SEC,
+        acquisition_timeout_sec=NEO4J_ACQUISITION_TIMEOUT_SEC,
+        retries=NEO4J_READ_RETRIES,
+    )
+    with trace("neo4j.warm_up", connections=NEO4J_WARM_CONNECTIONS) as span:
+        span.tag(ok=client.warm_up(NEO4J_WARM_CONNECTIONS))
+
+    tracer = get_tracer()
+    tracer.add_metric("coach_neo4j_pool_in_use", "Connexions Neo4j empruntées.", lambda: client.in_use)
+    tracer.add_metric(
+        "coach_neo4j_pool_utilisation", "Part du pool Neo4j empruntée (0-1).",
+        lambda: client.pool_stats()["utilisation"],
+    )
+    tracer.add_metric("coach_neo4j_retries_total", "Requêtes Neo4j retentées.", lambda: client.retries_total, "counter")
+    tracer.add_metric("coach_neo4j_failures_total", "Requêtes Neo4j en échec.", lambda: client.failures_total, "counter")
+    return client
+
+@st.cache_resource
+def get_catalog_store():
+    """Snapshot du catalogue partagé par toutes les sessions du process."""
+    from coach.catalog import CatalogStore, load_catalog_snapshot
+
+    def load():
+        with trace("neo4j.catalog") as span:
+            snapshot = load_catalog_snapshot(
+                get_neo4j_client().read, GRAPH_TAG, INJURY_MAP, EQUIPMENT_KEYS
+            )
+            span.tag(rows=len(snapshot.exercises))
+        return snapshot
+
+    return CatalogStore(load, ttl_sec=CATALOG_TTL_SEC)
+
+@st.cache_resource
+def get_background_executor():
+    """Pool de threads partagé pour les tâches de fond (pré-génération, etc.)."""
+    return ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="coach-bg")
+
+@st.cache_resource
+def get_token_ledger():
+    return TokenLedger(TOKEN_BUDGETS)
+
+@st.cache_resource
+def get_llm_executor():
+    """Threads des appels LLM doublés (séparés du pool de fond : pas d'attente imbriquée)."""
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="coach-llm")
+
+@st.cache_resource
+def get_llm_outcomes():
+    """Issues des générations : JSON valide / réparé / illisible, requête doublée ou non."""
+    outcomes = OutcomeCounter()
+    for family, outcome, help_text in (
+        ("json", "ok", "Séances au JSON valide."),
+        ("json", "repaired", "Séances au JSON réparé (tronqué ou mal formé)."),
+        ("json", "failed", "Séances au JSON irrécupérable."),
+        ("hedge", "single", "Générations sans requête doublée."),
+        ("hedge", "primary", "Requêtes doublées gagnées par la première."),
+        ("hedge", "hedge", "Requêtes doublées gagnées par la seconde."),
+    ):
+        get_tracer().add_metric(
+            f"coach_llm_{family}_{outcome}_total", help_text,
+            lambda family=family, outcome=outcome: outcomes.count(family, outcome), "counter",
+        )
+    return outcomes
+
+@st.cache_resource
+def get_tracer():
+    """Spans chronométrés du process (+ endpoint /metrics si METRICS_PORT est défini)."""
+    tracer = Tracer(TRACE_LOG_PATH)
+    if METRICS_PORT:
+        serve_metrics(tracer, int(METRICS_PORT))
+    return tracer
+
+def trace(name: str, **tags):
+    """`with trace("llm.session", model=...) as span:` (cf. coach/tracing.py)"""
+    return get_tracer().span(name, **tags)
+
+@st.cache_resource
+def get_plan_cache():
+    """Cache SQLite des séances, partagé par toutes les sessions du process."""
+    cache = PlanCache(
+        PLAN_CACHE_PATH,
+        ttl_sec=PLAN_CACHE_TTL_SEC,
+        max_entries=PLAN_CACHE_MAX_ENTRIES,
+        variants=PLAN_CACHE_VARIANTS,
+    )
+    tracer = get_tracer()
+    tracer.add_metric("coach_plan_cache_size", "Séances dans le cache.", lambda: cache.stats()["size"])
+    for field, help_text in (
+        ("hits", "Séances servies par le cache."),
+        ("misses", "Séances absentes du cache (ou expirées)."),
+        ("evictions", "Séances évincées du cache (taille maximale)."),
+    ):
+        tracer.add_metric(
+            f"coach_plan_cache_{field}_total", help_text,
+            lambda field=field: getattr(cache, field), "counter",
+        )
+    return cache
+
+@st.cache_resource
+def get_user_store():
+    """Profils persistants du process : lectures en cache, écritures différées par lots."""
+    if USER_STORE == "neo4j":
+        backend = Neo4jUserBackend(get_neo4j_client())
+    else:
+        backend = SQLiteUserBackend(USER_STORE_PATH)
+    return UserStore(backend, flush_interval_sec=USER_STORE_FLUSH_SEC)
+
+@st.cache_resource
+def get_feedback_queue():
+    """Journal des feedbacks, écrit dans Neo4j par lots (UNWIND) sur un thread de fond."""
+    return FeedbackQueue(
+        FEEDBACK_JOURNAL_PATH,
+        write=lambda query, params: get_neo4j_client().write(query, params),
+        graph_tag=GRAPH_TAG,
+        flush_interval_sec=FEEDBACK_FLUSH_SEC,
+    )
+
+@st.cache_resource
+def get_media_cache():
+    """Vignettes des exercices sur disque, partagées par toutes les sessions du process."""
+    from coach.media_cache import MediaCache
+    cache = MediaCache(
+        MEDIA_CACHE_PATH,
+        max_bytes=int(MEDIA_CACHE_MAX_MB * 1024 * 1024),
+        thumb_width=MEDIA_THUMB_WIDTH,
+        retry_sec=MEDIA_RETRY_SEC,
+    )
+    tracer = get_tracer()
+    tracer.add_metric("coach_media_cache_bytes", "Taille des vignettes sur disque.", lambda: cache.stats()["bytes"])
+    for field, help_text in (
+        ("hits", "Vignettes servies depuis le disque."),
+        ("misses", "Vignettes absentes (URL d'origine servie, téléchargement lancé)."),
+        ("errors", "Téléchargements d'images en échec."),
+        ("skipped", "Images en échec récent, non retentées."),
+        ("evicted", "Vignettes supprimées (taille maximale)."),
+    ):
+        tracer.add_metric(
+            f"coach_media_cache_{field}_total", help_text,
+            lambda field=field: getattr(cache, field), "counter",
+        )
+    return cache
+
+def exercise_image(image_url: str) -> str:
+    """Vignette locale si déjà en cache, sinon l'URL d'origine (téléchargée en tâche de fond)."""
+    if not MEDIA_CACHE:
+        return image_url
+    with trace("media.image") as span:
+        path = get_media_cache().peek(image_url, get_background_executor().submit)
+        span.tag(cached=path is not None)
+    return path or image_url
 
 @st.cache_resource
-def get_neo4j_driver():
-    return GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+def get_pain_mapper():
+    """Vectoriseur des zones douloureuses (TF-IDF n-grammes), construit une fois par process."""
+    from coach.pain_zones import PainZoneMapper
+    return PainZoneMapper(INJURY_MAP, threshold=PAIN_TEXT_THRESHOLD)
+
+@st.cache_resource
+def get_safe_exercise_cache():
+    """Cache LRU des exercices sûrs, partagé par toutes les sessions du process."""
+    from coach.catalog import SafeExerciseCache
+    cache = SafeExerciseCache(INJURY_MAP, maxsize=SAFE_CACHE_SIZE)
+    tracer = get_tracer()
+    tracer.add_metric("coach_safe_cache_size", "Profils en cache (exercices sûrs).", lambda: cache.stats()["size"])
+    for field, help_text in (
+        ("hits", "Exercices sûrs servis par le cache."),
+        ("misses", "Exercices sûrs recalculés (absents du cache)."),
+        ("evictions", "Entrées du cache des exercices sûrs évincées (LRU)."),
+        ("invalidations", "Entrées du cache des exercices sûrs invalidées (nouveau snapshot)."),
+    ):
+        tracer.add_metric(
+            f"coach_safe_cache_{field}_total", help_text,
+            lambda field=field: getattr(cache, field), "counter",
+        )
+    return cache
 
 # ========================= 4. MOTEUR INTELLIGENT (BACKEND) =========================
 
@@ -185,8 +499,6 @@ def extract_profile_from_text(bio_text: str):
     Transforme le langage naturel en données structurées pour le Graphe.
     Retourne un dict : {"equipment": [...], "injuries": [...], "goals": [...]}
     """
-    client = get_openai_client()
-
     system_msg = (
     "Tu es un Analyste de Données Sportives. "
     "Tu lis le texte d'un client et tu en extrais des informations structurées. "
@@ -228,16 +540,28 @@ RENVOIE UNIQUEMENT DU JSON AVEC :
 """
 
     try:
-        resp = client.chat.completions.create(
-            model="openai/gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_msg},
-            ],
-            temperature=0,
-            response_format={"type": "json_object"},
-        )
-        data = json.loads(resp.choices[0].message.content)
+        # Client créé dans le try : un échec passe par le repli habituel
+        client = get_openai_client()
+        started = time.perf_counter()
+
+        def attempt(model):
+            resp = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_msg},
+                    {"role": "user", "content": user_msg},
+                ],
+                temperature=0,
+                response_format={"type": "json_object"},
+                timeout=LLM_TIMEOUT_SEC["profile"],
+            )
+            # JSON illisible = échec du modèle (compté par le routeur, modèle suivant)
+            return resp, json.loads(resp.choices[0].message.content)
+
+        with trace("llm.profile") as span:
+            (resp, data), model = call_with_fallback(get_model_router(), "profile", attempt)
+            span.tag(model=model, **usage_counts(resp.usage))
+        get_token_ledger().record("profile", model, resp.usage, time.perf_counter() - started)
         # Sécurisation minimale
         equipment = data.get("equipment") or ["Bodyweight"]
         injuries = data.get("injuries") or ["Aucune"]
@@ -252,49 +576,108 @@ RENVOIE UNIQUEMENT DU JSON AVEC :
         return {"equipment": ["Bodyweight"], "injuries": ["Aucune"], "goals": ["Forme"]}
 
 
-def get_safe_exercises(profile: dict, context: dict):
+@st.cache_resource
+def get_profile_fastpath_stats():
+    return FastPathStats()
+
+def analyze_profile(goals: str, equipment: str, pain: str, bio_text: str):
     """
-    Interroge Neo4j pour trouver les exercices compatibles ET leurs vidéos + images.
-    Filtré par matériel + zones à éviter (blessures + douleurs du jour).
+    Extraction locale par règles (quasi instantanée) si elle est assez sûre d'elle,
+    sinon appel au LLM via extract_profile_from_text.
+    """
+    local = extract_profile_locally(goals, equipment, pain)
+    stats = get_profile_fastpath_stats()
+    use_local = OFFLINE_MODE or local["confidence"] >= PROFILE_FASTPATH_MIN_CONFIDENCE
+    stats.record(use_local)
+    logger.info(
+        "Profil : %s (confiance %.2f) • taux local %.0f %%",
+        "règles locales" if use_local else "LLM", local["confidence"], 100 * stats.hit_rate,
+    )
+    if use_local:
+        return {k: local[k] for k in ("equipment", "injuries", "goals")}
+    return extract_profile_from_text(bio_text)
+
+def add_text_pain_zones(zones: list, text: str) -> list:
+    """`zones` + zones de INJURY_MAP reconnues dans un texte libre (fautes et accents tolérés)."""
+    if not PAIN_TEXT_ZONES or not (text or "").strip():
+        return zones
+    from coach.pain_zones import merge_zones
+    with trace("nlp.pain_zones", words=len(text.split())) as span:
+        found = get_pain_mapper().zones_in(text)
+        span.tag(zones=len(found))
+    return merge_zones(zones, found)
+
+def get_safe_exercises(profile: dict, context: dict, ranked: bool = True):
+    """
+    Trouve les exercices compatibles ET leurs vidéos + images.
+    Filtré par matériel + zones à éviter (blessures + douleurs du jour),
+    puis classé selon les objectifs (et le focus de la séance) : top-K stable,
+    de taille adaptée au temps disponible (cf. coach/ranking.py).
+    `ranked=False` : tous les exercices sûrs, dans l'ordre du catalogue.
+    Utilise le snapshot mémoire du catalogue, sinon interroge Neo4j.
     """
-    driver = get_neo4j_driver()
-
-    banned_terms = []
     pain_points = (profile.get("injuries") or []) + (context.get("daily_pain") or [])
-    for injury in pain_points:
-        banned_terms.extend(INJURY_MAP.get(injury, []))
-
-    user_equip = [eq.lower() for eq in profile.get("equipment", [])] + ["none", "bodyweight"]
-
-    query = """
-    MATCH (e:Exercise)
-    WHERE e.graph_tag = $graph_tag
-      AND toLower(e.equipment) IN $equipment
-      AND ALL(sec IN coalesce(e.equipment_secondary, ['none'])
-              WHERE toLower(sec) IN $equipment OR toLower(sec) = 'none')
-      AND NOT EXISTS {
-          MATCH (e)-[:TARGETS]->(b:BodyPart)
-          WHERE any(term IN $banned_terms WHERE toLower(b.name) CONTAINS term)
-      }
-    RETURN DISTINCT
-      e.name       AS name,
-      e.name_fr    AS name_fr,
-      e.video      AS video,
-      e.image_url  AS image_url
-    LIMIT 40
+    equipment = profile.get("equipment", [])
+
+    rank = ranking = None
+    if ranked:
+        from coach.ranking import exercise_budget, goal_weights
+        weights = goal_weights(profile.get("goals"), context.get("focus"))
+        budget, quotas = exercise_budget(context.get("time"), profile.get("level"), context.get("energy"))
+        rank = (weights, budget, quotas)
+        # Objectifs formulés différemment mais mêmes poids : même entrée de cache
+        ranking = (tuple(round(float(w), 3) for w in weights), budget, tuple(quotas.values()))
+
+    with trace("safe_exercises", ranked=ranked) as span:
+        catalog = get_catalog_store().get() if CATALOG_SNAPSHOT else None
+        if catalog is not None:
+            version = catalog.version
+            if rank is not None:
+                compute = lambda: catalog.ranked_exercises(equipment, pain_points, *rank)
+            else:
+                compute = lambda: catalog.safe_exercises(equipment, pain_points, limit=None)
+        else:
+            # Pas de version côté Neo4j : on renouvelle le cache à chaque période de TTL
+            version = ("neo4j", int(time.time() // CATALOG_TTL_SEC))
+            compute = lambda: query_safe_exercises_neo4j(equipment, pain_points, rank)
+
+        safe_exos = get_safe_exercise_cache().get_or_compute(
+            GRAPH_TAG, version, equipment, pain_points, compute, ranking
+        )
+        span.tag(source="snapshot" if catalog is not None else "neo4j", rows=len(safe_exos))
+    return safe_exos
+
+@st.cache_data(ttl=CATALOG_TTL_SEC, show_spinner=False)
+def graph_is_materialized():
+    """Arêtes UNSAFE_FOR à jour ? (cf. `python -m coach.graph`)"""
+    try:
+        return is_materialized(get_neo4j_client().read)
+    except Exception:
+        return False
+
+def query_safe_exercises_neo4j(equipment: list, pain_points: list, rank=None):
+    """
+    Filtre Cypher (fallback si le snapshot est désactivé ou indisponible).
+    Anti-join sur les arêtes UNSAFE_FOR si la maintenance a été jouée,
+    sinon requête historique par CONTAINS.
+    `rank` = (poids, budget, quotas) : même top-K que le snapshot.
     """
+    materialized = graph_is_materialized()
+    query = SAFE_EXERCISES_MATERIALIZED_QUERY if materialized else SAFE_EXERCISES_QUERY
+    params = safe_query_params(equipment, pain_points, materialized)
 
     try:
-        with driver.session(database=NEO4J_DB) as session:
-            res = session.run(
-                query,
-                {
-                    "equipment": user_equip,
-                    "banned_terms": [t.lower() for t in banned_terms],
-                    "graph_tag": GRAPH_TAG,
-                },
-            )
-            return [
+        with trace("neo4j.safe_exercises", materialized=materialized) as span:
+            res = get_neo4j_client().read(query, params)
+            # Une ligne par exercice (DISTINCT porte aussi sur matériel / parties du corps)
+            distinct = {}
+            for r in res:
+                distinct.setdefault((r["name"], r["name_fr"], r["video"], r["image_url"]), r)
+            res = list(distinct.values())
+            if rank is not None:
+                from coach.ranking import rank_rows
+                res = rank_rows(res, *rank)
+            rows = [
                 {
                     "name": r["name"],          # anglais
                     "name_fr": r["name_fr"],    # français (peut être None)
@@ -303,11 +686,19 @@ def get_safe_exercises(profile: dict, context: dict):
                 }
                 for r in res
             ]
+            span.tag(rows=len(rows))
+            return rows
     except Exception as e:
         st.error(f"Erreur Neo4j : {e}")
         return []
 
-def generate_session_with_llm(profile: dict, context: dict, valid_exercises: list, last_feedback: dict | None):
+def generate_session_with_llm(
+    profile: dict,
+    context: dict,
+    valid_exercises: list,
+    last_feedback: dict | None,
+    on_event=None,
+):
     """
     Génére une séance structurée au format JSON :
     {
@@ -327,13 +718,23 @@ def generate_session_with_llm(profile: dict, context: dict, valid_exercises: lis
       - rest_sec (int ou null)
       - video (string ou null)
       - instruction (string)
+    Le modèle ne voit que des ids courts (cf. coach/llm.py) : name, name_fr,
+    video et image_url sont remis côté serveur à partir de `valid_exercises`.
+    Renvoie un `Plan` (coach/plan.py) : JSON lu et normalisé une seule fois ici.
+
+    Si `on_event` est fourni, la complétion est lue en streaming et
+    `on_event(kind, section, payload)` est appelé dès qu'une phrase de stratégie,
+    un exercice ou le mot de fin est complet (cf. coach/streaming.py).
     """
-    client = get_openai_client()
+    # Séance déjà générée pour des entrées équivalentes ? (message libre = pas de cache)
+    cache_key = None
+    if PLAN_CACHE and not (context.get("note") or "").strip():
+        cache_key = plan_cache_key(profile, context, valid_exercises, last_feedback, SESSION_PROMPT_VERSION)
+        cached = plan_cache_get(cache_key)
+        if cached is not None:
+            return parse_plan(cached)
 
-    safe_exos_min = [
-        {"name": ex["name"], "video": ex.get("video")}
-        for ex in valid_exercises
-    ]
+    safe_exos_min = encode_exercises_for_prompt(valid_exercises)
 
     feedback_json = last_feedback or {}
 
@@ -357,7 +758,8 @@ def generate_session_with_llm(profile: dict, context: dict, valid_exercises: lis
     "- au moins 1 exercice dans \"retour_calme\".\n"
     "Ne mets jamais tous les exercices ensemble dans une seule liste.\n\n"
     "Chaque exercice doit contenir exactement les clés : "
-    "name, sets, reps, duration_min, rest_sec, video, instruction.\n\n"
+    "id, sets, reps, duration_min, rest_sec, instruction.\n"
+    "'id' est l'identifiant numérique de l'exercice dans la liste fournie.\n\n"
     "Exemples d'exercices typiquement utilisés en échauffement : "
     "Bodyweight Squat, Band Pull Apart, Arm Circles, Ankle Circles, etc. "
     "Exemples d'exercices typiquement utilisés en retour au calme : étirements, mouvements de mobilité douce.\n\n"
@@ -366,6 +768,9 @@ def generate_session_with_llm(profile: dict, context: dict, valid_exercises: lis
     "(mentionne le mot 'musculation' dans 'strategie').\n"
 )
 
+    # Séance d'un programme de la semaine : son focus équilibre la semaine
+    focus_line = f"- Focus de la séance dans la semaine : {context['focus']}\n" if context.get("focus") else ""
+
     user_msg = (
         "INFOS CLIENT :\n"
         f"- Âge : {profile.get('age')}\n"
@@ -377,10 +782,11 @@ def generate_session_with_llm(profile: dict, context: dict, valid_exercises: lis
         f"- Énergie du jour (1-10) : {context.get('energy')}\n"
         f"- Temps disponible (minutes) : {context.get('time')}\n"
         f"- Douleurs du jour : {', '.join(context.get('daily_pain', []))}\n"
+        f"{focus_line}"
         f"- Message libre de la personne : \"{context.get('note', '')}\"\n\n"
         "DERNIER FEEDBACK DE SÉANCE (JSON) :\n"
         f"{json.dumps(feedback_json, ensure_ascii=False)}\n\n"
-        "EXERCICES SÉCURISÉS DISPONIBLES (tu ne dois utiliser que des exercices issus de cette liste) :\n"
+        "EXERCICES SÉCURISÉS DISPONIBLES (id + nom ; tu ne dois utiliser que des exercices issus de cette liste) :\n"
         f"{json.dumps(safe_exos_min, ensure_ascii=False)}\n\n"
         "TA MISSION :\n"
         "1. Construire une séance cohérente et sécurisée en 3 parties : échauffement, corps de séance, retour au calme.\n"
@@ -391,43 +797,346 @@ def generate_session_with_llm(profile: dict, context: dict, valid_exercises: lis
         "   - du temps disponible (15 vs 90 minutes doivent donner un nombre d'exercices et de séries très différent),\n"
         "   - des douleurs, du feedback précédent.\n"
         "3. Pour chaque exercice utilisé, renvoyer un objet avec les clés suivantes :\n"
-        "   - name (string)\n"
+        "   - id (int, identifiant de l'exercice dans la liste ci-dessus)\n"
         "   - sets (int ou null)\n"
         "   - reps (string ou null)\n"
         "   - duration_min (int ou null)\n"
         "   - rest_sec (int ou null, temps de repos en secondes entre les séries)\n"
-        "   - video (string ou null)\n"
         "   - instruction (string en français, clair et rassurant).\n"
         "4. Réponds UNIQUEMENT avec un JSON ayant les clés : strategie, seance, mot_fin.\n"
     )
 
     try:
-        resp = client.chat.completions.create(
-            model="openai/gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": user_msg},
-            ],
-            temperature=0.5,
-            response_format={"type": "json_object"},
-        )
-        content = resp.choices[0].message.content
-        plan = json.loads(content)
-
-        # Normalisation des noms de clés de séance
-        if isinstance(plan, dict):
-            seance = plan.get("seance")
-            if isinstance(seance, dict):
-                if "corps" not in seance and "corps_de_seance" in seance:
-                    seance["corps"] = seance.pop("corps_de_seance")
-                if "retour_calme" not in seance and "retour_au_calme" in seance:
-                    seance["retour_calme"] = seance.pop("retour_au_calme")
-                plan["seance"] = seance
+        # Client créé dans le try : un échec passe par le repli habituel (planificateur local)
+        client = get_openai_client()
+        started = time.perf_counter()
+        stream = on_event is not None
+
+        def create(model):
+            resp = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_msg},
+                    {"role": "user", "content": user_msg},
+                ],
+                temperature=0.5,
+                response_format={"type": "json_object"},
+                stream=stream,
+                timeout=LLM_TIMEOUT_SEC["session"],
+                **({"stream_options": {"include_usage": True}} if stream else {}),
+            )
+            # En streaming, "répondu" = premier morceau reçu
+            return PrimedStream(resp) if stream else resp
+
+        def attempt(model):
+            resp, hedge = hedged_call(lambda: create(model), LLM_HEDGE_AFTER_SEC, get_llm_executor())
+            get_llm_outcomes().record("hedge", hedge)
+            if not stream:
+                return resp.choices[0].message.content, resp.usage, hedge
+            shown = []
+
+            def forward(kind, section, payload):
+                shown.append(kind)
+                on_event(kind, section, payload)
+
+            try:
+                content, usage = consume_plan_stream(resp, forward, valid_exercises)
+            except Exception as e:
+                if shown:
+                    # Début de séance déjà affiché : pas de second modèle par-dessus
+                    raise NoFallback() from e
+                raise
+            return content, usage, hedge
+
+        with trace("llm.session", streamed=stream, exercises=len(valid_exercises)) as span:
+            (content, usage, hedge), model = call_with_fallback(get_model_router(), "session", attempt)
+            span.tag(model=model, hedge=hedge, **usage_counts(usage))
+        get_token_ledger().record("session", model, usage, time.perf_counter() - started)
+
+        with trace("plan.parse", chars=len(content)) as span:
+            try:
+                # JSON tronqué / mal formé : réparé plutôt qu'un nouvel aller-retour LLM
+                raw, json_outcome = repair_plan_json(content)
+            except ValueError:
+                get_llm_outcomes().record("json", "failed")
+                raise
+            span.tag(json=json_outcome)
+            get_llm_outcomes().record("json", json_outcome)
+            plan = parse_plan(hydrate_plan(raw, valid_exercises))
+        # Une séance réparée peut être incomplète : pas mise en cache
+        if cache_key is not None and json_outcome == "ok":
+            plan_cache_put(cache_key, plan.to_dict())
         return plan
     except Exception as e:
         st.error(f"Erreur lors de la génération de la séance IA : {e}")
         return None
 
+def build_local_session(profile: dict, context: dict, safe_exos: list):
+    """Séance du planificateur local (quelques ms, sans LLM) ; varie avec le nombre de séances faites."""
+    with trace("plan.local", exercises=len(safe_exos)):
+        return build_local_plan(profile, context, safe_exos, seed=st.session_state.get("sessions_done", 0))
+
+def plan_cache_get(key: str):
+    try:
+        return get_plan_cache().get(key)
+    except Exception:
+        return None  # le cache ne doit jamais bloquer la génération
+
+def plan_cache_put(key: str, plan: dict):
+    try:
+        get_plan_cache().put(key, plan)
+    except Exception:
+        pass
+
+def consume_plan_stream(stream, on_event, valid_exercises: list):
+    """
+    Lit les morceaux de la complétion, notifie les éléments complets (exercices réhydratés).
+    Renvoie (texte entier, usage).
+    """
+    parser = StreamingPlanParser()
+    usage = None
+    for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            for kind, section, payload in parser.feed(delta):
+                if kind == "exercise":
+                    payload = hydrate_exercise(payload, valid_exercises)
+                    if payload is None:
+                        continue
+                on_event(kind, section, payload)
+    return parser.text, usage
+
+# --- Pré-génération spéculative de la première séance ---
+SPECULATIVE_CONTEXT = {"time": 30, "energy": 6, "daily_pain": ["Aucune"], "note": ""}
+
+def start_speculative_session(profile: dict):
+    """Lance exercices sûrs + séance au contexte par défaut sur un worker de fond."""
+    if not SPECULATIVE_SESSION or OFFLINE_MODE:
+        return
+    profile = copy.deepcopy(profile)
+    last_feedback = copy.deepcopy(st.session_state.last_feedback)
+    started = {}
+
+    def job():
+        started["at"] = time.time()
+        safe_exos = get_safe_exercises(profile, SPECULATIVE_CONTEXT)
+        if not safe_exos:
+            return None
+        plan = generate_session_with_llm(profile, SPECULATIVE_CONTEXT, safe_exos, last_feedback)
+        return (safe_exos, plan) if plan is not None else None
+
+    cancel_speculative_session()
+    st.session_state.speculative_session = {
+        "profile": profile,
+        "future": get_background_executor().submit(job),
+        "started": started,
+    }
+
+def cancel_speculative_session():
+    spec = st.session_state.pop("speculative_session", None)
+    if spec is not None:
+        spec["future"].cancel()  # sans effet si déjà démarrée : le résultat est simplement ignoré
+
+def is_close_to_speculative_context(context: dict) -> bool:
+    """Même douleurs (aucune), pas de message, ±5 min et ±1 d'énergie par rapport au défaut."""
+    pains = [p for p in context.get("daily_pain") or [] if INJURY_MAP.get(p)]
+    return (
+        not pains
+        and not (context.get("note") or "").strip()
+        and abs(context.get("time", 0) - SPECULATIVE_CONTEXT["time"]) <= 5
+        and abs(context.get("energy", 0) - SPECULATIVE_CONTEXT["energy"]) <= 1
+    )
+
+def take_speculative_session(profile: dict, context: dict):
+    """Renvoie (safe_exos, plan) pré-générés si utilisables, sinon None (et abandonne la spéculation)."""
+    spec = st.session_state.get("speculative_session")
+    if spec is None:
+        return None
+    if spec["profile"] != profile or not is_close_to_speculative_context(context):
+        cancel_speculative_session()
+        return None
+
+    st.session_state.pop("speculative_session", None)
+    future = spec["future"]
+    started_at = spec["started"].get("at")
+    if started_at is None and not future.done():
+        # Encore en file : une génération immédiate ne sera pas plus lente
+        future.cancel()
+        return None
+    # Déjà en vol : attendre la fin reste plus court que relancer une génération,
+    # dans la limite du délai d'une génération normale (pas les deux à la suite)
+    remaining = LLM_TIMEOUT_SEC["session"] - (time.time() - (started_at or time.time()))
+    try:
+        return future.result(timeout=max(remaining, 0.0))
+    except FutureTimeout:
+        future.cancel()  # sans effet si déjà démarrée : le résultat est simplement ignoré
+        logger.warning("Séance pré-générée abandonnée : toujours en cours après %.0f s", LLM_TIMEOUT_SEC["session"])
+        return None
+    except Exception as e:
+        logger.warning("Séance pré-générée en échec : %s", e)
+        return None
+
+# --- Programme de la semaine (coach/weekly_program.py) ---
+
+def prepare_next_sessions(profile: dict):
+    """Profil validé : programme de la semaine, sinon pré-génération de la 1re séance."""
+    if WEEKLY_PROGRAM:
+        start_weekly_program(profile)
+    else:
+        start_speculative_session(profile)
+
+def start_weekly_program(profile: dict):
+    """Génère les séances de la semaine sur un worker de fond, puis les sauvegarde."""
+    profile = copy.deepcopy(profile)
+    last_feedback = copy.deepcopy(st.session_state.last_feedback)
+    previous = st.session_state.weekly_program
+    user_id = st.session_state.get("user_id")
+    seed = st.session_state.get("sessions_done", 0)
+
+    def job():
+        with trace("program.build", sessions=profile.get("sessions_per_week")) as span:
+
+            def generate(context, day):
+                # Exercices classés selon le focus de la séance : semaine équilibrée
+                safe_exos = get_safe_exercises(profile, context)
+                if not safe_exos:
+                    return None, "local"
+                if not OFFLINE_MODE:
+                    plan = generate_session_with_llm(profile, context, safe_exos, last_feedback)
+                    if plan is not None or not LOCAL_PLAN_FALLBACK:
+                        return plan, "llm"
+                return build_local_plan(profile, context, safe_exos, seed=seed + day), "local"
+
+            program = build_program(profile, generate, previous)
+            span.tag(version=program["version"], local=sum(s["source"] == "local" for s in program["sessions"]))
+        if USER_STORE != "off" and user_id:
+            get_user_store().put(user_id, weekly_program=program)
+        return program
+
+    st.session_state.weekly_program_job = get_background_executor().submit(job)
+
+def current_weekly_program(profile: dict):
+    """
+    Programme valable cette semaine pour ce profil, sinon None. Une génération
+    en cours n'est reprise que terminée : jamais d'attente dans le script.
+    """
+    job = st.session_state.get("weekly_program_job")
+    if job is not None and job.done():
+        st.session_state.pop("weekly_program_job", None)
+        try:
+            program = job.result()
+        except Exception as e:
+            logger.warning("Programme de la semaine non généré : %s", e)
+            program = None
+        if program is not None:
+            st.session_state.weekly_program = program
+            st.session_state.pop("weekly_program_failed", None)
+        else:
+            st.session_state.weekly_program_failed = {
+                "week": current_week(),
+                "profile": profile_fingerprint(profile),
+                "at": time.time(),
+            }
+    program = st.session_state.weekly_program
+    return program if is_current(program, profile) else None
+
+def weekly_program_backoff(profile: dict) -> bool:
+    """Vrai si la génération a échoué récemment pour cette semaine et ce profil."""
+    failed = st.session_state.get("weekly_program_failed")
+    return (
+        failed is not None
+        and failed["week"] == current_week()
+        and failed["profile"] == profile_fingerprint(profile)
+        and time.time() - failed["at"] < WEEKLY_PROGRAM_RETRY_SEC
+    )
+
+def take_program_session(profile: dict, context: dict):
+    """Prochaine séance du programme ajustée au jour (sans LLM), sinon None."""
+    # Un message libre peut tout changer : génération habituelle
+    if not WEEKLY_PROGRAM or (context.get("note") or "").strip():
+        return None
+    # Programme encore en génération (ou en échec) : génération habituelle, sans l'attendre
+    program = current_weekly_program(profile)
+    if program is None:
+        return None
+    day = program["next"]
+    with trace("plan.program", day=day, version=program["version"]) as span:
+        plan = adjust_plan(
+            program["sessions"][day]["plan"],
+            program["context"],
+            context,
+            profile.get("level") or "Beginner",
+            # Sécurité seulement (pas de top-K) : tous les exercices sûrs avec les douleurs du jour
+            (ex["name"] for ex in get_safe_exercises(profile, context, ranked=False)),
+        )
+        span.tag(adjusted=plan is not None)
+    if plan is None:
+        return None
+    st.session_state.weekly_program = {**program, "next": day + 1}
+    persist_user_state()
+    return plan
+
+# --- Utilisateur persistant (profil, dernier feedback, nombre de séances) ---
+USER_ID_PARAM = "u"
+USER_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+def current_user_id() -> str:
+    """
+    Compte connecté (st.login) s'il y en a un, sinon identifiant anonyme gardé
+    dans l'URL (?u=...) : un rafraîchissement ou un favori retrouve le profil.
+    """
+    try:
+        if st.user.is_logged_in and st.user.get("email"):
+            return f"user:{st.user.email}"
+    except Exception:
+        pass  # authentification non configurée
+    uid = st.query_params.get(USER_ID_PARAM)
+    if not uid or not USER_ID_PATTERN.match(uid):
+        uid = uuid.uuid4().hex
+        st.query_params[USER_ID_PARAM] = uid
+    return uid
+
+def restore_user_session():
+    """Une fois par session : recharge l'utilisateur connu et saute l'onboarding."""
+    if st.session_state.get("user_id"):
+        return
+    st.session_state.user_id = current_user_id()
+    if USER_STORE == "off":
+        return
+    try:
+        with trace("user_store.get"):
+            record = get_user_store().get(st.session_state.user_id)
+    except Exception as e:
+        logger.warning("Profil persistant illisible : %s", e)
+        return
+    if record and record["user_profile"].get("goals"):
+        st.session_state.user_profile = record["user_profile"]
+        st.session_state.last_feedback = record["last_feedback"]
+        st.session_state.sessions_done = record["sessions_done"]
+        st.session_state.weekly_program = program_plans(record.get("weekly_program"))
+        if st.session_state.page == "onboarding":
+            st.session_state.page = "home"
+
+def persist_user_state():
+    """Sauvegarde différée (aucune attente d'écriture dans le script)."""
+    if USER_STORE == "off" or not st.session_state.get("user_id"):
+        return
+    # Programme terminé en fond : repris ici pour ne pas l'écraser par l'ancien
+    current_weekly_program(st.session_state.user_profile)
+    try:
+        get_user_store().put(
+            st.session_state.user_id,
+            user_profile=st.session_state.user_profile,
+            last_feedback=st.session_state.last_feedback,
+            sessions_done=st.session_state.sessions_done,
+            weekly_program=st.session_state.weekly_program,
+        )
+    except Exception as e:
+        logger.warning("Profil non sauvegardé : %s", e)
+
 # ========================= 5. PAGES DE L'APPLICATION =========================
 
 def page_onboarding():
@@ -608,7 +1317,9 @@ Donne-moi le plus de détails possibles :
                 f"Douleurs / blessures : {pain}\n"
             )
 
-            data = extract_profile_from_text(bio_text)
+            data = analyze_profile(goals, equipment, pain, bio_text)
+            # Zones citées dans la réponse mais manquées par l'analyse : évitées quand même
+            data["injuries"] = add_text_pain_zones(data["injuries"], pain)
 
             base_profile = st.session_state.user_profile or {}
             base_profile["equipment"] = data["equipment"]
@@ -619,8 +1330,6 @@ Donne-moi le plus de détails possibles :
 
             st.session_state.profile_analysis = data
 
-            time.sleep(1.0)
-
         st.session_state.onboarding_step = "summary"
         st.rerun()
 
@@ -659,6 +1368,8 @@ Donne-moi le plus de détails possibles :
                 st.session_state.summary_needs_correction = False
                 st.session_state.summary_correction_note = ""
 
+                persist_user_state()
+                prepare_next_sessions(st.session_state.user_profile)
                 st.session_state.page = "checkin"
                 st.rerun()
 
@@ -684,6 +1395,8 @@ Donne-moi le plus de détails possibles :
                 st.session_state.typed_equipment = False
                 st.session_state.typed_schedule_pain = False
 
+                persist_user_state()
+                prepare_next_sessions(st.session_state.user_profile)
                 st.session_state.page = "checkin"
                 st.rerun()
 
@@ -700,6 +1413,10 @@ def page_home():
 
     p = st.session_state.user_profile
 
+    flash = st.session_state.pop("flash", None)
+    if flash:
+        st.success(flash)
+
     with st.expander("Voir / modifier mon profil"):
         st.write(f"**Âge :** {p.get('age', '-')}")
         st.write(f"**Niveau :** {p.get('level', '-')}")
@@ -710,6 +1427,18 @@ def page_home():
             st.session_state.page = "onboarding"
             st.rerun()
 
+    if WEEKLY_PROGRAM:
+        program = current_weekly_program(p)
+        if program is not None:
+            session = program["sessions"][program["next"]]
+            st.info(
+                f"📅 **Programme de la semaine :** séance {program['next'] + 1}/{len(program['sessions'])} "
+                f"— {session['focus']}"
+            )
+        elif "weekly_program_job" not in st.session_state and not weekly_program_backoff(p):
+            # Nouvelle semaine, profil modifié ou programme terminé : le suivant se prépare en fond
+            start_weekly_program(p)
+
     if st.session_state.sessions_done > 0:
         st.info(f"📈 Tu as déjà complété **{st.session_state.sessions_done}** séance(s) avec le coach.")
 
@@ -759,12 +1488,19 @@ def page_checkin():
                 context = {
                     "time": time_avail,
                     "energy": energy,
-                    "daily_pain": daily_pain,
+                    # Zones citées dans le message ("mal au genou") : exclues comme si elles étaient cochées
+                    "daily_pain": add_text_pain_zones(daily_pain, note),
                     "note": note,
                 }
 
+                # 0) Séance pré-générée après l'onboarding, si le contexte est proche du défaut
+                speculative = take_speculative_session(profile, context)
+
                 # 1) Récupération des exercices sûrs depuis Neo4j
-                safe_exos = get_safe_exercises(profile, context)
+                if speculative is not None:
+                    safe_exos = speculative[0]
+                else:
+                    safe_exos = get_safe_exercises(profile, context)
                 if not safe_exos:
                     st.error(
                         "Trop de contraintes (Blessures + Matériel). "
@@ -773,50 +1509,53 @@ def page_checkin():
                     )
                     return
 
-                # 2) Sauvegarde des mappings utiles pour l'affichage
-                #    - nom EN -> nom FR
-                #    - nom EN -> URL de l'image
-                st.session_state.exercise_name_map = {
-                    ex["name"]: ex.get("name_fr")
-                    for ex in safe_exos
-                }
-                st.session_state.exercise_image_map = {
-                    ex["name"]: ex.get("image_url")
-                    for ex in safe_exos
-                }
-
-                # 3) Génération de la séance via le LLM
-                workout_plan = generate_session_with_llm(
-                    profile,
-                    context,
-                    safe_exos,
-                    st.session_state.last_feedback,
-                )
+                # 2) Séance du programme de la semaine ajustée au jour, sinon génération via le LLM
+                #    (brouillon local affiché tout de suite, remplacé par la séance du LLM ;
+                #    en streaming : chaque exercice s'affiche dès qu'il est complet)
+                program_plan = None if speculative is not None else take_program_session(profile, context)
+                if speculative is not None:
+                    workout_plan = speculative[1]
+                elif program_plan is not None:
+                    workout_plan = program_plan
+                elif OFFLINE_MODE:
+                    workout_plan = build_local_session(profile, context, safe_exos)
+                else:
+                    draft = build_local_session(profile, context, safe_exos)
+                    draft_box = st.empty()
+                    if LOCAL_PLAN_DRAFT:
+                        with draft_box.container():
+                            st.caption("✏️ Brouillon de ton coach, la séance détaillée arrive…")
+                            render_plan(draft, "draft_", with_rest_timer=False)
+                    workout_plan = generate_session_with_llm(
+                        profile,
+                        context,
+                        safe_exos,
+                        st.session_state.last_feedback,
+                        on_event=stream_plan_renderer(st.container(), on_start=draft_box.empty) if STREAM_SESSION else None,
+                    )
+                    draft_box.empty()
+                    if workout_plan is None and LOCAL_PLAN_FALLBACK:
+                        # LLM indisponible ou trop lent : séance du planificateur local
+                        workout_plan = draft
+                        st.toast("Coach IA indisponible : séance préparée hors ligne 📴")
                 if workout_plan is None:
                     st.error("Impossible de générer la séance. Réessaie dans un instant.")
                     return
 
-                # 4) Stockage de la séance et routing
+                # 3) Stockage de la séance et routing
                 st.session_state.workout_plan = workout_plan
                 st.session_state.session_time = time_avail
+                st.session_state.workout_context = context
                 st.session_state.page = "workout"
                 st.rerun()
 
-def render_exercise_card(ex: dict, section_key: str, idx: int):
-    """Affiche un exercice sous forme de 'carte' avec vidéo, image, détails, checkbox."""
-    name_en = ex.get("name", "Exercice")
-
-    # Récupération du nom français depuis le mapping en session
-    name_fr = None
-    name_map = st.session_state.get("exercise_name_map", {})
-    if isinstance(name_map, dict):
-        name_fr = name_map.get(name_en)
+def render_exercise_card(ex: ExerciseItem, section_key: str, idx: int, with_rest_timer: bool = True):
+    """Affiche un exercice sous forme de 'carte' avec vidéo, image, détails, checkbox, minuteur de repos."""
+    name_en = ex.name
 
-    # 💡 Récupération de l'image depuis le mapping en session
-    image_url = None
-    image_map = st.session_state.get("exercise_image_map", {})
-    if isinstance(image_map, dict):
-        image_url = image_map.get(name_en)
+    # Nom français et image : fiche partagée du catalogue (coach/plan.EXERCISES)
+    name_fr = ex.name_fr
+    image_url = ex.image_url
 
     # Affichage : Français (Anglais) si possible
     if name_fr:
@@ -824,12 +1563,12 @@ def render_exercise_card(ex: dict, section_key: str, idx: int):
     else:
         display_name = name_en
 
-    sets = ex.get("sets")
-    reps = ex.get("reps")
-    duration_min = ex.get("duration_min")
-    rest_sec = ex.get("rest_sec")
-    video = ex.get("video")
-    instruction = ex.get("instruction", "")
+    sets = ex.sets
+    reps = ex.reps
+    duration_min = ex.duration_min
+    rest_sec = ex.rest_sec
+    video = ex.video
+    instruction = ex.instruction
 
     details = []
     if duration_min:
@@ -843,18 +1582,26 @@ def render_exercise_card(ex: dict, section_key: str, idx: int):
 
     detail_line = " • ".join(details) if details else "Durée / volume libre"
 
-    with st.expander(f"{display_name} — {detail_line}", expanded=False):
+    # Carte suivie (key + rerun à l'ouverture) : image et vidéo ne sont envoyées
+    # au navigateur que pour les cartes ouvertes, pas pour toute la séance
+    card = st.expander(
+        f"{display_name} — {detail_line}",
+        expanded=False,
+        key=f"card_{section_key}_{idx}",
+        on_change="rerun",
+    )
+    with card:
 
         # 🔹 Affichage de l'image si disponible
-        if image_url:
+        if image_url and card.open:
             st.image(
-                image_url,
+                exercise_image(image_url),
                 caption="Exécution du mouvement",
                 use_container_width=True,
             )
 
         # 🔹 Affichage de la vidéo si disponible
-        if video:
+        if video and card.open:
             if "youtube.com/results?search_query=" in video:
                 st.markdown(
                     f"[🔎 Voir les tutos pour cet exercice sur YouTube]({video})",
@@ -864,13 +1611,164 @@ def render_exercise_card(ex: dict, section_key: str, idx: int):
                 st.video(video)
 
         st.markdown(f"**Consigne :** {instruction}")
+
+        # 🔹 Minuteur de repos (même mécanisme que le chrono global)
+        rest_seconds = rest_sec or 0
+        if with_rest_timer and rest_seconds > 0:
+            timer_name = f"rest_{section_key}_{idx}"
+            rest_timer = countdown_state(timer_name)
+            if st.button(f"⏳ Lancer le repos ({rest_seconds}s)", key=f"btn_{timer_name}"):
+                countdown_stop(timer_name)
+                countdown_start(timer_name, rest_seconds)
+                st.rerun()
+            if rest_timer["running"] or rest_timer.get("expired"):
+                countdown_widget(timer_name, "Repos", "C'est reparti 💪")
+
         st.checkbox("Fait ✅", key=f"done_{section_key}_{idx}")
 
+# --- Comptes à rebours côté navigateur (chrono global + temps de repos) ---
+COUNTDOWN_HTML = Template("""
+<div style="font-family: 'Teko', 'Impact', system-ui, sans-serif; font-size: $size; line-height: 1.2;">
+  <span id="countdown"></span>
+</div>
+<script>
+  const running = $running;
+  const end = Date.now() + $remaining * 1000;
+  const el = document.getElementById("countdown");
+  function fmt(sec) {
+    const m = Math.floor(sec / 60), s = sec % 60;
+    return String(m).padStart(2, "0") + ":" + String(s).padStart(2, "0");
+  }
+  function tick() {
+    const left = running ? Math.max(0, Math.ceil((end - Date.now()) / 1000)) : $remaining;
+    el.textContent = left > 0 ? $label + " " + fmt(left) + (running ? "" : " ⏸") : $done_label;
+    if (running && left > 0) setTimeout(tick, 250);
+  }
+  tick();
+</script>
+""")
+
+def countdown_state(name: str) -> dict:
+    """État d'un compte à rebours : deadline (epoch) s'il tourne, secondes restantes s'il est en pause."""
+    timers = st.session_state.setdefault("countdowns", {})
+    return timers.setdefault(name, {"running": False, "deadline": 0.0, "remaining": 0})
+
+def countdown_left(name: str) -> int:
+    timer = countdown_state(name)
+    if timer["running"]:
+        return max(0, math.ceil(timer["deadline"] - time.time()))
+    return timer["remaining"]
+
+def countdown_start(name: str, seconds: int):
+    """Lance le décompte, ou le reprend là où il était en pause."""
+    timer = countdown_state(name)
+    if timer["remaining"] <= 0:
+        timer["remaining"] = int(seconds)
+    timer.update(running=True, deadline=time.time() + timer["remaining"], expired=False)
+
+def countdown_pause(name: str):
+    timer = countdown_state(name)
+    timer.update(remaining=countdown_left(name), running=False)
+
+def countdown_stop(name: str):
+    countdown_state(name).update(running=False, remaining=0, expired=False)
+
+def countdown_widget(name: str, label: str, done_label: str, on_expire=None):
+    """
+    Affiche le décompte (JS dans le navigateur). Un fragment programmé à l'échéance
+    réveille le serveur une seule fois pour constater la fin et relancer la page.
+    """
+    timer = countdown_state(name)
+    left = countdown_left(name)
+
+    def widget():
+        if timer["running"] and countdown_left(name) <= 0:
+            timer.update(running=False, remaining=0, expired=True)
+            if on_expire is not None:
+                on_expire(timer)
+            st.rerun()
+
+        embed_html(
+            COUNTDOWN_HTML.substitute(
+                running="true" if timer["running"] else "false",
+                remaining=countdown_left(name),
+                label=json.dumps(label),
+                done_label=json.dumps(done_label if timer.get("expired") else label + " 00:00"),
+                size="2.2rem" if name == "global" else "1.4rem",
+            ),
+            height=60 if name == "global" else 45,
+        )
+
+    run_every = left + 0.5 if timer["running"] and left > 0 else None
+    st.fragment(widget, run_every=run_every)()
+
+def embed_html(html: str, height: int):
+    """HTML + JS dans une iframe (st.iframe sur les versions récentes de Streamlit)."""
+    if hasattr(st, "iframe"):
+        st.iframe(html, height=height)
+    else:
+        components.html(html, height=height)
+
+def celebrate_end_of_session(timer: dict):
+    timer["just_expired"] = True
+
+SECTION_TITLES = {
+    "echauffement": "🔥 Échauffement",
+    "corps": "💪 Corps de séance",
+    "retour_calme": "🧘 Retour au calme",
+}
+
+def stream_plan_renderer(container, on_start=None):
+    """
+    Callback de streaming : affiche stratégie, cartes d'exercices et mot de fin au fil de l'eau.
+    `on_start()` est appelé au premier élément (ex: effacer le brouillon).
+    """
+    counts = {}
+
+    def on_event(kind: str, section: str | None, payload):
+        if not counts and on_start is not None:
+            on_start()
+        with container:
+            if kind == "strategie":
+                if "strategie" not in counts:
+                    st.subheader("🎯 Stratégie du coach")
+                    counts["strategie"] = 0
+                st.markdown(f"- {payload}")
+            elif kind == "exercise" and isinstance(payload, dict):
+                if section not in counts:
+                    st.subheader(SECTION_TITLES[section])
+                    counts[section] = 0
+                # Aperçu dans le formulaire de check-in : pas de bouton possible
+                render_exercise_card(
+                    ExerciseItem.from_dict(payload), f"stream_{section}", counts[section], with_rest_timer=False
+                )
+                counts[section] += 1
+            elif kind == "mot_fin" and payload:
+                st.info(f"🗣️ Mot du coach : {payload}")
+
+    return on_event
+
+def render_plan(plan, key_prefix: str = "", with_rest_timer: bool = True):
+    """Plan déjà normalisé à la génération (coach/plan.py) : simple parcours."""
+    if plan.strategie:
+        st.subheader("🎯 Stratégie du coach")
+        for bullet in plan.strategie:
+            st.markdown(f"- {bullet}")
+
+    for section in plan.sections:
+        if section.exercises:
+            st.subheader(SECTION_TITLES[section.key])
+            for idx, ex in enumerate(section.exercises):
+                render_exercise_card(ex, key_prefix + section.key, idx, with_rest_timer=with_rest_timer)
+
+    if plan.mot_fin:
+        st.markdown("---")
+        st.info(f"🗣️ Mot du coach : {plan.mot_fin}")
+
 def page_workout():
     st.title("🏋️‍♂️ Ta Séance personnalisée")
 
     plan = st.session_state.workout_plan
-    st.expander("Debug – plan brut").json(plan)
 
     if plan is None:
         st.warning("Aucune séance en cours. Retour à l'accueil.")
@@ -880,155 +1778,50 @@ def page_workout():
         return
 
     # ========== CHRONO EN HAUT ==========
-    # Sécurité au cas où les variables n'existent pas encore
-    if "timer_running" not in st.session_state:
-        st.session_state.timer_running = False
-    if "timer_remaining" not in st.session_state:
-        st.session_state.timer_remaining = 0
-
+    # Le décompte tourne dans le navigateur : pas de rerun serveur à chaque seconde
     st.markdown("---")
     st.subheader("⏱ Chrono global (optionnel)")
 
-    # Initialisation de la durée si rien n'est lancé
-    if st.session_state.timer_remaining <= 0 and not st.session_state.timer_running:
-        st.session_state.timer_remaining = 0
-
-    # Affichage du temps restant
-    if st.session_state.timer_remaining > 0 or st.session_state.timer_running:
-        m, s = divmod(max(st.session_state.timer_remaining, 0), 60)
-        st.metric("Temps restant (approx.)", f"{m:02d}:{s:02d}")
+    timer = countdown_state("global")
+    if timer["running"] or timer["remaining"] > 0:
+        countdown_widget("global", "Temps restant", "Séance terminée ! 🎉", on_expire=celebrate_end_of_session)
     else:
         st.write("Aucun chrono en cours.")
 
+    if timer.pop("just_expired", False):
+        st.balloons()
+        st.success("Séance terminée ! Tu peux arrêter la séance quand tu veux.")
+
     # Boutons de contrôle du chrono et de la séance
     col1, col2 = st.columns(2)
 
     with col1:
-        if not st.session_state.timer_running:
+        if not timer["running"]:
             # Lancer ou reprendre le chrono
             if st.button("Lancer / Reprendre le chrono", use_container_width=True):
-                if st.session_state.timer_remaining <= 0:
-                    # Premier lancement : on initialise à la durée de la séance
-                    st.session_state.timer_remaining = st.session_state.session_time * 60
-                st.session_state.timer_running = True
+                # Premier lancement : on initialise à la durée de la séance
+                countdown_start("global", st.session_state.session_time * 60)
                 st.rerun()
         else:
             # Mettre en pause le chrono
             if st.button("Mettre en pause le chrono", use_container_width=True):
-                st.session_state.timer_running = False
+                countdown_pause("global")
                 st.rerun()
 
     with col2:
         # Arrêter la séance à tout moment
         if st.button("Arrêter la séance maintenant", use_container_width=True):
-            st.session_state.timer_running = False
-            st.session_state.timer_remaining = 0
+            countdown_stop("global")
             st.session_state.page = "feedback"
             st.rerun()
 
-    # Logique de décrémentation du chrono (tick de 1 seconde)
-    if st.session_state.timer_running and st.session_state.timer_remaining > 0:
-        time.sleep(1)
-        st.session_state.timer_remaining -= 1
-
-        if st.session_state.timer_remaining <= 0:
-            st.session_state.timer_running = False
-            st.session_state.timer_remaining = 0
-            st.balloons()
-            st.success("Séance terminée ! Tu peux arrêter la séance quand tu veux.")
-        else:
-            st.rerun()
-
     st.markdown("---")
     # ========== AFFICHAGE DE LA SEANCE EN DESSOUS ==========
-
-    # Si pour une raison quelconque ce n'est pas un dict JSON, fallback en markdown
-    if not isinstance(plan, dict):
-        st.markdown(plan)
-    else:
-        # --- Stratégie ---
-        strategie = plan.get("strategie", [])
-        # Toujours une liste de phrases
-        if isinstance(strategie, str):
-            strategie = [strategie]
-        elif not isinstance(strategie, list):
-            strategie = []
-
-        # --- Normalisation robuste de la séance ---
-        seance = plan.get("seance", {})
-
-        # 1) Si c'est une liste -> on considère que c'est le corps de séance
-        if isinstance(seance, list):
-            exos = seance
-            echauffement = []
-            corps = exos[:]
-            retour_calme = []
-
-            # Heuristique simple : premier exo = échauffement
-            if corps:
-                echauffement.append(corps.pop(0))
-
-            # Heuristique simple : si on a 5+ exos, dernier = retour au calme
-            if len(corps) >= 5:
-                retour_calme.append(corps.pop(-1))
-
-            seance = {
-                "echauffement": echauffement,
-                "corps": corps,
-                "retour_calme": retour_calme,
-            }
-        # 2) Si ce n'est ni une liste ni un dict -> on met une structure vide
-        elif not isinstance(seance, dict):
-            seance = {
-                "echauffement": [],
-                "corps": [],
-                "retour_calme": [],
-            }
-
-        # 3) Harmonisation des noms de clés (cas où le modèle renvoie en français)
-        if "corps" not in seance and "corps_de_seance" in seance:
-            seance["corps"] = seance["corps_de_seance"]
-        if "retour_calme" not in seance and "retour_au_calme" in seance:
-            seance["retour_calme"] = seance["retour_au_calme"]
-
-        # 4) Lecture finale
-        echauffement = seance.get("echauffement", [])
-        corps = seance.get("corps", [])
-        retour_calme = seance.get("retour_calme", [])
-        mot_fin = plan.get("mot_fin", "")
-
-        # Stratégie
-        if strategie:
-            st.subheader("🎯 Stratégie du coach")
-            for bullet in strategie:
-                st.markdown(f"- {bullet}")
-
-        # Échauffement
-        if echauffement:
-            st.subheader("🔥 Échauffement")
-            for idx, ex in enumerate(echauffement):
-                render_exercise_card(ex, "echauffement", idx)
-
-        # Corps de séance
-        if corps:
-            st.subheader("💪 Corps de séance")
-            for idx, ex in enumerate(corps):
-                render_exercise_card(ex, "corps", idx)
-
-        # Retour au calme
-        if retour_calme:
-            st.subheader("🧘 Retour au calme")
-            for idx, ex in enumerate(retour_calme):
-                render_exercise_card(ex, "retour_calme", idx)
-
-        if mot_fin:
-            st.markdown("---")
-            st.info(f"🗣️ Mot du coach : {mot_fin}")
+    render_plan(plan)
 
     # Bouton “J'ai fini” (optionnel si l’utilisateur ne veut pas utiliser le chrono)
     if st.button("J'AI FINI ✅", type="primary", use_container_width=True):
-        st.session_state.timer_running = False
-        st.session_state.timer_remaining = 0
+        countdown_stop("global")
         st.session_state.page = "feedback"
         st.rerun()
 
@@ -1062,20 +1855,76 @@ def page_feedback():
                 "message": msg,
             }
             st.session_state.sessions_done = st.session_state.get("sessions_done", 0) + 1
-            st.success("💾 Feedback enregistré ! Ton coach adaptera la prochaine séance.")
-            time.sleep(2)
+            persist_user_state()
+            if FEEDBACK_SYNC:
+                try:
+                    get_feedback_queue().enqueue(
+                        st.session_state.get("user_id") or "anonymous",
+                        st.session_state.last_feedback,
+                        st.session_state.get("workout_context") or {"time": st.session_state.session_time},
+                        st.session_state.workout_plan.to_dict(),
+                    )
+                except Exception as e:
+                    logger.warning("Feedback non journalisé : %s", e)
+            # Message affiché sur l'accueil (plus d'attente avant de changer de page)
+            st.session_state.flash = "💾 Feedback enregistré ! Ton coach adaptera la prochaine séance."
             st.session_state.page = "home"
             st.rerun()
 
+@st.cache_resource
+def warm_up_backends():
+    """Une fois par process : pool Neo4j + snapshot du catalogue (+ images), sur un worker de fond."""
+    def job():
+        get_neo4j_client()
+        if CATALOG_SNAPSHOT:
+            snapshot = get_catalog_store().get()
+            if MEDIA_CACHE and MEDIA_PREWARM:
+                get_media_cache().prewarm(ex["image_url"] for ex in snapshot.exercises)
+    return get_background_executor().submit(job)
+
+def render_trace_panel():
+    """Panneau latéral (TRACE_PANEL) : derniers temps par étape de la session."""
+    with st.sidebar.expander("⏱ Temps par étape", expanded=True):
+        spans = list(st.session_state.trace_spans)[::-1]
+        if not spans:
+            st.caption("Aucune mesure pour l'instant.")
+            return
+        st.dataframe(
+            [
+                {
+                    "étape": s["name"],
+                    "ms": s["duration_ms"],
+                    "détails": ", ".join(f"{k}={v}" for k, v in s["tags"].items() if k != "page"),
+                    "page": s["tags"].get("page", ""),
+                }
+                for s in spans
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+
 # ========================= 6. ROUTING =========================
 
-if st.session_state.page == "onboarding":
-    page_onboarding()
-elif st.session_state.page == "home":
-    page_home()
-elif st.session_state.page == "checkin":
-    page_checkin()
-elif st.session_state.page == "workout":
-    page_workout()
-elif st.session_state.page == "feedback":
-    page_feedback()
+restore_user_session()
+
+page = st.session_state.page
+# Derniers spans gardés en session seulement pour le panneau (TRACE_PANEL)
+session_spans = st.session_state.setdefault("trace_spans", deque(maxlen=50)) if TRACE_PANEL else None
+with get_tracer().session(session_spans, page=page), trace(f"page.{page}"):
+    if page == "onboarding":
+        page_onboarding()
+    elif page == "home":
+        page_home()
+    elif page == "checkin":
+        page_checkin()
+    elif page == "workout":
+        page_workout()
+    elif page == "feedback":
+        page_feedback()
+
+if TRACE_PANEL:
+    render_trace_panel()
+
+# Page déjà envoyée au navigateur : on peut préparer Neo4j sans retarder l'affichage
+if NEO4J_WARM_UP:
+    warm_up_backends()
@@ -0,0 +1 @@
+"""Benchmarks du Coach IA (hors ligne, via streamlit.testing.AppTest). Lancer depuis la racine du repo."""
@@ -0,0 +1,93 @@
+"""
+Démarrage à froid : chaque mesure tourne dans un process Python neuf.
+
+Mesure l'import de streamlit, le premier affichage de l'onboarding (imports
+de l'app compris), puis le coût d'un rerun, et indique quels backends lourds
+sont déjà chargés après le premier affichage.
+
+    python -m benchmarks.cold_start                     # version courante
+    python -m benchmarks.cold_start --baseline HEAD~1   # + comparaison avec une révision git
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from benchmarks.common import APP_PATH, REPO_ROOT, app_at_revision, summarize
+
+HEAVY_MODULES = ("openai", "neo4j", "numpy")
+
+
+def child(app_path: str, reruns: int):
+    """Exécuté dans le sous-process : imprime les mesures en JSON sur stdout."""
+    started = time.perf_counter()
+    import streamlit  # noqa: F401
+    import_sec = time.perf_counter() - started
+
+    from benchmarks.common import make_apptest
+
+    at = make_apptest(app_path)
+    started = time.perf_counter()
+    at.run()
+    first_paint_sec = time.perf_counter() - started
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    rerun_secs = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.run()
+        rerun_secs.append(time.perf_counter() - started)
+
+    print(json.dumps({
+        "import_sec": import_sec,
+        "first_paint_sec": first_paint_sec,
+        "rerun": summarize(rerun_secs),
+        "heavy_loaded": loaded,
+    }))
+
+
+def measure(app_path: str, repeat: int, reruns: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.check_output(
+            [sys.executable, "-m", "benchmarks.cold_start", "--child", app_path, "--reruns", str(reruns)],
+            cwd=REPO_ROOT,
+        )
+        samples.append(json.loads(out.decode().strip().splitlines()[-1]))
+    return {
+        "import": summarize([s["import_sec"] for s in samples]),
+        "first_paint": summarize([s["first_paint_sec"] for s in samples]),
+        "rerun": summarize([s["rerun"]["p50"] for s in samples]),
+        "heavy_loaded": samples[-1]["heavy_loaded"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", help="révision git à comparer (ex: HEAD~1)")
+    parser.add_argument("--repeat", type=int, default=5, help="nombre de process neufs par version")
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--child", metavar="APP_PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.child, args.reruns)
+        return
+
+    current = measure(APP_PATH, args.repeat, args.reruns)
+    before = measure(app_at_revision(args.baseline), args.repeat, args.reruns) if args.baseline else None
+
+    print(f"{'mesure (p50)':<22}{'avant (ms)':>12}{'après (ms)':>12}")
+    for label in ("import", "first_paint", "rerun"):
+        prev = f"{before[label]['p50'] * 1000:.0f}" if before else "-"
+        print(f"{label:<22}{prev:>12}{current[label]['p50'] * 1000:>12.0f}")
+    prev = ", ".join(before["heavy_loaded"]) or "aucun" if before else "-"
+    print(f"{'backends chargés':<22}{prev:>12}{', '.join(current['heavy_loaded']) or 'aucun':>12}")
+
+
+if __name__ == "__main__":
+    main()
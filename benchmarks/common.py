@@ -0,0 +1,69 @@
+"""Utilitaires partagés par les benchmarks."""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "App_beta_test.py")
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+FAKE_SECRETS = {
+    "NEO4J_URI": "bolt://localhost:7687",
+    "NEO4J_USER": "neo4j",
+    "NEO4J_PASSWORD": "benchmark",
+    "OPENAI_API_KEY": "benchmark",
+}
+
+
+def make_apptest(app_path: str = APP_PATH, secrets: dict | None = None, timeout: float = 120):
+    """AppTest du script avec des secrets factices (aucun backend n'est contacté à l'import)."""
+    from streamlit.logger import set_log_level
+    from streamlit.testing.v1 import AppTest
+
+    # AppTest tourne sans serveur : on coupe les warnings "missing ScriptRunContext"
+    # (y compris ceux des loggers streamlit créés plus tard)
+    set_log_level("error")
+
+    at = AppTest.from_file(app_path, default_timeout=timeout)
+    for key, value in {**FAKE_SECRETS, **(secrets or {})}.items():
+        at.secrets[key] = value
+    return at
+
+
+def file_at_revision(rev: str, path: str) -> str:
+    """Extrait un fichier du dépôt à une révision git dans un fichier temporaire (comparaison avant/après)."""
+    source = subprocess.check_output(["git", "show", f"{rev}:{path}"], cwd=REPO_ROOT)
+    stem, ext = os.path.splitext(os.path.basename(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{stem}_", suffix=ext)
+    with os.fdopen(fd, "wb") as f:
+        f.write(source)
+    return tmp_path
+
+
+def app_at_revision(rev: str) -> str:
+    """App_beta_test.py d'une révision git, dans un fichier temporaire."""
+    return file_at_revision(rev, "App_beta_test.py")
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(values: list) -> dict:
+    return {
+        "n": len(values),
+        "mean": statistics.fmean(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
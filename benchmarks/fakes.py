@@ -0,0 +1,243 @@
+"""
+Neo4j et OpenAI factices, en mémoire, pour tester l'app sans réseau.
+
+`install()` remplace `neo4j.GraphDatabase.driver` et `openai.OpenAI` : les
+fabriques get_neo4j_client / get_openai_client de l'app (imports paresseux)
+renvoient alors ces doublures, sans autre modification du script.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import types
+from contextlib import ExitStack
+from unittest import mock
+
+from coach.catalog import CATALOG_QUERY
+from coach.feedback_sync import WRITE_SESSIONS_QUERY
+from coach.graph import SAFE_EXERCISES_QUERY
+from coach.reference import EQUIPMENT_KEYS, INJURY_MAP
+from coach.user_store import Neo4jUserBackend
+
+# Zones "neutres" ajoutées aux termes de INJURY_MAP pour les BodyPart synthétiques
+NEUTRAL_BODY_PARTS = ["chest", "biceps", "triceps", "quadriceps", "hamstrings", "abdominals", "lats", "calves"]
+
+
+def synthetic_catalog(size: int = 400, seed: int = 0) -> list:
+    """Lignes au format de CATALOG_QUERY (un tiers d'exercices au poids du corps)."""
+    rng = random.Random(seed)
+    risky = sorted({term for terms in INJURY_MAP.values() for term in terms})
+    rows = []
+    for i in range(size):
+        equipment = "Bodyweight" if rng.random() < 0.33 else rng.choice(EQUIPMENT_KEYS)
+        secondary = rng.choice([None, None, None, ["none"], [rng.choice(EQUIPMENT_KEYS)]])
+        parts = rng.sample(NEUTRAL_BODY_PARTS, 2)
+        if rng.random() < 0.4:
+            parts.append(rng.choice(risky))
+        rows.append({
+            "name": f"Exercise {i:04d}",
+            "name_fr": f"Exercice {i:04d}" if rng.random() < 0.7 else None,
+            "video": f"https://www.youtube.com/watch?v=fake{i:04d}" if rng.random() < 0.5 else None,
+            "image_url": None,
+            "equipment": equipment,
+            "equipment_secondary": secondary,
+            "body_parts": parts,
+        })
+    return rows
+
+
+# ========================= NEO4J =========================
+
+class FakeRecord(dict):
+    def data(self) -> dict:
+        return dict(self)
+
+
+class FakeResult(list):
+    def data(self) -> list:
+        return [dict(r) for r in self]
+
+    def single(self):
+        return self[0] if self else None
+
+    def consume(self):
+        return None
+
+
+class FakeSession:
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run(self, query, parameters=None, **kwargs):
+        return self._graph.run(query, {**(parameters or {}), **kwargs})
+
+    def execute_read(self, work, *args, **kwargs):
+        return work(self, *args, **kwargs)  # la session sert aussi de transaction
+
+    def execute_write(self, work, *args, **kwargs):
+        return work(self, *args, **kwargs)
+
+    def close(self):
+        pass
+
+
+class FakeGraph:
+    """
+    Driver Neo4j en mémoire : catalogue, requête historique, graphe non
+    matérialisé. Les écritures connues sont enregistrées : séances du
+    feedback (`sessions`, lignes de WRITE_SESSIONS_QUERY) et profils du
+    store Neo4j (`users`, relus par sa requête de chargement).
+    """
+
+    def __init__(self, rows: list, latency_sec: float = 0.0):
+        self.rows = rows
+        self.latency_sec = latency_sec
+        self.queries = 0
+        self.sessions = []   # lignes $rows de WRITE_SESSIONS_QUERY
+        self.users = {}      # user_id -> ligne de Neo4jUserBackend.SAVE_QUERY
+        self._lock = threading.Lock()
+
+    # API du driver
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+    def verify_connectivity(self):
+        pass
+
+    def close(self):
+        pass
+
+    def run(self, query: str, params: dict) -> FakeResult:
+        with self._lock:
+            self.queries += 1
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        if query == CATALOG_QUERY:
+            return FakeResult(FakeRecord(r) for r in self.rows)
+        if query == SAFE_EXERCISES_QUERY:
+            return FakeResult(FakeRecord(r) for r in self._safe_rows(params))
+        if query.startswith("RETURN 1"):
+            return FakeResult([FakeRecord(ok=1)])
+        if query == WRITE_SESSIONS_QUERY:
+            with self._lock:
+                self.sessions.extend(params["rows"])
+            return FakeResult()
+        if query == Neo4jUserBackend.SAVE_QUERY:
+            with self._lock:
+                self.users.update((r["user_id"], r) for r in params["rows"])
+            return FakeResult()
+        if query == Neo4jUserBackend.LOAD_QUERY:
+            user = self.users.get(params["user_id"])
+            fields = ("user_profile", "last_feedback", "sessions_done", "weekly_program")
+            return FakeResult([FakeRecord({k: user[k] for k in fields})] if user else [])
+        return FakeResult()  # MATERIALIZED_VERSION_QUERY : graphe non matérialisé
+
+    def _safe_rows(self, params: dict) -> list:
+        equipment = set(params["equipment"])
+        banned = params["banned_terms"]
+        out = []
+        for r in self.rows:
+            secondary = r["equipment_secondary"] or ["none"]
+            if r["equipment"].lower() not in equipment:
+                continue
+            if not all(s.lower() in equipment or s.lower() == "none" for s in secondary):
+                continue
+            if any(term in part.lower() for part in r["body_parts"] for term in banned):
+                continue
+            out.append({k: r[k] for k in ("name", "name_fr", "video", "image_url", "equipment", "body_parts")})
+        return sorted(out, key=lambda r: r["name"])
+
+
+# ========================= OPENAI =========================
+
+_EXERCISE_LIST = re.compile(r"^\[\{\"id\".*\]$", re.MULTILINE)
+
+
+class FakeCompletions:
+    def __init__(self, llm):
+        self._llm = llm
+
+    def create(self, model: str, messages: list, stream: bool = False, **kwargs):
+        return self._llm.complete(messages, stream)
+
+
+class FakeOpenAI:
+    """
+    Client OpenAI factice : profil ou séance JSON selon le prompt système.
+    `latency_sec` = durée totale d'une complétion (étalée sur les morceaux en streaming),
+    `exercises` et `instruction_words` règlent la taille de la réponse.
+    """
+
+    def __init__(self, latency_sec: float = 1.0, exercises: int = 8, instruction_words: int = 20, chunk_chars: int = 12):
+        self.latency_sec = latency_sec
+        self.exercises = exercises
+        self.instruction_words = instruction_words
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = types.SimpleNamespace(completions=FakeCompletions(self))
+
+    def __call__(self, *args, **kwargs):
+        # Remplace la classe openai.OpenAI : "instancier" renvoie ce client partagé
+        return self
+
+    def complete(self, messages: list, stream: bool):
+        with self._lock:
+            self.calls += 1
+        if "Analyste" in messages[0]["content"]:
+            content = json.dumps({"equipment": ["Bodyweight"], "injuries": ["Aucune"], "goals": ["Forme"]})
+        else:
+            content = json.dumps(self._plan(messages[-1]["content"]), ensure_ascii=False)
+        usage = types.SimpleNamespace(
+            prompt_tokens=sum(len(m["content"]) for m in messages) // 4,
+            completion_tokens=len(content) // 4,
+        )
+        if stream:
+            return self._stream(content, usage)
+        time.sleep(self.latency_sec)
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+
+    def _plan(self, user_msg: str) -> dict:
+        match = _EXERCISE_LIST.search(user_msg)
+        available = len(json.loads(match.group(0))) if match else 0
+        ids = [i % available + 1 for i in range(self.exercises)] if available else []
+        instruction = " ".join(["Contrôle"] * self.instruction_words)
+
+        def item(idx):
+            return {"id": idx, "sets": 3, "reps": "10", "duration_min": None, "rest_sec": 60, "instruction": instruction}
+
+        return {
+            "strategie": ["Séance de musculation progressive.", "Repos respectés."],
+            "seance": {
+                "echauffement": [item(i) for i in ids[:1]],
+                "corps": [item(i) for i in ids[1:-1]],
+                "retour_calme": [item(i) for i in ids[-1:]],
+            },
+            "mot_fin": "Bravo pour ta séance !",
+        }
+
+    def _stream(self, content: str, usage):
+        pieces = [content[i:i + self.chunk_chars] for i in range(0, len(content), self.chunk_chars)]
+        pause = self.latency_sec / max(len(pieces), 1)
+        for piece in pieces:
+            time.sleep(pause)
+            delta = types.SimpleNamespace(content=piece)
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)], usage=None)
+        yield types.SimpleNamespace(choices=[], usage=usage)
+
+
+def install(graph: FakeGraph, llm: FakeOpenAI) -> ExitStack:
+    """Branche les doublures ; à utiliser comme context manager (`with install(...):`)."""
+    stack = ExitStack()
+    stack.enter_context(mock.patch("neo4j.GraphDatabase.driver", lambda *args, **kwargs: graph))
+    stack.enter_context(mock.patch("openai.OpenAI", llm))
+    return stack
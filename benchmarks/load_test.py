@@ -0,0 +1,285 @@
+"""
+Test de charge hors ligne : N sessions simulées parcourent toute l'app
+(onboarding -> check-in -> séance -> feedback) via AppTest, avec un Neo4j et
+un OpenAI factices (cf. benchmarks/fakes.py).
+
+    python -m benchmarks.load_test                                  # 20 sessions, 4 en parallèle
+    python -m benchmarks.load_test --sessions 100 --concurrency 16 --llm-latency 2.5
+    python -m benchmarks.load_test --secret PLAN_CACHE=false        # réglages de l'app (secrets)
+
+Rapporte la latence du check-in (p50/p95/p99), celle de chaque étape, le
+nombre de reruns par seconde et le temps CPU serveur par session.
+
+Une session n'est réussie que si ses écritures différées arrivent dans le
+Neo4j factice (séance du feedback, profil du store Neo4j) et qu'aucun
+avertissement n'est journalisé par l'app (loggers "coach").
+
+AppTest n'est pas thread-safe (runtime factice global) : la concurrence est
+obtenue avec `--concurrency` process, chacun jouant ses sessions à la suite
+avec ses propres ressources partagées (caches, snapshot), comme autant de
+réplicas de l'app.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks import fakes
+from benchmarks.common import APP_PATH, make_apptest, summarize
+
+ONBOARDING_ANSWERS = {
+    "goals": [
+        "Je veux prendre du muscle et perdre un peu de ventre.",
+        "Améliorer mon cardio, je suis vite essoufflé.",
+        "Rester en forme et gagner en mobilité pour ma santé.",
+        "Devenir plus fort sur les mouvements de base, un peu comme en powerlifting.",
+    ],
+    "equipment": [
+        "Rien, je m'entraîne à la maison.",
+        "Une salle de sport avec tout le matériel.",
+        "Des haltères et un banc.",
+        "Des élastiques et une barre de traction, mais il manque des poids.",
+    ],
+    "pain": [
+        "",
+        "Rien à signaler.",
+        "Douleur au genou droit en descente d'escalier.",
+        "Un peu mal au bas du dos quand je reste assis, et l'épaule gauche fragile.",
+    ],
+}
+
+# Délai max d'arrivée des écritures différées (feedback, profil) après la dernière page
+WRITE_BACK_TIMEOUT_SEC = 5.0
+
+CHECKIN_CONTEXTS = {
+    # Contexte par défaut : peut profiter de la séance pré-générée
+    "default": {"time": 30, "energy": 6},
+    "random": None,
+}
+
+
+class SessionRun:
+    """Une session utilisateur : un AppTest, des interactions chronométrées."""
+
+    def __init__(self, at, rng: random.Random):
+        self.at = at
+        self.rng = rng
+        self.timings = {}
+        self.reruns = 0
+
+    def interact(self, step: str, action=None):
+        started = time.perf_counter()
+        if action is not None:
+            action()
+        self.at.run()
+        self.timings[step] = time.perf_counter() - started
+        self.reruns += 1
+        if self.at.exception:
+            raise RuntimeError(f"{step} : {self.at.exception[0].message}")
+
+    def button(self, label_prefix: str):
+        return next(b for b in self.at.button if b.label.startswith(label_prefix))
+
+    def expect_page(self, page: str):
+        current = self.at.session_state["page"]
+        if current != page:
+            errors = [e.value for e in self.at.error]
+            raise RuntimeError(f"page {current!r} au lieu de {page!r} {errors}")
+
+    def play(self, context_mode: str):
+        at, rng = self.at, self.rng
+        self.interact("intro")
+        self.interact("goals", lambda: self.button("Suivant").click())
+        self.interact("equipment", lambda: (
+            at.text_area[0].input(rng.choice(ONBOARDING_ANSWERS["goals"])),
+            self.button("Suivant").click(),
+        ))
+        self.interact("schedule_pain", lambda: (
+            at.text_area[0].input(rng.choice(ONBOARDING_ANSWERS["equipment"])),
+            self.button("Suivant").click(),
+        ))
+        self.interact("profile", lambda: (
+            at.text_area[0].input(rng.choice(ONBOARDING_ANSWERS["pain"])),
+            self.button("Lancer").click(),
+        ))
+        self.interact("confirm", lambda: self.button("Oui").click())
+        self.expect_page("checkin")
+
+        def fill_checkin():
+            context = CHECKIN_CONTEXTS[context_mode] or {
+                "time": rng.randrange(15, 95, 5),
+                "energy": rng.randint(1, 10),
+            }
+            at.slider[0].set_value(context["time"])
+            at.slider[1].set_value(context["energy"])
+            self.button("GÉNÉRER").click()
+
+        self.interact("checkin", fill_checkin)
+        self.expect_page("workout")
+        self.interact("finish", lambda: self.button("J'AI FINI").click())
+        self.interact("feedback", lambda: self.button("Envoyer").click())
+        self.expect_page("home")
+
+
+# ---------- process de travail ----------
+
+_worker = {}
+
+
+class WarningLog(logging.Handler):
+    """Avertissements et erreurs de l'app (loggers "coach") pendant une session."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def wait_write_back(graph, user_id: str) -> str | None:
+    """None si la séance et le profil de `user_id` sont arrivés dans le Neo4j factice, sinon ce qui manque."""
+    deadline = time.perf_counter() + WRITE_BACK_TIMEOUT_SEC
+    while True:
+        missing = []
+        secrets = _worker["secrets"]
+        if secrets.get("FEEDBACK_SYNC", True) and not any(r["user_id"] == user_id for r in list(graph.sessions)):
+            missing.append("séance (Session/INCLUDED)")
+        if secrets.get("USER_STORE") == "neo4j" and user_id not in graph.users:
+            missing.append("profil (store Neo4j)")
+        if not missing or time.perf_counter() > deadline:
+            return ", ".join(missing) or None
+        time.sleep(0.05)
+
+
+def init_worker(args, secrets: dict):
+    """Branche les doublures dans le process, puis une session d'échauffement hors mesure."""
+    graph = fakes.FakeGraph(fakes.synthetic_catalog(args.catalog_size, args.seed), latency_sec=args.neo4j_latency)
+    llm = fakes.FakeOpenAI(args.llm_latency, args.llm_exercises, args.llm_instruction_words)
+    # Un journal de feedback par process : chaque réplica vide le sien dans son Neo4j factice
+    secrets = {**secrets, "FEEDBACK_JOURNAL_PATH": f"{secrets['FEEDBACK_JOURNAL_PATH']}.{os.getpid()}"}
+    warnings = WarningLog()
+    logging.getLogger("coach").addHandler(warnings)
+    _worker.update(
+        args=args, secrets=secrets, graph=graph, llm=llm, warnings=warnings, patches=fakes.install(graph, llm),
+    )
+    run_session(-1)
+
+
+def run_session(index: int) -> dict:
+    args, graph, llm = _worker["args"], _worker["graph"], _worker["llm"]
+    session = SessionRun(make_apptest(APP_PATH, _worker["secrets"]), random.Random(args.seed + index))
+    calls, queries, written = llm.calls, graph.queries, len(graph.sessions)
+    warnings = _worker["warnings"]
+    warnings.messages.clear()
+    cpu_started, started = time.process_time(), time.perf_counter()
+    try:
+        session.play(args.context)
+        missing = wait_write_back(graph, session.at.session_state["user_id"])
+        if missing:
+            raise RuntimeError(f"écriture différée absente : {missing}")
+        if warnings.messages:
+            raise RuntimeError(f"{len(warnings.messages)} avertissement(s) : {warnings.messages[0]}")
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {
+        "timings": session.timings,
+        "reruns": session.reruns,
+        "wall_sec": time.perf_counter() - started,
+        "cpu_sec": time.process_time() - cpu_started,
+        "llm_calls": llm.calls - calls,
+        "neo4j_queries": graph.queries - queries,
+        "sessions_written": len(graph.sessions) - written,
+        "error": error,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="durée d'une complétion factice (s)")
+    parser.add_argument("--llm-exercises", type=int, default=8, help="exercices par séance générée")
+    parser.add_argument("--llm-instruction-words", type=int, default=20)
+    parser.add_argument("--neo4j-latency", type=float, default=0.02, help="latence par requête Cypher (s)")
+    parser.add_argument("--catalog-size", type=int, default=400)
+    parser.add_argument("--context", choices=sorted(CHECKIN_CONTEXTS), default="random")
+    parser.add_argument("--secret", action="append", default=[], metavar="CLÉ=VALEUR",
+                        help="réglage de l'app (valeur JSON, ex: PLAN_CACHE=false)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="sortie JSON brute")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="coach_load_")
+    secrets = {
+        "PLAN_CACHE_PATH": os.path.join(workdir, "plans.sqlite3"),
+        "USER_STORE_PATH": os.path.join(workdir, "users.sqlite3"),
+        "FEEDBACK_JOURNAL_PATH": os.path.join(workdir, "feedback_journal.sqlite3"),
+        # Écritures différées dans le Neo4j factice, vidées vite pour être vérifiées à chaque session
+        "USER_STORE": "neo4j",
+        "USER_STORE_FLUSH_SEC": 0.2,
+        "FEEDBACK_FLUSH_SEC": 0.2,
+    }
+    for item in args.secret:
+        key, _, value = item.partition("=")
+        try:
+            secrets[key] = json.loads(value)
+        except ValueError:
+            secrets[key] = value
+
+    # Fonctions référencées par leur module importable : AppTest remplace sys.modules["__main__"]
+    from benchmarks import load_test as worker
+
+    with ProcessPoolExecutor(
+        max_workers=args.concurrency,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=worker.init_worker,
+        initargs=(args, secrets),
+    ) as pool:
+        # Attendre que chaque process ait fini son échauffement avant de chronométrer
+        list(pool.map(time.sleep, [0.5] * args.concurrency))
+        wall_started = time.perf_counter()
+        results = list(pool.map(worker.run_session, range(args.sessions)))
+        wall_sec = time.perf_counter() - wall_started
+
+    ok = [r for r in results if r["error"] is None]
+    steps = list(ok[0]["timings"]) if ok else []
+    report = {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "errors": [r["error"] for r in results if r["error"] is not None],
+        "checkin": summarize([r["timings"]["checkin"] for r in ok]),
+        "steps": {step: summarize([r["timings"][step] for r in ok]) for step in steps},
+        "reruns_per_sec": sum(r["reruns"] for r in results) / wall_sec,
+        "cpu_sec_per_session": summarize([r["cpu_sec"] for r in results]),
+        "wall_sec": wall_sec,
+        "llm_calls": sum(r["llm_calls"] for r in results),
+        "neo4j_queries": sum(r["neo4j_queries"] for r in results),
+        "sessions_written": sum(r["sessions_written"] for r in results),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    print(f"{args.sessions} sessions, {args.concurrency} en parallèle, {wall_sec:.1f} s, "
+          f"{len(report['errors'])} erreur(s)")
+    print(f"{'étape':<15}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}")
+    for step, stats in report["steps"].items():
+        print(f"{step:<15}{stats['p50'] * 1000:>10.0f}{stats['p95'] * 1000:>10.0f}{stats['p99'] * 1000:>10.0f}")
+    print(f"reruns/s : {report['reruns_per_sec']:.1f} • CPU serveur / session : "
+          f"{report['cpu_sec_per_session']['mean'] * 1000:.0f} ms • appels LLM : {report['llm_calls']} • "
+          f"requêtes Neo4j : {report['neo4j_queries']} • séances écrites : {report['sessions_written']}")
+    for error in report["errors"][:5]:
+        print(f"  ! {error}")
+
+
+if __name__ == "__main__":
+    main()
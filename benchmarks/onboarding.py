@@ -0,0 +1,60 @@
+"""
+Temps serveur par étape d'onboarding (premier affichage, effet machine à écrire compris).
+
+    python -m benchmarks.onboarding                     # version courante
+    python -m benchmarks.onboarding --baseline HEAD~1   # + comparaison avec une révision git
+"""
+
+import argparse
+import time
+
+from benchmarks.common import APP_PATH, app_at_revision, make_apptest, summarize
+
+# Étape -> drapeau "déjà tapé" remis à False pour forcer l'animation
+STEPS = {
+    "intro": "intro_typed",
+    "goals": "typed_goals",
+    "equipment": "typed_equipment",
+    "schedule_pain": "typed_schedule_pain",
+}
+
+
+def time_step(app_path: str, step: str, flag: str) -> float:
+    at = make_apptest(app_path)
+    at.session_state["page"] = "onboarding"
+    at.session_state["onboarding_step"] = step
+    at.session_state["user_profile"] = {"age": 30, "level": "Beginner"}
+    at.session_state[flag] = False
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    if at.exception:
+        raise RuntimeError(f"{step} : {at.exception[0].message}")
+    return elapsed
+
+
+def measure(app_path: str, repeat: int) -> dict:
+    time_step(app_path, "summary", "intro_typed")  # échauffement : imports hors mesure
+    return {
+        step: summarize([time_step(app_path, step, flag) for _ in range(repeat)])
+        for step, flag in STEPS.items()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", help="révision git à comparer (ex: HEAD~1)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    current = measure(APP_PATH, args.repeat)
+    before = measure(app_at_revision(args.baseline), args.repeat) if args.baseline else None
+
+    print(f"{'étape':<15}{'avant (ms)':>12}{'après (ms)':>12}")
+    for step, stats in current.items():
+        prev = f"{before[step]['p50'] * 1000:.0f}" if before else "-"
+        print(f"{step:<15}{prev:>12}{stats['p50'] * 1000:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark de la page séance : parsing du plan puis rendu à chaque rerun.
+
+  - parse  : JSON du modèle -> réhydratation -> Plan (coach/plan.py),
+             une seule fois par séance générée ;
+  - rerun  : un rerun de la page séance (AppTest) avec le plan en session,
+             ce que paie chaque clic (chrono, case "Fait", ouverture de carte).
+
+    python -m benchmarks.plan_render                     # version courante
+    python -m benchmarks.plan_render --baseline HEAD~1   # + révision d'avant (plan en dict)
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks import fakes
+from benchmarks.common import APP_PATH, app_at_revision, make_apptest, summarize
+from coach.llm import encode_exercises_for_prompt, hydrate_plan
+from coach.plan import parse_plan
+
+
+def model_output(exercises: int, instruction_words: int) -> tuple:
+    """(texte JSON tel que renvoyé par le modèle, exercices sûrs proposés)."""
+    valid = fakes.synthetic_catalog(40)
+    llm = fakes.FakeOpenAI(exercises=exercises, instruction_words=instruction_words)
+    prompt = json.dumps(encode_exercises_for_prompt(valid))
+    return json.dumps(llm._plan(prompt), ensure_ascii=False), valid
+
+
+def bench_parse(content: str, valid: list, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse_plan(hydrate_plan(json.loads(content), valid))
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def bench_rerun(app_path: str, plan, reruns: int) -> dict:
+    at = make_apptest(app_path, secrets={"NEO4J_WARM_UP": False})
+    at.session_state["page"] = "workout"
+    at.session_state["workout_plan"] = plan
+    at.session_state["session_time"] = 30
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    samples = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", help="révision git à comparer (ex: HEAD~1)")
+    parser.add_argument("--exercises", type=int, default=10)
+    parser.add_argument("--instruction-words", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=2000, help="parsings mesurés")
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    content, valid = model_output(args.exercises, args.instruction_words)
+    plan = parse_plan(hydrate_plan(json.loads(content), valid))
+
+    parse = bench_parse(content, valid, args.repeat)
+    print(f"parse (une fois par séance) : p50 {parse['p50'] * 1e6:.0f} µs, p95 {parse['p95'] * 1e6:.0f} µs")
+
+    print(f"{'rerun page séance':<22}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+    rows = [("après", APP_PATH, plan)]
+    if args.baseline:
+        # Révision d'avant : le plan vivait en session sous forme de dict
+        rows.insert(0, ("avant", app_at_revision(args.baseline), plan.to_dict()))
+    for label, app_path, session_plan in rows:
+        rerun = bench_rerun(app_path, session_plan, args.reruns)
+        print(f"{label:<22}{rerun['p50'] * 1000:>10.1f}{rerun['p95'] * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Mémoire par session : octets retenus par l'état d'une session après le
+check-in (séance, tables d'affichage, programme de la semaine), pour N
+utilisateurs simulés.
+
+Chaque utilisateur reçoit l'une de `--variants` séances (mêmes profil et
+contexte = même séance, comme avec le cache de séances) : le texte JSON du
+modèle est relu et réhydraté pour chaque session, comme à chaque check-in,
+et le programme de la semaine (`--program-sessions` séances) est relu du
+stockage utilisateur (JSON), comme à la reprise d'une session.
+Chaque mesure tourne dans un process neuf (tracemalloc) : les tables
+partagées du process (fiches d'exercices, séances partagées) sont comptées
+dans le total, puis divisées par le nombre de sessions.
+
+  - après : coach/plan.py courant, la session ne garde que des séances
+            partagées (ids d'exercices, fiches dans coach.plan.EXERCISES),
+            programme compris ;
+  - avant : coach/plan.py d'une révision git, nom / vidéo / image copiés
+            dans chaque séance, tables nom -> nom FR / image en session et
+            programme gardé en JSON.
+
+    python -m benchmarks.session_memory                     # version courante, 100 et 1000 utilisateurs
+    python -m benchmarks.session_memory --baseline HEAD~1   # + révision d'avant
+"""
+
+import argparse
+import gc
+import importlib.util
+import json
+import multiprocessing
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks import fakes
+from benchmarks.common import file_at_revision
+
+CONTEXT = {"time": 30, "energy": 6, "daily_pain": ["Aucune"], "note": ""}
+
+
+def load_plan_module(path: str | None):
+    """coach.plan courant, ou celui d'un fichier extrait d'une révision."""
+    if path is None:
+        from coach import plan
+        return plan
+    spec = importlib.util.spec_from_file_location("coach_plan_baseline", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def model_outputs(variants: int, exercises: int, instruction_words: int, catalog_size: int) -> list:
+    """[(texte JSON du modèle, exercices sûrs proposés)] : une entrée par séance distincte."""
+    from coach.llm import encode_exercises_for_prompt
+
+    catalog = fakes.synthetic_catalog(catalog_size)
+    for i, row in enumerate(catalog):
+        row["image_url"] = f"https://cdn.example.org/exercises/{i:04d}.jpg"
+    llm = fakes.FakeOpenAI(exercises=exercises, instruction_words=instruction_words)
+    outputs = []
+    for variant in range(variants):
+        start = variant * 7 % catalog_size
+        valid = (catalog[start:] + catalog[:start])[:40]
+        plan = llm._plan(json.dumps(encode_exercises_for_prompt(valid)))
+        for items in plan["seance"].values():
+            for item in items:
+                item["instruction"] += f" (variante {variant})"
+        outputs.append((json.dumps(plan, ensure_ascii=False), valid))
+    return outputs
+
+
+def stored_programs(outputs: list, sessions: int) -> list:
+    """Programmes de la semaine tels que relus du stockage utilisateur (texte JSON), un par séance distincte."""
+    from coach.llm import hydrate_plan
+
+    plans = [hydrate_plan(json.loads(content), valid) for content, valid in outputs]
+    return [
+        json.dumps({
+            "version": 1,
+            "week": "2026-W42",
+            "profile": f"{variant:016x}",
+            "context": CONTEXT,
+            "sessions": [
+                {"focus": f"Séance {day + 1}", "source": "llm", "plan": plans[(variant + 17 * day) % len(plans)]}
+                for day in range(sessions)
+            ],
+            "next": 0,
+        }, ensure_ascii=False)
+        for variant in range(len(plans))
+    ]
+
+
+def session_state(plan_module, content: str, valid: list, program: str, legacy: bool) -> dict:
+    from coach.llm import hydrate_plan
+    from coach.weekly_program import program_plans
+
+    state = {
+        "workout_plan": plan_module.parse_plan(hydrate_plan(json.loads(content), valid)),
+        "session_time": CONTEXT["time"],
+        "workout_context": json.loads(json.dumps(CONTEXT)),
+        # Avant : programme gardé tel que relu (JSON) ; après : séances en Plan partagés
+        "weekly_program": json.loads(program) if legacy else program_plans(json.loads(program)),
+    }
+    if legacy:
+        state["exercise_name_map"] = {ex["name"]: ex.get("name_fr") for ex in valid}
+        state["exercise_image_map"] = {ex["name"]: ex.get("image_url") for ex in valid}
+    return state
+
+
+def measure(plan_path: str | None, legacy: bool, users: int, args) -> int:
+    """Octets alloués (et retenus) par `users` sessions, dans un process neuf."""
+    plan_module = load_plan_module(plan_path)
+    outputs = model_outputs(args.variants, args.exercises, args.instruction_words, args.catalog_size)
+    programs = stored_programs(outputs, args.program_sessions)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [
+        session_state(plan_module, *outputs[u % len(outputs)], programs[u % len(programs)], legacy)
+        for u in range(users)
+    ]
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    assert len(sessions) == users
+    return retained
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", help="révision git à comparer (ex: HEAD~1)")
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--variants", type=int, default=50, help="séances distinctes parmi les utilisateurs")
+    parser.add_argument("--exercises", type=int, default=10)
+    parser.add_argument("--program-sessions", type=int, default=3, help="séances du programme de la semaine")
+    parser.add_argument("--instruction-words", type=int, default=30)
+    parser.add_argument("--catalog-size", type=int, default=400)
+    parser.add_argument("--json", action="store_true", help="sortie JSON brute")
+    args = parser.parse_args(argv)
+
+    layouts = [("après", None, False)]
+    if args.baseline:
+        layouts.insert(0, ("avant", file_at_revision(args.baseline, "coach/plan.py"), True))
+
+    # Fonction référencée par son module importable (process "spawn")
+    from benchmarks import session_memory as worker
+
+    report = {}
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1,
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        for label, plan_path, legacy in layouts:
+            report[label] = {
+                users: pool.submit(worker.measure, plan_path, legacy, users, args).result() / users
+                for users in args.users
+            }
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    print(f"{'octets / session':<18}" + "".join(f"{f'{users} util.':>14}" for users in args.users))
+    for label, per_users in report.items():
+        print(f"{label:<18}" + "".join(f"{per_session:>14,.0f}" for per_session in per_users.values()))
+
+
+if __name__ == "__main__":
+    main()
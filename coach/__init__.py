@@ -0,0 +1 @@
+"""Briques backend du Coach IA (sans dépendance à Streamlit)."""
@@ -0,0 +1,307 @@
+"""
+Snapshot mémoire du catalogue d'exercices.
+
+Le catalogue `GRAPH_TAG` est chargé une seule fois depuis Neo4j (exercices,
+parties du corps ciblées, matériel principal et secondaire). Pour chaque
+exercice on précalcule :
+  - un masque "blessures" : bit k = l'exercice cible une zone de INJURY_MAP[k],
+  - un masque "matériel"  : bit j = l'exercice nécessite le matériel j.
+Le filtre des exercices sûrs devient alors deux opérations bit à bit vectorisées.
+Les caractéristiques de classement (coach/ranking.py) sont aussi calculées au
+chargement : le top-K selon les objectifs est un seul produit matriciel.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from coach.ranking import exercise_features, top_k
+from coach.reference import ALWAYS_AVAILABLE_EQUIPMENT
+
+logger = logging.getLogger(__name__)
+
+# Bit réservé au matériel inconnu / absent : jamais accordé à l'utilisateur
+UNKNOWN_EQUIPMENT_BIT = 63
+
+CATALOG_QUERY = """
+MATCH (e:Exercise)
+WHERE e.graph_tag = $graph_tag
+OPTIONAL MATCH (e)-[:TARGETS]->(b:BodyPart)
+RETURN
+  e.name                AS name,
+  e.name_fr             AS name_fr,
+  e.video               AS video,
+  e.image_url           AS image_url,
+  e.equipment           AS equipment,
+  e.equipment_secondary AS equipment_secondary,
+  collect(DISTINCT b.name) AS body_parts
+ORDER BY name
+"""
+
+# Champs renvoyés aux pages (même forme que la requête Neo4j historique)
+EXERCISE_FIELDS = ("name", "name_fr", "video", "image_url")
+
+
+class CatalogSnapshot:
+    """Catalogue figé + masques précalculés. Lecture seule, partageable entre sessions."""
+
+    def __init__(self, rows: list, injury_map: dict, equipment_keys: list):
+        self.injury_keys = list(injury_map.keys())
+        self.injury_bits = {key: 1 << i for i, key in enumerate(self.injury_keys)}
+
+        # Vocabulaire matériel : EQUIPMENT_KEYS d'abord, puis les valeurs observées
+        vocab = [eq.lower() for eq in equipment_keys]
+        for row in rows:
+            for eq in [row.get("equipment")] + list(row.get("equipment_secondary") or []):
+                if isinstance(eq, str) and eq.lower() not in vocab:
+                    vocab.append(eq.lower())
+        vocab = [eq for eq in vocab if eq != "none"]
+        if len(vocab) > UNKNOWN_EQUIPMENT_BIT:
+            raise ValueError(f"Trop de matériels distincts pour un masque 64 bits ({len(vocab)})")
+        self.equipment_bits = {eq: 1 << j for j, eq in enumerate(vocab)}
+
+        self.exercises = [{k: row.get(k) for k in EXERCISE_FIELDS} for row in rows]
+        # Même identifiant pour deux lignes identiques une fois projetées (DISTINCT)
+        keys = {}
+        self.key_ids = np.array(
+            [keys.setdefault(tuple(ex[k] for k in EXERCISE_FIELDS), len(keys)) for ex in self.exercises],
+            dtype=np.int64,
+        )
+        self.features, self.roles = exercise_features(rows)
+        self.injury_masks = np.array(
+            [self._injury_mask(row.get("body_parts") or [], injury_map) for row in rows],
+            dtype=np.uint64,
+        )
+        self.equipment_masks = np.array(
+            [self._equipment_mask(row) for row in rows],
+            dtype=np.uint64,
+        )
+        self.version = self._fingerprint(rows, injury_map)
+
+    def __len__(self):
+        return len(self.exercises)
+
+    # ---------- construction ----------
+
+    def _injury_mask(self, body_parts: list, injury_map: dict) -> int:
+        names = [b.lower() for b in body_parts if isinstance(b, str)]
+        mask = 0
+        for key, terms in injury_map.items():
+            if any(term.lower() in name for term in terms for name in names):
+                mask |= self.injury_bits[key]
+        return mask
+
+    def _equipment_mask(self, row: dict) -> int:
+        primary = row.get("equipment")
+        # coalesce(e.equipment_secondary, ['none'])
+        secondary = row.get("equipment_secondary")
+        if secondary is None:
+            secondary = ["none"]
+
+        mask = 0
+        for eq in [primary] + list(secondary):
+            if not isinstance(eq, str):
+                mask |= 1 << UNKNOWN_EQUIPMENT_BIT
+            else:
+                # 'none' n'a pas de bit : toujours disponible
+                mask |= self.equipment_bits.get(eq.lower(), 0)
+        return mask
+
+    @staticmethod
+    def _fingerprint(rows: list, injury_map: dict) -> str:
+        payload = json.dumps([rows, injury_map], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+    # ---------- requêtes ----------
+
+    def banned_mask(self, pain_points: list) -> int:
+        mask = 0
+        for injury in pain_points:
+            mask |= self.injury_bits.get(injury, 0)
+        return mask
+
+    def allowed_mask(self, equipment: list) -> int:
+        mask = 0
+        for eq in list(equipment) + ALWAYS_AVAILABLE_EQUIPMENT:
+            mask |= self.equipment_bits.get(eq.lower(), 0)
+        return mask
+
+    def safe_indices(self, equipment: list, pain_points: list) -> np.ndarray:
+        """Indices (ordre du catalogue) des exercices compatibles matériel + blessures."""
+        banned = np.uint64(self.banned_mask(pain_points))
+        missing = ~np.uint64(self.allowed_mask(equipment))
+        ok = ((self.injury_masks & banned) == 0) & ((self.equipment_masks & missing) == 0)
+        return np.flatnonzero(ok)
+
+    def safe_exercises(self, equipment: list, pain_points: list, limit: int | None = 40) -> list:
+        """Équivalent mémoire du filtre Cypher (RETURN DISTINCT, ordre du catalogue) ; `limit=None` = tous."""
+        indices = self._distinct(self.safe_indices(equipment, pain_points))
+        return [dict(self.exercises[i]) for i in indices[:limit]]
+
+    def ranked_exercises(self, equipment: list, pain_points: list, weights, budget: int, quotas: dict) -> list:
+        """Top `budget` des exercices sûrs, classés selon `weights` (cf. coach/ranking.py)."""
+        indices = self._distinct(self.safe_indices(equipment, pain_points))
+        picked = top_k(self.features[indices] @ weights, self.roles[indices], budget, quotas)
+        return [dict(self.exercises[i]) for i in indices[picked]]
+
+    def _distinct(self, indices: np.ndarray) -> np.ndarray:
+        """Première occurrence de chaque exercice, dans l'ordre du catalogue."""
+        _, first = np.unique(self.key_ids[indices], return_index=True)
+        return indices[np.sort(first)]
+
+
+def load_catalog_snapshot(read, graph_tag: str, injury_map: dict, equipment_keys: list) -> CatalogSnapshot:
+    """
+    Charge tout le catalogue `graph_tag` en une requête et construit le snapshot.
+    `read(query, params)` renvoie les lignes en dicts (cf. Neo4jClient.read).
+    """
+    rows = read(CATALOG_QUERY, {"graph_tag": graph_tag})
+    return CatalogSnapshot(rows, injury_map, equipment_keys)
+
+
+class CatalogStore:
+    """
+    Détient le snapshot courant pour tout le process.
+    Au-delà de `ttl_sec`, un seul thread recharge en fond pendant que les
+    autres continuent de servir l'ancien snapshot (lecture seule) ; en cas
+    d'échec on le garde, prochain essai un TTL plus tard. Seul le tout
+    premier chargement est synchrone (rien à servir en attendant).
+    """
+
+    def __init__(self, loader, ttl_sec: float = 600):
+        self._loader = loader
+        self._ttl_sec = ttl_sec
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        snap = self._snapshot
+        return snap.version if snap is not None else None
+
+    def _is_fresh(self) -> bool:
+        return time.time() - self._loaded_at < self._ttl_sec
+
+    def get(self):
+        """Retourne le snapshot (rechargé en fond s'il a expiré), ou None si indisponible."""
+        snap = self._snapshot
+        if snap is not None:
+            if not self._is_fresh():
+                self._start_reload()
+            return snap
+
+        with self._lock:
+            if self._snapshot is None:
+                self._load()
+            return self._snapshot
+
+    def _start_reload(self):
+        with self._lock:
+            if self._reloading or self._is_fresh():
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, name="catalog-reload", daemon=True).start()
+
+    def _reload(self):
+        try:
+            self._load()
+        finally:
+            self._reloading = False
+
+    def _load(self):
+        """Un seul appelant à la fois : verrou (1er chargement) ou drapeau `_reloading` (fond)."""
+        try:
+            self._snapshot = self._loader()
+        except Exception as e:
+            logger.warning("Chargement du catalogue impossible : %s", e)
+            if self._snapshot is None:
+                return
+        # Succès, ou échec avec un ancien snapshot : prochaine tentative un TTL plus tard
+        self._loaded_at = time.time()
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._loaded_at = 0.0
+
+
+class SafeExerciseCache:
+    """
+    Cache LRU process-wide des listes d'exercices sûrs.
+    Clé = (graph_tag, version du catalogue, matériel canonique, zones canoniques,
+    paramètres de classement).
+    Un changement de tag ou de version vide le cache.
+    """
+
+    def __init__(self, injury_map: dict, maxsize: int = 256):
+        self._injury_map = injury_map
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._scope = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def make_key(self, equipment: list, pain_points: list) -> tuple:
+        """Normalise les contraintes : ordre, casse, doublons et valeurs sans effet ignorés."""
+        equip = sorted(
+            {eq.lower() for eq in equipment if isinstance(eq, str)} - set(ALWAYS_AVAILABLE_EQUIPMENT)
+        )
+        pains = sorted({p for p in pain_points if self._injury_map.get(p)})
+        return tuple(equip), tuple(pains)
+
+    def get_or_compute(self, graph_tag: str, version, equipment: list, pain_points: list, compute, ranking=None) -> list:
+        scope = (graph_tag, version)
+        key = (*self.make_key(equipment, pain_points), ranking)
+
+        with self._lock:
+            if scope != self._scope:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._scope = scope
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return [dict(ex) for ex in cached]
+            self.misses += 1
+
+        result = compute()
+        if not result:
+            # Liste vide = contraintes trop fortes ou erreur Neo4j : on ne fige rien
+            return result
+
+        with self._lock:
+            if scope == self._scope:
+                self._entries[key] = [dict(ex) for ex in result]
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self._maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
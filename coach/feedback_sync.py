@@ -0,0 +1,203 @@
+"""
+Historique des séances écrit dans le graphe, en tâche de fond.
+
+Chaque feedback devient :
+    (:User)-[:DID]->(:Session {ressenti, ...})-[:INCLUDED {section, ...}]->(:Exercise)
+
+Le script Streamlit ne fait qu'ajouter une ligne au journal (SQLite local) ;
+un thread de fond vide le journal par lots avec une seule requête UNWIND,
+et ne supprime les lignes qu'une fois l'écriture Neo4j réussie. Après un
+crash, les feedbacks non écrits sont repris au démarrage suivant ; le
+MERGE sur l'id de séance rend la reprise idempotente.
+"""
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback_journal (
+    id         TEXT    PRIMARY KEY,
+    payload    TEXT    NOT NULL,
+    created_at REAL    NOT NULL
+)
+"""
+
+WRITE_SESSIONS_QUERY = """
+UNWIND $rows AS r
+MERGE (u:User {id: r.user_id})
+MERGE (s:Session {id: r.session_id})
+ON CREATE SET s.created_at = datetime({epochMillis: r.created_ms})
+SET s.ressenti = r.ressenti,
+    s.instructions_claires = r.instructions_claires,
+    s.adapte_besoin = r.adapte_besoin,
+    s.message = r.message,
+    s.time_min = r.time,
+    s.energy = r.energy
+MERGE (u)-[:DID]->(s)
+WITH s, r
+UNWIND r.exercises AS ex
+MATCH (e:Exercise {graph_tag: $graph_tag, name: ex.name})
+MERGE (s)-[i:INCLUDED]->(e)
+SET i.section = ex.section,
+    i.position = ex.position,
+    i.sets = ex.sets,
+    i.reps = ex.reps,
+    i.duration_min = ex.duration_min
+"""
+
+
+def plan_exercises(plan) -> list:
+    """Exercices d'une séance (dict de sections ou liste), dans l'ordre d'affichage."""
+    seance = plan.get("seance") if isinstance(plan, dict) else None
+    if isinstance(seance, list):
+        seance = {"corps": seance}
+    if not isinstance(seance, dict):
+        return []
+    out = []
+    for section, items in seance.items():
+        for position, ex in enumerate(items if isinstance(items, list) else []):
+            if isinstance(ex, dict) and ex.get("name"):
+                out.append({
+                    "name": ex["name"],
+                    "section": section,
+                    "position": position,
+                    "sets": ex.get("sets"),
+                    "reps": None if ex.get("reps") is None else str(ex.get("reps")),
+                    "duration_min": ex.get("duration_min"),
+                })
+    return out
+
+
+class FeedbackQueue:
+    """
+    File d'attente journalisée. `write(query, params)` exécute l'écriture
+    (cf. Neo4jClient.write) ; en cas d'échec, nouvel essai avec un délai
+    croissant, les lignes restent dans le journal.
+    """
+
+    def __init__(
+        self,
+        journal_path: str,
+        write,
+        graph_tag: str,
+        flush_interval_sec: float = 5.0,
+        max_batch: int = 100,
+        max_backoff_sec: float = 300.0,
+    ):
+        if os.path.dirname(journal_path):
+            os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+        self._conn = sqlite3.connect(journal_path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(JOURNAL_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        self._write = write
+        self.graph_tag = graph_tag
+        self.flush_interval_sec = flush_interval_sec
+        self.max_batch = max_batch
+        self.max_backoff_sec = max_backoff_sec
+
+        self._wake = threading.Event()
+        self._closed = False
+        self._failures = 0
+        self.written = 0
+        self.flush_errors = 0
+
+        self._thread = threading.Thread(target=self._run, name="coach-feedback-sync", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, user_id: str, feedback: dict, context: dict, plan) -> str:
+        """Ajoute un feedback au journal (quelques ms) ; renvoie l'id de la séance."""
+        session_id = uuid.uuid4().hex
+        row = {
+            "user_id": user_id,
+            "session_id": session_id,
+            "created_ms": int(time.time() * 1000),
+            "ressenti": feedback.get("ressenti"),
+            "instructions_claires": bool(feedback.get("instructions_claires")),
+            "adapte_besoin": bool(feedback.get("adapte_besoin")),
+            "message": feedback.get("message") or "",
+            "time": context.get("time"),
+            "energy": context.get("energy"),
+            "exercises": plan_exercises(plan),
+        }
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO feedback_journal (id, payload, created_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(row, ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+            pending = self._pending_count()
+        if pending >= self.max_batch:
+            self._wake.set()
+        return session_id
+
+    def flush(self) -> int:
+        """Écrit le journal par lots ; renvoie le nombre de séances écrites (exception si échec)."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._conn.execute(
+                        "SELECT id, payload FROM feedback_journal ORDER BY created_at LIMIT ?",
+                        (self.max_batch,),
+                    ).fetchall()
+                if not batch:
+                    return written
+                self._write(WRITE_SESSIONS_QUERY, {
+                    "graph_tag": self.graph_tag,
+                    "rows": [json.loads(payload) for _, payload in batch],
+                })
+                with self._lock:
+                    self._conn.executemany("DELETE FROM feedback_journal WHERE id = ?", [(i,) for i, _ in batch])
+                    self._conn.commit()
+                    self.written += len(batch)
+                written += len(batch)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+
+    # ---------- interne ----------
+
+    def _pending_count(self) -> int:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM feedback_journal").fetchone()
+        return count
+
+    def _run(self):
+        while not self._closed:
+            # Après des échecs : 2x, 4x, 8x... l'intervalle (plafonné)
+            delay = min(self.flush_interval_sec * 2 ** self._failures, self.max_backoff_sec)
+            self._wake.wait(delay)
+            self._wake.clear()
+            try:
+                self.flush()
+                self._failures = 0
+            except Exception as e:
+                self._failures += 1
+                self.flush_errors += 1
+                logger.warning("Historique des séances non écrit (nouvel essai plus tard) : %s", e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending_count()
+        return {
+            "pending": pending,
+            "written": self.written,
+            "flush_errors": self.flush_errors,
+        }
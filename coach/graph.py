@@ -0,0 +1,252 @@
+"""
+Requêtes "exercices sûrs" et maintenance du graphe Neo4j.
+
+La requête historique filtre les blessures avec un `CONTAINS` sur chaque
+BodyPart et un `toLower()` ligne à ligne : aucun index n'est utilisable.
+La commande de maintenance matérialise une fois pour toutes :
+  - (:Exercise)-[:UNSAFE_FOR]->(:InjuryZone) à partir de INJURY_MAP,
+  - e.equipment_lc / e.equipment_secondary_lc (matériel en minuscules),
+  - les index sur graph_tag et (graph_tag, equipment_lc),
+et la requête devient un anti-join piloté par index.
+Les deux requêtes renvoient tous les exercices sûrs, triés par nom, avec
+matériel et parties du corps : le top-K est choisi côté app (coach/ranking.py).
+
+Usage :
+    python -m coach.graph              # matérialise + affiche les db hits avant/après
+    python -m coach.graph --profile    # compare seulement les db hits
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tomllib
+
+from coach.reference import (
+    ALWAYS_AVAILABLE_EQUIPMENT,
+    GRAPH_TAG,
+    INJURY_MAP,
+    NEO4J_DB,
+)
+
+# Marqueur pour les matériels absents (null) : jamais disponible
+UNKNOWN_EQUIPMENT = "__unknown__"
+
+SAFE_EXERCISES_QUERY = """
+MATCH (e:Exercise)
+WHERE e.graph_tag = $graph_tag
+  AND toLower(e.equipment) IN $equipment
+  AND ALL(sec IN coalesce(e.equipment_secondary, ['none'])
+          WHERE toLower(sec) IN $equipment OR toLower(sec) = 'none')
+  AND NOT EXISTS {
+      MATCH (e)-[:TARGETS]->(b:BodyPart)
+      WHERE any(term IN $banned_terms WHERE toLower(b.name) CONTAINS term)
+  }
+RETURN DISTINCT
+  e.name       AS name,
+  e.name_fr    AS name_fr,
+  e.video      AS video,
+  e.image_url  AS image_url,
+  e.equipment  AS equipment,
+  [(e)-[:TARGETS]->(b:BodyPart) | b.name] AS body_parts
+ORDER BY name
+"""
+
+SAFE_EXERCISES_MATERIALIZED_QUERY = """
+MATCH (e:Exercise)
+WHERE e.graph_tag = $graph_tag
+  AND e.equipment_lc IN $equipment
+  AND ALL(sec IN e.equipment_secondary_lc WHERE sec IN $equipment)
+  AND NOT EXISTS {
+      MATCH (e)-[:UNSAFE_FOR]->(z:InjuryZone)
+      WHERE z.name IN $zones
+  }
+RETURN DISTINCT
+  e.name       AS name,
+  e.name_fr    AS name_fr,
+  e.video      AS video,
+  e.image_url  AS image_url,
+  e.equipment  AS equipment,
+  [(e)-[:TARGETS]->(b:BodyPart) | b.name] AS body_parts
+ORDER BY name
+"""
+
+MATERIALIZED_VERSION_QUERY = """
+MATCH (m:CatalogMaintenance {graph_tag: $graph_tag})
+RETURN m.injury_map_version AS version
+"""
+
+SCHEMA_STATEMENTS = [
+    "CREATE INDEX exercise_graph_tag IF NOT EXISTS FOR (e:Exercise) ON (e.graph_tag)",
+    "CREATE INDEX exercise_tag_equipment IF NOT EXISTS FOR (e:Exercise) ON (e.graph_tag, e.equipment_lc)",
+    "CREATE CONSTRAINT injury_zone_name IF NOT EXISTS FOR (z:InjuryZone) REQUIRE z.name IS UNIQUE",
+]
+
+
+def injury_map_version(injury_map: dict = INJURY_MAP) -> str:
+    """Empreinte de INJURY_MAP : les arêtes UNSAFE_FOR ne valent que pour cette version."""
+    payload = json.dumps(injury_map, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def safe_query_params(equipment: list, pain_points: list, materialized: bool, injury_map: dict = INJURY_MAP) -> dict:
+    """Paramètres de la requête historique ou matérialisée."""
+    params = {
+        "graph_tag": GRAPH_TAG,
+        "equipment": [eq.lower() for eq in equipment] + ALWAYS_AVAILABLE_EQUIPMENT,
+    }
+    if materialized:
+        params["zones"] = [p for p in pain_points if injury_map.get(p)]
+    else:
+        params["banned_terms"] = [
+            term.lower() for p in pain_points for term in injury_map.get(p, [])
+        ]
+    return params
+
+
+def is_materialized(read, graph_tag: str = GRAPH_TAG, injury_map: dict = INJURY_MAP) -> bool:
+    """
+    Vrai si la maintenance a été jouée pour ce tag ET la version courante de INJURY_MAP.
+    `read(query, params)` renvoie les lignes en dicts (cf. Neo4jClient.read).
+    """
+    rows = read(MATERIALIZED_VERSION_QUERY, {"graph_tag": graph_tag})
+    return bool(rows) and rows[0]["version"] == injury_map_version(injury_map)
+
+
+# ========================= MAINTENANCE =========================
+
+def materialize(session, graph_tag: str = GRAPH_TAG, injury_map: dict = INJURY_MAP) -> dict:
+    """
+    Crée index, propriétés en minuscules et arêtes UNSAFE_FOR. Idempotent.
+    Les index se créent à part (pas de schéma dans une transaction d'écriture) ;
+    le reste est une seule transaction : une requête de l'app voit soit les
+    anciennes arêtes avec l'ancien marqueur, soit les nouvelles, jamais un
+    ensemble à moitié reconstruit.
+    """
+    for stmt in SCHEMA_STATEMENTS:
+        session.run(stmt).consume()
+    return session.execute_write(_rebuild_unsafe_edges, graph_tag, injury_map)
+
+
+def _rebuild_unsafe_edges(tx, graph_tag: str, injury_map: dict) -> dict:
+    # Marqueur retiré d'abord, reposé en dernier (même si la transaction était découpée)
+    tx.run(
+        "MATCH (m:CatalogMaintenance {graph_tag: $graph_tag}) REMOVE m.injury_map_version",
+        {"graph_tag": graph_tag},
+    ).consume()
+
+    tx.run(
+        """
+        MATCH (e:Exercise {graph_tag: $graph_tag})
+        SET e.equipment_lc = toLower(e.equipment),
+            e.equipment_secondary_lc = [
+                sec IN coalesce(e.equipment_secondary, ['none'])
+                | coalesce(toLower(sec), $unknown)
+            ]
+        """,
+        {"graph_tag": graph_tag, "unknown": UNKNOWN_EQUIPMENT},
+    ).consume()
+
+    zones = [
+        {"name": key, "terms": [t.lower() for t in terms]}
+        for key, terms in injury_map.items()
+        if terms
+    ]
+    tx.run(
+        "UNWIND $zones AS z MERGE (zone:InjuryZone {name: z.name}) SET zone.terms = z.terms",
+        {"zones": zones},
+    ).consume()
+
+    tx.run(
+        "MATCH (:Exercise {graph_tag: $graph_tag})-[r:UNSAFE_FOR]->(:InjuryZone) DELETE r",
+        {"graph_tag": graph_tag},
+    ).consume()
+
+    summary = tx.run(
+        """
+        UNWIND $zones AS z
+        MATCH (zone:InjuryZone {name: z.name})
+        MATCH (e:Exercise {graph_tag: $graph_tag})-[:TARGETS]->(b:BodyPart)
+        WHERE any(term IN z.terms WHERE toLower(b.name) CONTAINS term)
+        MERGE (e)-[:UNSAFE_FOR]->(zone)
+        """,
+        {"graph_tag": graph_tag, "zones": zones},
+    ).consume()
+
+    tx.run(
+        """
+        MERGE (m:CatalogMaintenance {graph_tag: $graph_tag})
+        SET m.injury_map_version = $version, m.updated_at = datetime()
+        """,
+        {"graph_tag": graph_tag, "version": injury_map_version(injury_map)},
+    ).consume()
+
+    return {
+        "zones": len(zones),
+        "unsafe_for_edges": summary.counters.relationships_created,
+    }
+
+
+def _total_db_hits(plan: dict) -> int:
+    return (plan.get("dbHits") or 0) + sum(_total_db_hits(c) for c in plan.get("children", []))
+
+
+def profile_db_hits(session, query: str, params: dict) -> int:
+    """Nombre total de db hits d'une requête (PROFILE)."""
+    summary = session.run("PROFILE " + query, params).consume()
+    return _total_db_hits(summary.profile or {})
+
+
+def compare_db_hits(session, equipment: list, pain_points: list) -> dict:
+    before = profile_db_hits(
+        session, SAFE_EXERCISES_QUERY, safe_query_params(equipment, pain_points, materialized=False)
+    )
+    after = profile_db_hits(
+        session, SAFE_EXERCISES_MATERIALIZED_QUERY, safe_query_params(equipment, pain_points, materialized=True)
+    )
+    return {"before": before, "after": after}
+
+
+def _load_credentials() -> tuple:
+    """Variables d'environnement, sinon .streamlit/secrets.toml (mêmes clés que l'app)."""
+    secrets = {}
+    path = os.path.join(".streamlit", "secrets.toml")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            secrets = tomllib.load(f)
+    return tuple(
+        os.environ.get(key) or secrets[key]
+        for key in ("NEO4J_URI", "NEO4J_USER", "NEO4J_PASSWORD")
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintenance du graphe d'exercices (UNSAFE_FOR + index).")
+    parser.add_argument("--profile", action="store_true", help="compare seulement les db hits, sans rien écrire")
+    parser.add_argument("--equipment", nargs="*", default=["Dumbbell", "Bench"])
+    parser.add_argument("--pain", nargs="*", default=["Genoux", "Mal de dos (Lombaires)"])
+    args = parser.parse_args(argv)
+
+    from neo4j import GraphDatabase
+
+    uri, user, password = _load_credentials()
+    with GraphDatabase.driver(uri, auth=(user, password)) as driver:
+        with driver.session(database=NEO4J_DB) as session:
+            if not args.profile:
+                before = profile_db_hits(
+                    session, SAFE_EXERCISES_QUERY,
+                    safe_query_params(args.equipment, args.pain, materialized=False),
+                )
+                stats = materialize(session)
+                print(f"Zones : {stats['zones']} • arêtes UNSAFE_FOR créées : {stats['unsafe_for_edges']}")
+                print(f"db hits requête historique (avant maintenance) : {before}")
+
+            hits = compare_db_hits(session, args.equipment, args.pain)
+            print(f"db hits requête historique   : {hits['before']}")
+            print(f"db hits requête matérialisée : {hits['after']}")
+            if hits["after"]:
+                print(f"Gain : x{hits['before'] / hits['after']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
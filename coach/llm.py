@@ -0,0 +1,214 @@
+"""
+Outils autour des appels LLM : encodage compact des exercices dans le
+prompt, réhydratation côté serveur, comptabilité des tokens, requêtes
+doublées (hedging) et compteurs d'issues.
+"""
+
+import itertools
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+
+logger = logging.getLogger(__name__)
+
+# Champs remis dans chaque exercice à partir du catalogue (jamais demandés au modèle)
+HYDRATED_FIELDS = ("name", "name_fr", "video", "image_url")
+
+
+# ========================= ENCODAGE COMPACT =========================
+
+def encode_exercises_for_prompt(valid_exercises: list) -> list:
+    """[{"id": 1, "name": "Push-up"}, ...] : ni URL ni nom français dans le prompt."""
+    return [{"id": i, "name": ex["name"]} for i, ex in enumerate(valid_exercises, start=1)]
+
+
+def hydrate_exercise(ex, valid_exercises: list):
+    """
+    Remplace l'id renvoyé par le modèle par les infos du catalogue.
+    Renvoie None si l'exercice n'est pas dans la liste sécurisée.
+    """
+    if not isinstance(ex, dict):
+        return None
+
+    ref = None
+    idx = ex.get("id")
+    if isinstance(idx, str) and idx.strip().isdigit():
+        idx = int(idx)
+    if isinstance(idx, int) and 1 <= idx <= len(valid_exercises):
+        ref = valid_exercises[idx - 1]
+    elif ex.get("name"):
+        # Tolérance : le modèle a renvoyé un nom au lieu d'un id
+        ref = next((v for v in valid_exercises if v["name"] == ex["name"]), None)
+    if ref is None:
+        return None
+
+    out = {k: v for k, v in ex.items() if k != "id"}
+    out.update({k: ref.get(k) for k in HYDRATED_FIELDS})
+    return out
+
+
+def hydrate_plan(plan: dict, valid_exercises: list) -> dict:
+    """Réhydrate tous les exercices de plan["seance"] (dict de sections ou liste)."""
+    if not isinstance(plan, dict):
+        return plan  # rejeté ensuite par parse_plan
+    seance = plan.get("seance")
+
+    def hydrate_list(items):
+        if not isinstance(items, list):
+            return items
+        hydrated = (hydrate_exercise(ex, valid_exercises) for ex in items)
+        return [ex for ex in hydrated if ex is not None]
+
+    if isinstance(seance, dict):
+        plan["seance"] = {section: hydrate_list(items) for section, items in seance.items()}
+    elif isinstance(seance, list):
+        plan["seance"] = hydrate_list(seance)
+    return plan
+
+
+# ========================= COMPTABILITÉ DES TOKENS =========================
+
+def usage_counts(usage) -> dict:
+    """{"prompt_tokens": int, "completion_tokens": int} (0 si l'API n'a pas renvoyé d'usage)."""
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", None) or 0,
+    }
+
+
+class TokenLedger:
+    """
+    Journal process-wide des tokens par tâche ("profile", "session", ...).
+    Chaque appel est loggé et comparé au budget (prompt / completion) de la tâche.
+    """
+
+    def __init__(self, budgets: dict):
+        # budgets = {"session": {"prompt": 2500, "completion": 1500}, ...}
+        self.budgets = budgets
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def record(self, task: str, model: str, usage, latency_sec: float):
+        counts = usage_counts(usage)
+        prompt, completion = counts["prompt_tokens"], counts["completion_tokens"]
+        budget = self.budgets.get(task, {})
+        over = (
+            prompt > budget.get("prompt", float("inf"))
+            or completion > budget.get("completion", float("inf"))
+        )
+
+        with self._lock:
+            t = self._totals.setdefault(
+                task,
+                {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_sec": 0.0, "over_budget": 0},
+            )
+            t["calls"] += 1
+            t["prompt_tokens"] += prompt
+            t["completion_tokens"] += completion
+            t["latency_sec"] += latency_sec
+            t["over_budget"] += int(over)
+
+        logger.log(
+            logging.WARNING if over else logging.INFO,
+            "LLM %s (%s) : prompt %d/%s tokens, completion %d/%s tokens, %.2f s%s",
+            task, model,
+            prompt, budget.get("prompt", "-"),
+            completion, budget.get("completion", "-"),
+            latency_sec,
+            " — BUDGET DÉPASSÉ" if over else "",
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                task: dict(t, avg_latency_sec=round(t["latency_sec"] / t["calls"], 3) if t["calls"] else 0.0)
+                for task, t in self._totals.items()
+            }
+
+
+# ========================= REQUÊTES DOUBLÉES (HEDGING) =========================
+
+class PrimedStream:
+    """Complétion en streaming dont le premier morceau est déjà reçu (= la réponse a "démarré")."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._chunks = iter(stream)
+        self._first = list(itertools.islice(self._chunks, 1))  # bloque jusqu'au 1er morceau
+
+    def __iter__(self):
+        yield from self._first
+        yield from self._chunks
+
+    def close(self):
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            close()
+
+
+def _discard(future):
+    """Réponse perdante d'une requête doublée : résultat ignoré, stream fermé."""
+    if not future.cancelled() and future.exception() is None:
+        close = getattr(future.result(), "close", None)
+        if close is not None:
+            close()
+
+
+def hedged_call(call, hedge_after_sec: float, executor):
+    """
+    Exécute `call()` ; sans réponse après `hedge_after_sec` (ex: p95 observé),
+    lance un second appel identique et garde le premier qui aboutit.
+    Renvoie (résultat, issue) avec issue = "single" (pas de doublon),
+    "primary" ou "hedge" (gagnant). Exception du dernier appel si les deux échouent.
+    Les tokens de l'appel perdant ne sont pas comptés dans le TokenLedger.
+    """
+    if not hedge_after_sec:
+        return call(), "single"
+    first = executor.submit(call)
+    try:
+        return first.result(timeout=hedge_after_sec), "single"
+    except FutureTimeout:
+        pass
+
+    pending = {first: "primary", executor.submit(call): "hedge"}
+    error = None
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            outcome = pending.pop(future)
+            if future.exception() is None:
+                for loser in pending:
+                    loser.add_done_callback(_discard)
+                return future.result(), outcome
+            error = future.exception()
+    raise error
+
+
+class OutcomeCounter:
+    """Issues comptées par famille, ex: "json" -> ok / repaired / failed, "hedge" -> single / primary / hedge."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, family: str, outcome: str):
+        with self._lock:
+            family_counts = self._counts.setdefault(family, {})
+            family_counts[outcome] = family_counts.get(outcome, 0) + 1
+
+    def count(self, family: str, outcome: str) -> int:
+        with self._lock:
+            return self._counts.get(family, {}).get(outcome, 0)
+
+    def stats(self) -> dict:
+        """{famille: {issue: {"count": n, "rate": part de la famille}}}"""
+        with self._lock:
+            out = {}
+            for family, counts in self._counts.items():
+                total = sum(counts.values())
+                out[family] = {
+                    outcome: {"count": n, "rate": round(n / total, 4)}
+                    for outcome, n in counts.items()
+                }
+            return out
@@ -0,0 +1,180 @@
+"""
+Choix du modèle LLM par tâche ("profile", "session") dans un pool configuré.
+
+Pour chaque modèle, le routeur garde une fenêtre glissante des derniers
+appels (latence, succès / échec) et un disjoncteur :
+  - fermé    : le modèle est utilisable,
+  - ouvert   : taux d'erreur >= `error_rate` sur la fenêtre (au moins
+               `min_calls` appels) ou `max_consecutive_failures` échecs de
+               suite -> écarté pendant `open_sec`,
+  - mi-ouvert: passé ce délai, un appel d'essai ; succès = refermé,
+               échec = rouvert.
+`candidates(task)` renvoie les modèles sains du plus rapide au plus lent
+(latence médiane de la fenêtre ; un modèle jamais mesuré passe en premier
+pour être mesuré), puis les modèles en essai. `call_with_fallback` essaie
+ces candidats dans l'ordre.
+"""
+
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class NoFallback(Exception):
+    """Échec après un début de réponse déjà affiché : pas de repli sur un autre modèle."""
+
+
+class _ModelHealth:
+    __slots__ = ("calls", "state", "opened_at", "consecutive_failures", "trial_in_flight")
+
+    def __init__(self, window: int):
+        self.calls = deque(maxlen=window)  # (latence en s, succès)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+
+    def p50(self):
+        latencies = [latency for latency, ok in self.calls if ok]
+        return statistics.median(latencies) if latencies else None
+
+    def error_rate(self) -> float:
+        return sum(not ok for _, ok in self.calls) / len(self.calls) if self.calls else 0.0
+
+
+class ModelRouter:
+    """Pools de modèles par tâche + santé de chaque modèle (partagé par tout le process)."""
+
+    def __init__(
+        self,
+        pools: dict,
+        window: int = 50,
+        error_rate: float = 0.5,
+        min_calls: int = 4,
+        max_consecutive_failures: int = 3,
+        open_sec: float = 30.0,
+    ):
+        # pools = {"profile": ["openai/gpt-4o-mini", ...], "session": [...]}
+        self.pools = {task: list(models) for task, models in pools.items()}
+        self.window = window
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.max_consecutive_failures = max_consecutive_failures
+        self.open_sec = open_sec
+        self._lock = threading.Lock()
+        self._health = {}
+
+    def _get(self, model: str) -> _ModelHealth:
+        health = self._health.get(model)
+        if health is None:
+            health = self._health[model] = _ModelHealth(self.window)
+        return health
+
+    # ---------- routage ----------
+
+    def candidates(self, task: str) -> list:
+        """Modèles à essayer, dans l'ordre. Vide si tous les disjoncteurs sont ouverts."""
+        now = time.time()
+        healthy, trials = [], []
+        with self._lock:
+            for order, model in enumerate(self.pools.get(task, [])):
+                health = self._get(model)
+                if health.state == OPEN and now - health.opened_at >= self.open_sec:
+                    health.state = HALF_OPEN
+                if health.state == CLOSED:
+                    p50 = health.p50()
+                    healthy.append((p50 is not None, p50 or 0.0, order, model))
+                elif health.state == HALF_OPEN and not health.trial_in_flight:
+                    health.trial_in_flight = True  # un seul appel d'essai à la fois
+                    trials.append(model)
+        return [model for *_, model in sorted(healthy)] + trials
+
+    def record(self, model: str, latency_sec: float, ok: bool):
+        with self._lock:
+            health = self._get(model)
+            health.calls.append((latency_sec, ok))
+            health.trial_in_flight = False
+            health.consecutive_failures = 0 if ok else health.consecutive_failures + 1
+            if health.state == HALF_OPEN:
+                if ok:
+                    health.state = CLOSED
+                    health.calls.clear()
+                    health.calls.append((latency_sec, ok))
+                else:
+                    self._open(model, health, "échec de l'appel d'essai")
+            elif not ok and health.state == CLOSED:
+                if health.consecutive_failures >= self.max_consecutive_failures:
+                    self._open(model, health, f"{health.consecutive_failures} échecs de suite")
+                elif len(health.calls) >= self.min_calls and health.error_rate() >= self.error_rate:
+                    self._open(model, health, f"taux d'erreur {health.error_rate():.0%}")
+
+    def release(self, models):
+        """Candidats non essayés : leur place d'appel d'essai est rendue."""
+        with self._lock:
+            for model in models:
+                self._get(model).trial_in_flight = False
+
+    def _open(self, model: str, health: _ModelHealth, reason: str):
+        health.state = OPEN
+        health.opened_at = time.time()
+        logger.warning("Modèle %s écarté pendant %.0f s (%s)", model, self.open_sec, reason)
+
+    # ---------- métriques ----------
+
+    def open_circuits(self) -> int:
+        with self._lock:
+            return sum(h.state != CLOSED for h in self._health.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                model: {
+                    "state": h.state,
+                    "calls": len(h.calls),
+                    "p50_sec": round(h.p50(), 3) if h.p50() is not None else None,
+                    "error_rate": round(h.error_rate(), 3),
+                }
+                for model, h in self._health.items()
+            }
+
+
+def call_with_fallback(router: ModelRouter, task: str, call):
+    """
+    `call(model)` sur chaque candidat jusqu'au premier succès ; renvoie
+    (résultat, modèle). Latence et issue de chaque essai alimentent le routeur.
+    Les candidats non jugés (succès avant eux, NoFallback, ou appel interrompu
+    par une BaseException comme le StopException de Streamlit) rendent leur
+    place d'appel d'essai.
+    """
+    last_error = None
+    candidates = router.candidates(task)
+    judged = 0  # candidats[:judged] ont été enregistrés par `record`
+    try:
+        for model in candidates:
+            started = time.perf_counter()
+            try:
+                result = call(model)
+            except NoFallback as e:
+                router.record(model, time.perf_counter() - started, ok=False)
+                judged += 1
+                raise e.__cause__ or e
+            except Exception as e:
+                router.record(model, time.perf_counter() - started, ok=False)
+                judged += 1
+                logger.warning("LLM %s en échec sur %s (%s), modèle suivant", task, model, type(e).__name__)
+                last_error = e
+                continue
+            router.record(model, time.perf_counter() - started, ok=True)
+            judged += 1
+            return result, model
+    finally:
+        router.release(candidates[judged:])
+    if last_error is not None:
+        raise last_error
+    raise RuntimeError(f"Aucun modèle disponible pour « {task} » (disjoncteurs ouverts)")
@@ -0,0 +1,176 @@
+"""
+Analyse locale (sans LLM) des réponses d'onboarding.
+
+Le texte est normalisé (minuscules, sans accents ni ponctuation), puis
+passé dans des expressions régulières compilées une seule fois : une
+alternance par valeur de EQUIPMENT_KEYS / INJURY_KEYS / objectif. Un score
+de confiance indique si le résultat est assez sûr pour se passer du LLM.
+"""
+
+import re
+import threading
+import unicodedata
+
+from coach.reference import EQUIPMENT_KEYS
+
+# ---------- normalisation ----------
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """'Épaule droite, j'ai mal !' -> 'epaule droite j ai mal'"""
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def _compile(patterns: dict) -> dict:
+    return {
+        label: re.compile(r"\b(?:" + "|".join(alternatives) + r")\b")
+        for label, alternatives in patterns.items()
+    }
+
+
+# ---------- vocabulaire ----------
+
+EQUIPMENT_PATTERNS = _compile({
+    "Pull-up Bar": [r"barres? (?:de |a )?tractions?", r"pull ?up(?: bar)?", r"chin ?up"],
+    "Barbell": [r"barres?(?! (?:de |a )?tractions?)(?: olympiques?| droites?)?", r"barbells?"],
+    "Dumbbell": [r"halteres?", r"dumbb?ells?"],
+    "Kettlebell": [r"kettle ?bells?", r"kettles?"],
+    "Machine": [r"machines?", r"presse", r"smith", r"leg press"],
+    "Cable": [r"poulies?", r"cables?", r"vis a vis"],
+    "Bench": [r"bancs?", r"bench"],
+    "Treadmill": [r"tapis de course", r"treadmill"],
+    "Rower": [r"rameur", r"rower", r"aviron"],
+    "Bands": [r"elastiques?", r"bandes? (?:elastiques?|de resistance)", r"bands?"],
+    "Foam Roll": [r"rouleaux?(?: de massage)?", r"foam ?roll(?:er)?"],
+    "Bodyweight": [
+        r"poids du corps", r"bodyweight", r"rien", r"(?:aucun|pas de|sans) materiel",
+        r"(?:a la )?maison", r"chez moi",
+    ],
+})
+
+# Matériel sans type précis ("des poids" : haltères ? disques ? kettlebells ?) : on laisse le LLM trancher
+GENERIC_EQUIPMENT_PATTERN = re.compile(r"\b(?:poids|charges?|fontes?|disques?|materiel|equipements?)\b")
+
+GYM_PATTERN = re.compile(r"\b(?:salle(?: de (?:sport|muscu\w*|fitness))?|gym|fitness park|basic fit)\b")
+
+INJURY_PATTERNS = _compile({
+    "Mal de dos (Lombaires)": [r"dos", r"lombaires?", r"lumbago", r"reins"],
+    "Genoux": [r"genoux?", r"rotules?", r"menisques?", r"ligaments? croises?"],
+    "Épaules": [r"epaules?", r"coiffes? des rotateurs", r"rotateurs?"],
+    "Hanches": [r"hanches?", r"bassin", r"psoas", r"pyramidal", r"piriformes?"],
+    "Cou / Cervicales": [r"cou", r"nuque", r"cervicales?", r"torticolis"],
+    "Chevilles / Pieds": [r"chevilles?", r"pieds?", r"entorses?", r"talons?", r"achille", r"plantaires?"],
+    "Poignets / Avant-bras": [r"poignets?", r"avant bras", r"canal carpien"],
+    "Hernie discale / Rachis": [
+        r"hernies?(?: discales?)?", r"sciatiques?", r"disques?", r"discales?",
+        r"rachis", r"colonne(?: vertebrale)?", r"scolioses?",
+    ],
+})
+
+NO_PAIN_PATTERN = re.compile(
+    r"\b(?:rien|aucune?|non|ras|r a s|tout va bien|pas de (?:douleurs?|blessures?|probleme))\b"
+)
+
+GOAL_PATTERNS = _compile({
+    "Perte de gras": [r"perdre", r"pertes?", r"maigrir", r"mincir", r"gras", r"ventre", r"secher", r"seche", r"kilos?"],
+    "Prise de muscle": [r"muscles?", r"muscler", r"musculation", r"masse", r"hypertrophie", r"gonfler", r"pecs?"],
+    "Cardio": [r"cardio", r"endurance", r"souffle", r"essouffle", r"courir", r"course", r"running"],
+    "Perf. force": [r"force", r"fort", r"performances?", r"powerlifting", r"charges? lourdes?"],
+    "Santé générale": [r"sante", r"forme", r"bien etre", r"bouger", r"mobilite", r"souplesse", r"posture"],
+})
+
+# Tournures qui changent le sens ("sauf", "il manque", "pas de ...") : on laisse le LLM trancher
+NEGATION_PATTERN = re.compile(r"\b(?:sauf|manqu\w*|pas d\w*|plus d\w*|ni|hormis|except\w*)\b")
+
+# Au-delà, le texte contient probablement des nuances que les règles ne captent pas
+LONG_TEXT_WORDS = 25
+
+
+def _match_labels(patterns: dict, text: str) -> list:
+    return [label for label, pattern in patterns.items() if pattern.search(text)]
+
+
+def _field_confidence(text: str, matched: bool, negated: bool, vague: bool = False) -> float:
+    if not matched:
+        return 0.0
+    confidence = 1.0
+    if negated:
+        confidence *= 0.5
+    if vague:
+        confidence *= 0.5
+    if len(text.split()) > LONG_TEXT_WORDS:
+        confidence *= 0.8
+    return confidence
+
+
+def extract_profile_locally(goals_text: str, equipment_text: str, pain_text: str) -> dict:
+    """
+    Même sortie que extract_profile_from_text + "confidence" (0 à 1).
+    Chaque champ est lu dans la réponse correspondante de l'onboarding.
+    """
+    goals_norm = normalize(goals_text)
+    equip_norm = normalize(equipment_text)
+    pain_norm = normalize(pain_text)
+
+    # Matériel
+    if GYM_PATTERN.search(equip_norm):
+        equipment = list(EQUIPMENT_KEYS)
+    else:
+        equipment = [key for key in EQUIPMENT_KEYS if key in _match_labels(EQUIPMENT_PATTERNS, equip_norm)]
+    bodyweight_free = EQUIPMENT_PATTERNS["Bodyweight"].sub(" ", equip_norm)
+    equip_conf = _field_confidence(
+        equip_norm,
+        bool(equipment),
+        bool(NEGATION_PATTERN.search(bodyweight_free)),
+        # "salle de sport" couvre déjà tout le matériel
+        vague=not GYM_PATTERN.search(equip_norm) and bool(GENERIC_EQUIPMENT_PATTERN.search(bodyweight_free)),
+    )
+
+    # Blessures
+    injuries = _match_labels(INJURY_PATTERNS, pain_norm)
+    if injuries:
+        injury_conf = _field_confidence(pain_norm, True, bool(NEGATION_PATTERN.search(pain_norm)))
+    elif not pain_norm or NO_PAIN_PATTERN.search(pain_norm):
+        injuries = ["Aucune"]
+        injury_conf = 1.0 if len(pain_norm.split()) <= LONG_TEXT_WORDS else 0.5
+    else:
+        injury_conf = 0.0  # douleur décrite mais zone non reconnue
+
+    # Objectifs
+    goals = _match_labels(GOAL_PATTERNS, goals_norm)
+    goals_conf = _field_confidence(goals_norm, bool(goals), False)
+
+    return {
+        "equipment": equipment or ["Bodyweight"],
+        "injuries": injuries or ["Aucune"],
+        "goals": goals or ["Forme"],
+        "confidence": min(equip_conf, injury_conf, goals_conf),
+    }
+
+
+class FastPathStats:
+    """Compteurs process-wide : part des profils résolus sans LLM."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local = 0
+        self.llm = 0
+
+    def record(self, local: bool):
+        with self._lock:
+            if local:
+                self.local += 1
+            else:
+                self.llm += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.local + self.llm
+        return self.local / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {"local": self.local, "llm": self.llm, "hit_rate": round(self.hit_rate, 3)}
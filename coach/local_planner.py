@@ -0,0 +1,150 @@
+"""
+Planificateur local : séance construite en quelques millisecondes à partir
+des exercices sûrs, sans appel au LLM.
+
+Sert de mode hors ligne, de repli quand le LLM échoue ou dépasse son délai,
+et de brouillon affiché pendant que le LLM rédige la séance.
+
+Les exercices sûrs n'ont qu'un nom : échauffement et retour au calme sont
+reconnus par mots-clés (cercles, jumping jacks... / étirements, postures...),
+les autres forment le corps de séance. Volume et repos suivent :
+  - le niveau (séries / reps / repos de base),
+  - l'énergie du jour (moins de séries et plus de repos si fatigué),
+  - le temps disponible (nombre d'exercices du corps de séance).
+Mêmes entrées = même séance ; `seed` (ex: nombre de séances faites) fait
+tourner les exercices d'une séance à l'autre.
+"""
+
+import hashlib
+
+from coach.plan import Plan, parse_plan
+from coach.reference import INJURY_MAP
+
+# Volume de base par niveau (cf. conventions du prompt : reps en texte, repos en secondes)
+LEVEL_VOLUME = {
+    "Beginner": {"sets": 2, "reps": "12", "rest_sec": 60},
+    "Intermediate": {"sets": 3, "reps": "10", "rest_sec": 75},
+    "Advanced": {"sets": 4, "reps": "8", "rest_sec": 90},
+}
+
+WARMUP_HINTS = (
+    "circle", "jumping jack", "march", "skip", "high knee", "jog", "swing", "pull apart",
+    "inchworm", "cat cow", "world's greatest", "bodyweight squat", "glute bridge", "bird dog", "dead bug",
+)
+COOLDOWN_HINTS = (
+    "stretch", "pose", "child", "cobra", "pigeon", "foam", "breath", "yoga", "mobility", "relax",
+)
+HOLD_HINTS = ("plank", "hold", "wall sit", "hollow", "isometric")
+STRENGTH_GOAL_HINTS = ("muscle", "force", "renfor", "masse", "power", "musculation")
+
+WARMUP_MIN = 3          # minutes par exercice d'échauffement
+COOLDOWN_MIN = 2        # minutes par exercice de retour au calme
+WORK_SEC_PER_SET = 40   # durée moyenne d'une série
+TRANSITION_SEC = 45     # installation / changement d'exercice
+MIN_MAIN, MAX_MAIN = 2, 10
+
+INSTRUCTIONS = {
+    "echauffement": "Mouvement ample et progressif pour monter en température, sans forcer.",
+    "Beginner": "Priorité à la technique : mouvement lent et contrôlé, arrête la série si la forme se dégrade.",
+    "Intermediate": "Contrôle la descente (2 à 3 s) et garde 1 à 2 répétitions en réserve.",
+    "Advanced": "Charge exigeante et tempo contrôlé ; dernière série proche de l'échec technique.",
+    "hold": "Gainage : corps aligné, respiration calme, arrête dès que la position se dégrade.",
+    "retour_calme": "Respire lentement et relâche progressivement, sans à-coups.",
+}
+LOW_ENERGY_TIP = " Énergie basse aujourd'hui : charge légère, pas de série à l'échec."
+
+
+def _matches(name: str, hints: tuple) -> bool:
+    name = name.lower()
+    return any(hint in name for hint in hints)
+
+
+def _rotate(exercises: list, seed) -> list:
+    """Ordre pseudo-aléatoire mais stable (hash du nom et de `seed`)."""
+    return sorted(exercises, key=lambda ex: hashlib.sha1(f"{seed}:{ex['name']}".encode("utf-8")).digest())
+
+
+def session_volume(level: str, energy) -> dict:
+    """Séries / reps / repos du corps de séance selon le niveau et l'énergie (1-10)."""
+    volume = dict(LEVEL_VOLUME.get(level, LEVEL_VOLUME["Beginner"]))
+    energy = int(energy or 6)
+    if energy <= 3:
+        volume["sets"] = max(1, volume["sets"] - 1)
+        volume["rest_sec"] += 30
+    elif energy >= 8:
+        volume["sets"] += 1
+        volume["rest_sec"] = max(45, volume["rest_sec"] - 15)
+    return volume
+
+
+def section_sizes(time_min, volume: dict) -> tuple:
+    """(échauffement, corps, retour au calme) : nombre d'exercices tenant dans le temps disponible."""
+    time_min = int(time_min or 30)
+    warmups = 1 if time_min < 30 else 2
+    cooldowns = 1 if time_min < 45 else 2
+    main_sec = (time_min - warmups * WARMUP_MIN - cooldowns * COOLDOWN_MIN) * 60
+    per_exercise_sec = volume["sets"] * (WORK_SEC_PER_SET + volume["rest_sec"]) + TRANSITION_SEC
+    main = max(MIN_MAIN, min(MAX_MAIN, main_sec // per_exercise_sec))
+    return warmups, main, cooldowns
+
+
+def build_local_plan(profile: dict, context: dict, safe_exercises: list, seed=0) -> Plan:
+    """Séance complète (Plan) à partir de `get_safe_exercises` ; exercices déjà hydratés."""
+    level = profile.get("level") or "Beginner"
+    energy = int(context.get("energy") or 6)
+    time_min = int(context.get("time") or 30)
+    volume = session_volume(level, energy)
+    n_warm, n_main, n_cool = section_sizes(time_min, volume)
+
+    pool = _rotate([ex for ex in safe_exercises if ex.get("name")], seed)
+    warm = [ex for ex in pool if _matches(ex["name"], WARMUP_HINTS)]
+    cool = [ex for ex in pool if _matches(ex["name"], COOLDOWN_HINTS) and ex not in warm]
+    main = [ex for ex in pool if ex not in warm and ex not in cool]
+
+    # Pas d'exercice reconnu pour une section : on complète avec ce qui reste
+    warm_pick = (warm or main)[:n_warm]
+    cool_pick = [ex for ex in (cool or warm or main) if ex not in warm_pick][:n_cool]
+    main_pick = [ex for ex in main + warm if ex not in warm_pick and ex not in cool_pick][:n_main]
+
+    tip = LOW_ENERGY_TIP if energy <= 3 else ""
+
+    def item(ex: dict, **fields) -> dict:
+        return {**{k: ex.get(k) for k in ("name", "name_fr", "video", "image_url")}, **fields}
+
+    def main_item(ex: dict) -> dict:
+        hold = _matches(ex["name"], HOLD_HINTS)
+        instruction = INSTRUCTIONS["hold"] if hold else INSTRUCTIONS.get(level, INSTRUCTIONS["Beginner"])
+        return item(
+            ex,
+            sets=volume["sets"],
+            reps="30 s" if hold else volume["reps"],
+            duration_min=None,
+            rest_sec=volume["rest_sec"],
+            instruction=instruction + tip,
+        )
+
+    def timed_item(ex: dict, section: str, minutes: int) -> dict:
+        return item(ex, sets=None, reps=None, duration_min=minutes, rest_sec=None, instruction=INSTRUCTIONS[section])
+
+    goals = " ".join(profile.get("goals") or []).lower()
+    kind = "Séance de musculation" if any(hint in goals for hint in STRENGTH_GOAL_HINTS) else "Séance"
+    strategie = [f"{kind} de {time_min} min préparée pour ton niveau : {len(main_pick)} exercices au cœur de la séance."]
+    if energy <= 3:
+        strategie.append("Énergie basse : une série de moins et des repos allongés.")
+    elif energy >= 8:
+        strategie.append("Belle énergie : une série de plus sur chaque exercice.")
+    else:
+        strategie.append(f"{volume['sets']} séries par exercice, {volume['rest_sec']} s de repos entre les séries.")
+    pains = [p for p in context.get("daily_pain") or [] if INJURY_MAP.get(p)]
+    if pains:
+        strategie.append(f"Exercices choisis pour ménager : {', '.join(pains)}.")
+
+    return parse_plan({
+        "strategie": strategie,
+        "seance": {
+            "echauffement": [timed_item(ex, "echauffement", WARMUP_MIN) for ex in warm_pick],
+            "corps": [main_item(ex) for ex in main_pick],
+            "retour_calme": [timed_item(ex, "retour_calme", COOLDOWN_MIN) for ex in cool_pick],
+        },
+        "mot_fin": "Bravo, séance terminée ! Note ton ressenti pour que j'ajuste la prochaine.",
+    })
@@ -0,0 +1,282 @@
+"""
+Cache disque des images d'exercices (vignettes redimensionnées).
+
+Chaque image est téléchargée une fois, réduite à `thumb_width` pixels de
+large (si Pillow est installé, sinon gardée telle quelle) puis écrite sous
+le hash SHA-256 de son contenu : deux URLs qui servent la même image ne
+prennent qu'une place. Un index SQLite relie URL -> fichier et garde la
+date du dernier accès ; au-delà de `max_bytes`, les fichiers les moins
+récemment servis sont supprimés.
+
+Dans l'app, `peek` ne bloque jamais l'affichage : une image absente est
+servie par son URL d'origine et téléchargée en tâche de fond (un seul
+téléchargement par URL à la fois). Un échec est noté dans l'index et l'URL
+n'est pas retentée avant `retry_sec`.
+
+Préchauffage de tout le catalogue (mêmes réglages que l'app) :
+    python -m coach.media_cache --prewarm
+"""
+
+import argparse
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from coach.reference import GRAPH_TAG, NEO4J_DB
+
+logger = logging.getLogger(__name__)
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    url       TEXT    PRIMARY KEY,
+    file      TEXT    NOT NULL,
+    size      INTEGER NOT NULL,
+    last_used REAL    NOT NULL
+)
+"""
+
+FAILURES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS failures (
+    url       TEXT    PRIMARY KEY,
+    failed_at REAL    NOT NULL
+)
+"""
+
+IMAGE_URLS_QUERY = """
+MATCH (e:Exercise)
+WHERE e.graph_tag = $graph_tag AND e.image_url IS NOT NULL AND e.image_url <> ''
+RETURN DISTINCT e.image_url AS image_url
+"""
+
+USER_AGENT = "coach-ia-media-cache/1.0"
+
+# Signatures des formats servis (l'extension indique le type MIME au navigateur)
+MAGIC_EXTENSIONS = ((b"\xff\xd8", ".jpg"), (b"\x89PNG", ".png"), (b"GIF8", ".gif"), (b"RIFF", ".webp"))
+
+
+def _extension(data: bytes) -> str:
+    for magic, ext in MAGIC_EXTENSIONS:
+        if data.startswith(magic):
+            return ext
+    raise ValueError("format d'image non reconnu")
+
+
+def _thumbnail(data: bytes, width: int) -> bytes:
+    """JPEG de `width` px de large au plus ; image d'origine si Pillow est absent ou illisible."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if getattr(img, "is_animated", False):
+                return data  # GIF animé : l'animation montre le mouvement, on la garde
+            img.thumbnail((width, width * 4))
+            out = io.BytesIO()
+            img.convert("RGB").save(out, "JPEG", quality=82, optimize=True)
+            return out.getvalue()
+    except Exception:
+        return data
+
+
+class MediaCache:
+    """Vignettes adressées par contenu + éviction LRU par taille totale. Thread-safe."""
+
+    def __init__(self, root: str, max_bytes: int = 200 * 1024 * 1024, thumb_width: int = 480, timeout_sec: float = 5.0,
+                 retry_sec: float = 600.0):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.thumb_width = thumb_width
+        self.timeout_sec = timeout_sec
+        self.retry_sec = retry_sec
+        os.makedirs(root, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(INDEX_SCHEMA)
+        self._conn.execute(FAILURES_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._pending = set()  # URLs en cours de téléchargement (peek)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.skipped = 0   # URLs en échec récent, non retentées
+        self.evicted = 0
+
+    # ---------- lecture ----------
+
+    def get(self, url: str) -> str | None:
+        """Chemin local de la vignette (téléchargée si besoin) ; None si l'image est inaccessible."""
+        if not url:
+            return None
+        path, failed = self._lookup(url)
+        if path is not None or failed:
+            return path
+        return self._fetch_logged(url)
+
+    def peek(self, url: str, submit) -> str | None:
+        """
+        Chemin local si la vignette est déjà en cache, sinon None tout de suite :
+        le téléchargement est confié à `submit(fn, url)` (ex: `executor.submit`),
+        une seule fois par URL tant qu'il n'est pas terminé.
+        """
+        if not url:
+            return None
+        path, failed = self._lookup(url)
+        if path is not None or failed:
+            return path
+        with self._lock:
+            if url in self._pending:
+                return None
+            self._pending.add(url)
+        try:
+            submit(self._fetch_pending, url)
+        except Exception as e:
+            with self._lock:
+                self._pending.discard(url)
+            logger.warning("Téléchargement d'image non planifié (%s) : %s", url, e)
+        return None
+
+    def prewarm(self, urls, workers: int = 8) -> dict:
+        """Met en cache toutes les `urls` (téléchargements en parallèle)."""
+        urls = sorted({u for u in urls if u})
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="coach-media") as pool:
+            paths = list(pool.map(self.get, urls))
+        return {"urls": len(urls), "cached": sum(p is not None for p in paths), **self.stats()}
+
+    # ---------- interne ----------
+
+    def _path(self, file: str) -> str:
+        return os.path.join(self.root, file[:2], file)
+
+    def _lookup(self, url: str):
+        """(chemin en cache ou None, échec récent ?) ; compte hits / misses / skipped."""
+        with self._lock:
+            row = self._conn.execute("SELECT file FROM media WHERE url = ?", (url,)).fetchone()
+            if row and os.path.exists(self._path(row[0])):
+                self._conn.execute("UPDATE media SET last_used = ? WHERE url = ?", (time.time(), url))
+                self._conn.commit()
+                self.hits += 1
+                return self._path(row[0]), False
+            failed = self._conn.execute("SELECT failed_at FROM failures WHERE url = ?", (url,)).fetchone()
+            if failed and time.time() - failed[0] < self.retry_sec:
+                self.skipped += 1
+                return None, True
+            self.misses += 1
+            return None, False
+
+    def _fetch_logged(self, url: str) -> str | None:
+        try:
+            return self._fetch(url)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO failures (url, failed_at) VALUES (?, ?)", (url, time.time())
+                )
+                self._conn.commit()
+            logger.warning("Image non mise en cache (%s) : %s", url, e)
+            return None
+
+    def _fetch_pending(self, url: str):
+        try:
+            self._fetch_logged(url)
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+    def _fetch(self, url: str) -> str:
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        with urllib.request.urlopen(request, timeout=self.timeout_sec) as response:
+            data = _thumbnail(response.read(), self.thumb_width)
+        file = hashlib.sha256(data).hexdigest() + _extension(data)
+        path = self._path(file)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)  # atomique : jamais de fichier à moitié écrit servi
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO media (url, file, size, last_used) VALUES (?, ?, ?, ?)",
+                (url, file, len(data), time.time()),
+            )
+            self._conn.execute("DELETE FROM failures WHERE url = ?", (url,))
+            self._conn.commit()
+            self._evict()
+        return path
+
+    def _evict(self):
+        """Supprime les fichiers les moins récemment servis jusqu'à repasser sous `max_bytes`."""
+        # Un fichier partagé par plusieurs URLs ne compte qu'une fois
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT file, MAX(size) AS size FROM media GROUP BY file)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT file, MAX(size), MAX(last_used) AS used FROM media GROUP BY file ORDER BY used"
+        ).fetchall()
+        for file, size, _ in rows:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(file))
+            except FileNotFoundError:
+                pass
+            self._conn.execute("DELETE FROM media WHERE file = ?", (file,))
+            total -= size
+            self.evicted += 1
+        self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            files, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM (SELECT file, MAX(size) AS size FROM media GROUP BY file)"
+            ).fetchone()
+            return {
+                "files": files,
+                "bytes": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "skipped": self.skipped,
+                "evicted": self.evicted,
+            }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Préchauffe le cache des images du catalogue.")
+    parser.add_argument("--prewarm", action="store_true", help="télécharge toutes les images du catalogue GRAPH_TAG")
+    parser.add_argument("--path", default=".cache/media")
+    parser.add_argument("--max-mb", type=float, default=200)
+    parser.add_argument("--width", type=int, default=480)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    cache = MediaCache(args.path, max_bytes=int(args.max_mb * 1024 * 1024), thumb_width=args.width)
+    if args.prewarm:
+        from coach.graph import _load_credentials
+        from coach.neo4j_client import Neo4jClient
+
+        uri, user, password = _load_credentials()
+        client = Neo4jClient(uri, auth=(user, password), database=NEO4J_DB)
+        try:
+            urls = [row["image_url"] for row in client.read(IMAGE_URLS_QUERY, {"graph_tag": GRAPH_TAG})]
+        finally:
+            client.close()
+        stats = cache.prewarm(urls, workers=args.workers)
+        print(f"{GRAPH_TAG} : {stats['cached']}/{stats['urls']} image(s) en cache")
+    stats = cache.stats()
+    print(f"Cache : {stats['files']} fichier(s), {stats['bytes'] / 1024 / 1024:.1f} Mo (max {args.max_mb:g} Mo)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Accès Neo4j géré : pool dimensionné, préchauffage, lectures en
+transactions gérées avec nouvelles tentatives.
+
+Les lectures passent par `session.execute_read` en mode READ : sur un
+cluster (URI neo4j:// ou neo4j+s://) le driver les route vers les
+followers / read replicas, en bolt:// elles vont au serveur unique.
+
+Le driver n'expose pas l'état de son pool : le client compte lui-même les
+sessions empruntées (`in_use`), ce qui donne le taux d'utilisation du pool
+à surveiller (`pool_stats()`).
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def _fetch_all(tx, query: str, params: dict) -> list:
+    return tx.run(query, params).data()
+
+
+def _is_retryable(error: Exception) -> bool:
+    is_retryable = getattr(error, "is_retryable", None)
+    return bool(is_retryable and is_retryable())
+
+
+class Neo4jClient:
+    """Driver + compteurs du pool, partagé par tout le process."""
+
+    def __init__(
+        self,
+        uri: str,
+        auth: tuple,
+        database: str,
+        max_pool_size: int = 20,
+        max_connection_lifetime_sec: float = 1800,
+        acquisition_timeout_sec: float = 10,
+        liveness_check_sec: float = 60,
+        max_transaction_retry_sec: float = 5,
+        retries: int = 2,
+        backoff_sec: float = 0.2,
+    ):
+        from neo4j import GraphDatabase
+
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=auth,
+            max_connection_pool_size=max_pool_size,
+            # Plus court que les coupures des load balancers (connexions recyclées avant)
+            max_connection_lifetime=max_connection_lifetime_sec,
+            connection_acquisition_timeout=acquisition_timeout_sec,
+            # Connexion inactive depuis plus longtemps : vérifiée avant réutilisation
+            liveness_check_timeout=liveness_check_sec,
+            # Nouvelles tentatives internes de execute_read (erreurs transitoires)
+            max_transaction_retry_time=max_transaction_retry_sec,
+        )
+        self.database = database
+        self.max_pool_size = max_pool_size
+        self.retries = retries
+        self.backoff_sec = backoff_sec
+
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.queries = 0
+        self.retries_total = 0
+        self.failures_total = 0
+
+    # ---------- cycle de vie ----------
+
+    def warm_up(self, connections: int = 2) -> bool:
+        """
+        verify_connectivity, puis `connections` lectures simultanées pour ouvrir
+        autant de connexions. Chaque échec est loggé et rend False (l'app reste
+        utilisable, les lectures suivantes retenteront).
+        """
+        started = time.perf_counter()
+        try:
+            self.driver.verify_connectivity()
+        except Exception as e:
+            logger.error("Neo4j injoignable au démarrage : %s", e)
+            return False
+        with ThreadPoolExecutor(max_workers=connections, thread_name_prefix="neo4j-warm") as pool:
+            futures = [pool.submit(self.read, "RETURN 1 AS ok") for _ in range(connections)]
+        failures = [f.exception() for f in futures if f.exception() is not None]
+        for e in failures:
+            logger.error("Préchauffage Neo4j en échec : %s", e)
+        if failures:
+            return False
+        logger.info("Neo4j prêt (%d connexion(s) préchauffée(s), %.0f ms)", connections, (time.perf_counter() - started) * 1000)
+        return True
+
+    def close(self):
+        self.driver.close()
+
+    # ---------- requêtes ----------
+
+    @contextmanager
+    def _checkout(self):
+        with self._lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_use -= 1
+
+    def read(self, query: str, params: dict | None = None) -> list:
+        """Lecture en transaction gérée (mode READ) ; liste de dicts (un par ligne)."""
+        from neo4j import READ_ACCESS
+        return self._execute(READ_ACCESS, query, params)
+
+    def write(self, query: str, params: dict | None = None) -> list:
+        """Écriture en transaction gérée (leader du cluster), mêmes nouvelles tentatives."""
+        from neo4j import WRITE_ACCESS
+        return self._execute(WRITE_ACCESS, query, params)
+
+    def _execute(self, access_mode: str, query: str, params: dict | None) -> list:
+        from neo4j import READ_ACCESS
+
+        for attempt in range(self.retries + 1):
+            try:
+                with self._checkout(), self.driver.session(
+                    database=self.database, default_access_mode=access_mode
+                ) as session:
+                    run = session.execute_read if access_mode == READ_ACCESS else session.execute_write
+                    rows = run(_fetch_all, query, params or {})
+                with self._lock:
+                    self.queries += 1
+                return rows
+            except Exception as e:
+                if attempt == self.retries or not _is_retryable(e):
+                    with self._lock:
+                        self.failures_total += 1
+                    raise
+                delay = self.backoff_sec * 2 ** attempt * (0.5 + random.random())
+                with self._lock:
+                    self.retries_total += 1
+                logger.warning(
+                    "Requête Neo4j en échec (%s), nouvel essai %d/%d dans %.2f s",
+                    type(e).__name__, attempt + 1, self.retries, delay,
+                )
+                time.sleep(delay)
+
+    # ---------- métriques ----------
+
+    def pool_stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": self.max_pool_size,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "utilisation": round(self.in_use / self.max_pool_size, 3) if self.max_pool_size else 0.0,
+                "queries": self.queries,
+                "retries": self.retries_total,
+                "failures": self.failures_total,
+            }
@@ -0,0 +1,142 @@
+"""
+Zones douloureuses lues dans un texte libre (message du check-in, réponse
+"douleurs" de l'onboarding), sans LLM.
+
+Chaque terme de INJURY_MAP et ses synonymes français (ZONE_SYNONYMS) sont
+vectorisés une fois en TF-IDF sur des n-grammes de caractères (2 à 4, mots
+encadrés d'espaces). Un message est normalisé (minuscules, sans accents,
+cf. local_nlp.normalize), découpé en segments de 1 à MAX_SPAN_WORDS mots
+(sommes glissantes des vecteurs de mots, eux-mêmes mis en cache), et tous
+les segments sont comparés à tous les termes en un seul produit matriciel
+(similarité cosinus). Les n-grammes partagés rendent la
+comparaison tolérante aux fautes ("genous", "lonbaires", "épaulle").
+
+Une zone est retenue si un segment ressemble à l'un de ses termes au moins
+à `threshold`. Pas de gestion de la négation : "plus mal au genou" bannit
+quand même les genoux, on préfère écarter un exercice de trop.
+"""
+
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+from coach.local_nlp import normalize
+from coach.reference import INJURY_MAP
+
+# Synonymes français (forme normalisée), en plus des termes de INJURY_MAP
+ZONE_SYNONYMS = {
+    "Mal de dos (Lombaires)": ["dos", "lombaires", "lombalgie", "lumbago", "reins", "bas du dos"],
+    "Genoux": ["genoux", "rotule", "menisque", "ligament croise"],
+    "Épaules": ["epaules", "coiffe des rotateurs", "rotateurs", "deltoide"],
+    "Hanches": ["hanches", "bassin", "psoas", "pyramidal", "fessier", "aine"],
+    "Cou / Cervicales": ["nuque", "cervicales", "torticolis", "trapezes"],
+    "Chevilles / Pieds": ["chevilles", "pieds", "entorse", "talon", "tendon d achille", "voute plantaire"],
+    "Poignets / Avant-bras": ["poignets", "canal carpien", "avant bras"],
+    "Hernie discale / Rachis": ["hernie discale", "sciatique", "disque", "colonne vertebrale", "scoliose", "lombosciatique"],
+}
+
+NGRAM_MIN, NGRAM_MAX = 2, 4
+MAX_SPAN_WORDS = 3
+MIN_WORD_CHARS = 3  # segments d'un mot plus court ignorés ("de", "au", "la")
+WORD_CACHE_SIZE = 8192
+THRESHOLD = 0.58
+
+
+def _ngrams(text: str) -> Counter:
+    padded = f" {text} "
+    return Counter(
+        padded[i:i + n]
+        for n in range(NGRAM_MIN, NGRAM_MAX + 1)
+        for i in range(len(padded) - n + 1)
+    )
+
+
+class PainZoneMapper:
+    """Matrice TF-IDF des termes de chaque zone, construite une fois. Lecture seule (thread-safe)."""
+
+    def __init__(self, injury_map: dict = INJURY_MAP, synonyms: dict = ZONE_SYNONYMS, threshold: float = THRESHOLD):
+        self.threshold = threshold
+        self.zones = [zone for zone, terms in injury_map.items() if terms]
+
+        # Termes regroupés par zone (colonnes contiguës -> max par zone en un reduceat)
+        terms, starts = [], []
+        for zone in self.zones:
+            starts.append(len(terms))
+            terms += dict.fromkeys(normalize(t) for t in injury_map[zone] + synonyms.get(zone, []) if normalize(t))
+        self.terms = terms
+        self._zone_starts = np.array(starts)
+
+        counts = [_ngrams(term) for term in terms]
+        self._vocab = {}
+        for c in counts:
+            for gram in c:
+                self._vocab.setdefault(gram, len(self._vocab))
+        df = np.zeros(len(self._vocab), dtype=np.float32)
+        for c in counts:
+            df[[self._vocab[g] for g in c]] += 1
+        self._idf = np.log((1 + len(terms)) / (1 + df)) + 1
+        # N-gramme absent des termes : poids maximal (il éloigne le segment de tous les termes)
+        self._unknown_idf = float(np.log(1 + len(terms)) + 1)
+
+        matrix = np.zeros((len(terms), len(self._vocab)), dtype=np.float32)
+        for row, c in enumerate(counts):
+            for gram, n in c.items():
+                matrix[row, self._vocab[gram]] = n * self._idf[self._vocab[gram]]
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._terms_t = np.ascontiguousarray(matrix.T)  # (vocabulaire, termes)
+        self._grams = {gram: (col, float(self._idf[col])) for gram, col in self._vocab.items()}
+        self._word = lru_cache(maxsize=WORD_CACHE_SIZE)(self._word_vector)
+
+    def _word_vector(self, word: str) -> tuple:
+        """(colonnes, poids, carré du poids des n-grammes inconnus) d'un mot ; mis en cache."""
+        cols, weights, unknown = [], [], 0.0
+        for gram, n in _ngrams(word).items():
+            known = self._grams.get(gram)
+            if known is None:
+                unknown += (n * self._unknown_idf) ** 2
+            else:
+                cols.append(known[0])
+                weights.append(n * known[1])
+        return cols, weights, unknown
+
+    def scores(self, text: str) -> dict:
+        """{zone: meilleure similarité (0 à 1)} pour chaque zone de INJURY_MAP."""
+        words = normalize(text).split()
+        if not words:
+            return dict.fromkeys(self.zones, 0.0)
+        # Vecteur de chaque mot, puis segments de 1 à MAX_SPAN_WORDS mots = sommes glissantes
+        # (les n-grammes à cheval sur deux mots sont ignorés)
+        rows, cols, weights = [], [], []
+        unknown = np.zeros(len(words), dtype=np.float32)
+        for row, word in enumerate(words):
+            word_cols, word_weights, unknown[row] = self._word(word)
+            rows += [row] * len(word_cols)
+            cols += word_cols
+            weights += word_weights
+        word_matrix = np.zeros((len(words), len(self._vocab)), dtype=np.float32)
+        word_matrix[rows, cols] = weights
+        spans, spans_unknown = [], []
+        for size in range(1, min(MAX_SPAN_WORDS, len(words)) + 1):
+            count = len(words) - size + 1
+            spans.append(sum(word_matrix[i:i + count] for i in range(size)))
+            spans_unknown.append(sum(unknown[i:i + count] for i in range(size)))
+        # Mot trop court seul ("de", "au") : vecteur nul, jamais retenu
+        spans[0][[len(w) < MIN_WORD_CHARS for w in words]] = 0.0
+        spans, spans_unknown = np.vstack(spans), np.concatenate(spans_unknown)
+
+        norms = np.sqrt(np.einsum("ij,ij->i", spans, spans) + spans_unknown)
+        similarity = (spans @ self._terms_t) / np.maximum(norms, 1e-9)[:, None]   # (segments, termes)
+        best = np.maximum.reduceat(similarity.max(axis=0), self._zone_starts)    # max par zone
+        return {zone: float(score) for zone, score in zip(self.zones, best)}
+
+    def zones_in(self, text: str) -> list:
+        """Zones dont la similarité atteint `threshold`, dans l'ordre de INJURY_MAP."""
+        return [zone for zone, score in self.scores(text).items() if score >= self.threshold]
+
+
+def merge_zones(zones: list, extra: list) -> list:
+    """Ajoute les zones détectées ; 'Aucune' disparaît dès qu'une vraie zone est présente."""
+    merged = list(dict.fromkeys(list(zones or []) + list(extra)))
+    real = [zone for zone in merged if zone not in INJURY_MAP or INJURY_MAP[zone]]
+    return real or merged or ["Aucune"]
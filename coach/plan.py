@@ -0,0 +1,224 @@
+"""
+Représentation compacte d'une séance.
+
+Le JSON du modèle (ou du cache) est lu, validé et normalisé une seule fois,
+à la génération, par `parse_plan` :
+  - sections renommées (corps_de_seance -> corps, ...) ou déduites d'une
+    simple liste d'exercices,
+  - valeurs converties (sets / durée / repos en int, reps en texte),
+  - exercices sans nom écartés.
+Les pages ne font ensuite que parcourir `Plan.sections`. `to_dict()` redonne
+la forme JSON d'origine (cache disque, historique des séances).
+
+Mémoire par session : un exercice de séance ne garde que l'id de sa fiche
+(nom, nom français, vidéo, image) dans EXERCISES, table partagée par tout le
+process, et sa prescription (séries, reps, repos, consigne). Les séances sont
+immuables et `parse_plan` renvoie la même instance pour un même contenu
+(cache de séances, programme de la semaine) : l'état d'une session ne tient
+plus qu'une référence vers une séance partagée.
+"""
+
+import sys
+import threading
+import weakref
+from dataclasses import dataclass
+
+from coach.streaming import SECTION_ALIASES
+
+SECTION_ORDER = ("echauffement", "corps", "retour_calme")
+
+
+@dataclass(slots=True, frozen=True)
+class ExerciseInfo:
+    """Fiche d'un exercice (catalogue), partagée en lecture seule."""
+    name: str
+    name_fr: str | None = None
+    video: str | None = None
+    image_url: str | None = None
+
+
+class ExerciseCatalog:
+    """
+    Fiches d'exercices dédupliquées, indexées par un id entier (position).
+    Ajout seulement : une fiche n'est jamais modifiée ni retirée, un id reste
+    valable tant que le process vit. Bornée par la taille du catalogue.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._infos = []   # id -> ExerciseInfo
+        self._ids = {}     # ExerciseInfo -> id
+
+    def intern(self, name: str, name_fr=None, video=None, image_url=None) -> int:
+        info = ExerciseInfo(sys.intern(name), name_fr or None, video or None, image_url or None)
+        exercise_id = self._ids.get(info)
+        if exercise_id is None:
+            with self._lock:
+                exercise_id = self._ids.get(info)
+                if exercise_id is None:
+                    exercise_id = len(self._infos)
+                    self._infos.append(info)
+                    self._ids[info] = exercise_id
+        return exercise_id
+
+    def __getitem__(self, exercise_id: int) -> ExerciseInfo:
+        return self._infos[exercise_id]
+
+    def __len__(self) -> int:
+        return len(self._infos)
+
+
+EXERCISES = ExerciseCatalog()
+
+
+@dataclass(slots=True, frozen=True)
+class ExerciseItem:
+    exercise_id: int         # fiche dans EXERCISES
+    sets: int | None = None
+    reps: str | None = None
+    duration_min: int | None = None
+    rest_sec: int | None = None
+    instruction: str = ""
+
+    @property
+    def info(self) -> ExerciseInfo:
+        return EXERCISES[self.exercise_id]
+
+    @property
+    def name(self) -> str:
+        return EXERCISES[self.exercise_id].name
+
+    @property
+    def name_fr(self) -> str | None:
+        return EXERCISES[self.exercise_id].name_fr
+
+    @property
+    def video(self) -> str | None:
+        return EXERCISES[self.exercise_id].video
+
+    @property
+    def image_url(self) -> str | None:
+        return EXERCISES[self.exercise_id].image_url
+
+    @classmethod
+    def from_dict(cls, ex: dict):
+        """Exercice réhydraté (cf. coach/llm.py) -> ExerciseItem ; None s'il n'a pas de nom."""
+        if not isinstance(ex, dict) or not ex.get("name"):
+            return None
+        reps = ex.get("reps")
+        return cls(
+            exercise_id=EXERCISES.intern(str(ex["name"]), ex.get("name_fr"), ex.get("video"), ex.get("image_url")),
+            sets=_to_int(ex.get("sets")),
+            reps=None if reps is None or reps == "" else sys.intern(str(reps)),
+            duration_min=_to_int(ex.get("duration_min")),
+            rest_sec=_to_int(ex.get("rest_sec")),
+            instruction=str(ex.get("instruction") or ""),
+        )
+
+    def to_dict(self) -> dict:
+        info = self.info
+        return {
+            "name": info.name,
+            "name_fr": info.name_fr,
+            "video": info.video,
+            "image_url": info.image_url,
+            "sets": self.sets,
+            "reps": self.reps,
+            "duration_min": self.duration_min,
+            "rest_sec": self.rest_sec,
+            "instruction": self.instruction,
+        }
+
+
+@dataclass(slots=True, frozen=True)
+class Section:
+    key: str                 # "echauffement" | "corps" | "retour_calme"
+    exercises: tuple = ()    # tuple[ExerciseItem, ...]
+
+
+@dataclass(slots=True, frozen=True, weakref_slot=True)
+class Plan:
+    strategie: tuple = ()    # tuple[str, ...]
+    sections: tuple = ()     # tuple[Section, ...], dans l'ordre SECTION_ORDER
+    mot_fin: str = ""
+
+    def exercises(self):
+        """(section, position, exercice) dans l'ordre d'affichage."""
+        for section in self.sections:
+            for position, ex in enumerate(section.exercises):
+                yield section.key, position, ex
+
+    def to_dict(self) -> dict:
+        return {
+            "strategie": list(self.strategie),
+            "seance": {s.key: [ex.to_dict() for ex in s.exercises] for s in self.sections},
+            "mot_fin": self.mot_fin,
+        }
+
+
+# Séances vivantes, par contenu : libérées dès qu'aucune session ne les référence
+_PLANS = weakref.WeakValueDictionary()
+_PLANS_LOCK = threading.Lock()
+
+
+def intern_plan(plan: Plan) -> Plan:
+    """Instance partagée d'une séance de même contenu (ou `plan` lui-même s'il est le premier)."""
+    key = hash(plan)
+    with _PLANS_LOCK:
+        shared = _PLANS.get(key)
+        if shared is not None and shared == plan:
+            return shared
+        _PLANS[key] = plan
+    return plan
+
+
+def _to_int(value):
+    """10, 10.0, "10", "60s" -> int ; le reste -> None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        digits = value.strip().rstrip("s").strip()
+        return int(digits) if digits.isdigit() else None
+    return None
+
+
+def _split_list(items: list) -> dict:
+    """Séance renvoyée en liste : 1er exercice = échauffement, dernier = retour au calme (5+ exercices)."""
+    corps = list(items)
+    echauffement = [corps.pop(0)] if corps else []
+    retour_calme = [corps.pop(-1)] if len(corps) >= 5 else []
+    return {"echauffement": echauffement, "corps": corps, "retour_calme": retour_calme}
+
+
+def parse_plan(raw: dict) -> Plan:
+    """JSON de séance (exercices déjà réhydratés) -> Plan partagé. ValueError si ce n'est pas un objet."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"Séance invalide : objet JSON attendu, reçu {type(raw).__name__}")
+
+    strategie = raw.get("strategie")
+    if isinstance(strategie, str):
+        strategie = [strategie]
+    elif not isinstance(strategie, list):
+        strategie = []
+
+    seance = raw.get("seance")
+    if isinstance(seance, list):
+        seance = _split_list(seance)
+    elif not isinstance(seance, dict):
+        seance = {}
+
+    by_key = {}
+    # Nom canonique prioritaire sur ses alias ("corps" avant "corps_de_seance")
+    for name, items in sorted(seance.items(), key=lambda kv: SECTION_ALIASES.get(kv[0]) != kv[0]):
+        key = SECTION_ALIASES.get(name)
+        if key is None or key in by_key or not isinstance(items, list):
+            continue
+        by_key[key] = tuple(ex for ex in map(ExerciseItem.from_dict, items) if ex is not None)
+
+    return intern_plan(Plan(
+        strategie=tuple(str(s) for s in strategie if s),
+        sections=tuple(Section(key, by_key[key]) for key in SECTION_ORDER if key in by_key),
+        mot_fin=str(raw.get("mot_fin") or ""),
+    ))
@@ -0,0 +1,149 @@
+"""
+Cache disque (SQLite) des séances générées par le LLM.
+
+La clé est un hash canonique des entrées qui comptent vraiment pour la
+séance (profil, temps / énergie regroupés par paliers, douleurs du jour,
+exercices sûrs, version du prompt). Chaque clé peut stocker jusqu'à
+`variants` séances différentes : tant que ce nombre n'est pas atteint on
+appelle le modèle, ensuite on sert une variante au hasard.
+"""
+
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from coach.reference import INJURY_MAP
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    key        TEXT    NOT NULL,
+    variant    INTEGER NOT NULL,
+    plan       TEXT    NOT NULL,
+    created_at REAL    NOT NULL,
+    last_used  REAL    NOT NULL,
+    PRIMARY KEY (key, variant)
+)
+"""
+
+
+def time_bucket(minutes) -> int:
+    """15-29 -> 15, 30-44 -> 30, 45-59 -> 45, ..."""
+    return int(minutes or 0) // 15 * 15
+
+
+def energy_bucket(energy) -> str:
+    energy = int(energy or 0)
+    if energy <= 3:
+        return "low"
+    if energy <= 7:
+        return "mid"
+    return "high"
+
+
+def _zones(values) -> list:
+    return sorted({v for v in values or [] if INJURY_MAP.get(v)})
+
+
+def plan_cache_key(profile: dict, context: dict, valid_exercises: list, last_feedback: dict | None, prompt_version: str) -> str:
+    """Hash canonique : ordre, casse et valeurs sans effet ('Aucune') ignorés."""
+    age = profile.get("age")
+    parts = {
+        "prompt": prompt_version,
+        "age": int(age) // 10 * 10 if isinstance(age, (int, float)) else None,
+        "level": profile.get("level"),
+        "goals": sorted(g.strip().lower() for g in profile.get("goals") or []),
+        "equipment": sorted({e.lower() for e in profile.get("equipment") or []}),
+        "injuries": _zones(profile.get("injuries")),
+        "time": time_bucket(context.get("time")),
+        "energy": energy_bucket(context.get("energy")),
+        "daily_pain": _zones(context.get("daily_pain")),
+        "exercises": sorted(ex["name"] for ex in valid_exercises),
+        "ressenti": (last_feedback or {}).get("ressenti") if isinstance(last_feedback, dict) else None,
+    }
+    if context.get("focus"):
+        parts["focus"] = context["focus"]  # séance d'un programme de la semaine
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """Cache SQLite avec TTL, éviction LRU bornée et variantes par clé."""
+
+    def __init__(self, path: str, ttl_sec: float = 7 * 24 * 3600, max_entries: int = 5000, variants: int = 1):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.variants = max(1, variants)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        """Une variante encore valide, ou None s'il faut appeler le modèle."""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT variant, plan FROM plans WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl_sec),
+            ).fetchall()
+            if len(rows) < self.variants:
+                self.misses += 1
+                return None
+            variant, plan = random.choice(rows)
+            self._conn.execute(
+                "UPDATE plans SET last_used = ? WHERE key = ? AND variant = ?",
+                (now, key, variant),
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(plan)
+
+    def put(self, key: str, plan: dict):
+        """Ajoute une variante (remplace la plus ancienne si la clé est pleine)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM plans WHERE created_at < ?", (now - self.ttl_sec,))
+            rows = self._conn.execute(
+                "SELECT variant FROM plans WHERE key = ? ORDER BY created_at",
+                (key,),
+            ).fetchall()
+            used = {r[0] for r in rows}
+            free = [v for v in range(self.variants) if v not in used]
+            variant = free[0] if free else rows[0][0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plans (key, variant, plan, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, variant, json.dumps(plan, ensure_ascii=False), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM plans WHERE rowid IN (SELECT rowid FROM plans ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+
+    def stats(self) -> dict:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,146 @@
+"""
+Classement des exercices sûrs selon les objectifs du profil et le budget
+de la séance.
+
+Chaque exercice du catalogue est décrit une fois par un petit vecteur de
+caractéristiques (FEATURES : zones travaillées, polyarticulaire, charge,
+poids du corps, échauffement / retour au calme, cardio). Les objectifs
+(et le focus d'une séance du programme de la semaine) donnent un vecteur
+de poids : score = caractéristiques @ poids, un seul produit matriciel.
+
+Le budget (nombre d'exercices proposés au LLM) suit la durée de la séance :
+CHOICE_FACTOR fois le nombre d'exercices que le planificateur local y
+placerait, avec des quotas par rôle pour que l'échauffement et le retour
+au calme aient toujours des candidats. À score égal, l'ordre du catalogue
+(par nom) départage : mêmes entrées = même liste, dans le même ordre.
+"""
+
+import numpy as np
+
+from coach.local_nlp import normalize
+from coach.local_planner import COOLDOWN_HINTS, WARMUP_HINTS, section_sizes, session_volume
+
+FEATURES = ("upper", "lower", "core", "compound", "loaded", "bodyweight", "warmup", "cooldown", "cardio")
+F = {name: i for i, name in enumerate(FEATURES)}
+
+# Rôle dans la séance (ordre de la liste renvoyée)
+WARMUP, MAIN, COOLDOWN = 0, 1, 2
+
+BODY_GROUPS = {
+    "upper": ("chest", "pector", "biceps", "triceps", "shoulder", "deltoid", "lats", "latissimus",
+              "rhomboid", "trapezius", "forearm", "upper back", "pec"),
+    "lower": ("quadriceps", "quads", "hamstring", "glute", "calves", "calf", "adductor", "abductor",
+              "hip", "thigh", "leg"),
+    "core": ("abdominal", "abs", "oblique", "core", "lumbar", "lower back", "erector", "spine"),
+}
+LOADED_EQUIPMENT = ("barbell", "dumbbell", "kettlebell", "machine", "cable")
+BODYWEIGHT_EQUIPMENT = ("bodyweight", "none")
+CARDIO_HINTS = ("jump", "burpee", "running", "sprint", "rope", "climber", "jack", "skater", "bike", "high knee")
+CARDIO_EQUIPMENT = ("treadmill", "rower")
+
+# Objectifs (texte normalisé, cf. local_nlp.normalize) -> poids des caractéristiques
+GOAL_WEIGHTS = (
+    (("muscle", "muscu", "masse", "hypertroph", "force", "renfor", "perf", "power"),
+     {"compound": 1.0, "loaded": 1.0, "upper": 0.3, "lower": 0.3}),
+    (("gras", "poids", "perte", "maigr", "minc", "seche", "fat", "weight"),
+     {"cardio": 1.0, "compound": 0.8, "bodyweight": 0.4, "lower": 0.3}),
+    (("cardio", "endurance", "souffle", "course", "running"),
+     {"cardio": 1.0, "lower": 0.4, "bodyweight": 0.3}),
+    (("mobilit", "souplesse", "posture", "flexib", "stretch"),
+     {"cooldown": 1.0, "core": 0.6, "warmup": 0.4}),
+    (("sante", "forme", "bien etre", "tonus", "bouger"),
+     {"compound": 0.5, "core": 0.5, "bodyweight": 0.3}),
+)
+# Focus d'une séance du programme de la semaine (coach/weekly_program.py)
+FOCUS_WEIGHTS = (
+    (("haut du corps",), {"upper": 1.5}),
+    (("bas du corps",), {"lower": 1.5}),
+    (("gainage",), {"core": 1.5}),
+    (("mobilite", "recuperation"), {"cooldown": 1.0, "warmup": 0.5}),
+    (("corps entier",), {"compound": 0.8}),
+)
+BASE_WEIGHTS = {"compound": 0.2}
+
+CHOICE_FACTOR = 2
+MIN_CANDIDATES, MAX_CANDIDATES = 12, 40
+
+
+def _has(text: str, hints) -> bool:
+    return any(hint in text for hint in hints)
+
+
+def exercise_features(rows: list) -> tuple:
+    """(matrice float32 n x len(FEATURES), rôles int8) à partir des lignes de CATALOG_QUERY."""
+    features = np.zeros((len(rows), len(FEATURES)), dtype=np.float32)
+    roles = np.full(len(rows), MAIN, dtype=np.int8)
+    for i, row in enumerate(rows):
+        name = (row.get("name") or "").lower()
+        parts = [p.lower() for p in row.get("body_parts") or [] if isinstance(p, str)]
+        equipment = (row.get("equipment") or "").lower()
+        for group, terms in BODY_GROUPS.items():
+            features[i, F[group]] = float(any(_has(part, terms) for part in parts))
+        groups = features[i, F["upper"]] + features[i, F["lower"]] + features[i, F["core"]]
+        features[i, F["compound"]] = min(1.0, max(len(parts) - 1, groups - 1) / 3)
+        features[i, F["loaded"]] = float(equipment in LOADED_EQUIPMENT)
+        features[i, F["bodyweight"]] = float(equipment in BODYWEIGHT_EQUIPMENT)
+        features[i, F["cardio"]] = float(_has(name, CARDIO_HINTS) or equipment in CARDIO_EQUIPMENT)
+        if _has(name, WARMUP_HINTS):
+            features[i, F["warmup"]] = 1.0
+            roles[i] = WARMUP
+        elif _has(name, COOLDOWN_HINTS):
+            features[i, F["cooldown"]] = 1.0
+            roles[i] = COOLDOWN
+    return features, roles
+
+
+def goal_weights(goals, focus: str | None = None) -> np.ndarray:
+    """Vecteur de poids (len(FEATURES)) des objectifs du profil et du focus de la séance."""
+    weights = np.zeros(len(FEATURES), dtype=np.float32)
+    for name, w in BASE_WEIGHTS.items():
+        weights[F[name]] += w
+    text = normalize(" ".join(goals or []))
+    for table, source in ((GOAL_WEIGHTS, text), (FOCUS_WEIGHTS, normalize(focus or ""))):
+        for hints, table_weights in table:
+            if _has(source, hints):
+                for name, w in table_weights.items():
+                    weights[F[name]] += w
+    return weights
+
+
+def exercise_budget(time_min, level: str | None, energy) -> tuple:
+    """
+    (budget, quotas) : nombre d'exercices proposés au LLM pour une séance de
+    `time_min` minutes, et places réservées par rôle.
+    """
+    warm, main, cool = section_sizes(time_min, session_volume(level or "Beginner", energy))
+    budget = max(MIN_CANDIDATES, min(MAX_CANDIDATES, CHOICE_FACTOR * (warm + main + cool)))
+    warm_quota, cool_quota = CHOICE_FACTOR * warm, CHOICE_FACTOR * cool
+    return budget, {WARMUP: warm_quota, MAIN: max(0, budget - warm_quota - cool_quota), COOLDOWN: cool_quota}
+
+
+def top_k(scores: np.ndarray, roles: np.ndarray, budget: int, quotas: dict) -> np.ndarray:
+    """
+    Positions retenues : les meilleurs scores de chaque rôle dans la limite de
+    son quota, places restantes aux meilleurs scores toutes catégories.
+    Renvoyées par rôle (échauffement, corps, retour au calme) puis par score.
+    """
+    order = np.lexsort((np.arange(len(scores)), -scores))  # score décroissant, puis ordre du catalogue
+    ranked_roles = roles[order]
+    keep = np.zeros(len(order), dtype=bool)
+    for role, quota in quotas.items():
+        keep[np.flatnonzero(ranked_roles == role)[:quota]] = True
+    spare = budget - int(keep.sum())
+    if spare > 0:
+        keep[np.flatnonzero(~keep)[:spare]] = True
+    elif spare < 0:
+        keep[np.flatnonzero(keep)[budget:]] = False
+    picked = order[keep]
+    return picked[np.argsort(roles[picked], kind="stable")]
+
+
+def rank_rows(rows: list, weights: np.ndarray, budget: int, quotas: dict) -> list:
+    """Même classement pour des lignes hors snapshot (requête Neo4j de secours)."""
+    if not rows:
+        return []
+    features, roles = exercise_features(rows)
+    return [rows[i] for i in top_k(features @ weights, roles, budget, quotas)]
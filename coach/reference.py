@@ -0,0 +1,37 @@
+"""Données de référence partagées entre l'app Streamlit et les outils backend."""
+
+GRAPH_TAG = "kg-gold-v1" # les exercises "gold standard" vont être tagué par kg-gold-v1, et les autres noeuds en "kg-label-v1"
+NEO4J_DB = "neo4j"
+
+INJURY_KEYS = [
+    "Mal de dos (Lombaires)",
+    "Genoux",
+    "Épaules",
+    "Hanches",
+    "Cou / Cervicales",
+    "Chevilles / Pieds",
+    "Poignets / Avant-bras",
+    "Hernie discale / Rachis",
+    "Aucune",
+]
+
+INJURY_MAP = {
+    "Mal de dos (Lombaires)": ["spine", "lumbar", "vertebrae", "erector", "lower back", "bas du dos"],
+    "Genoux": ["knee", "patella", "meniscus", "genou"],
+    "Épaules": ["rotator", "shoulder", "deltoid", "épaule"],
+    "Hanches": ["hip", "gluteus", "pelvis", "piriformis", "hanche"],
+    "Cou / Cervicales": ["cervical", "neck", "trapezius", "cou"],
+    "Chevilles / Pieds": ["ankle", "foot", "feet", "cheville", "pied"],
+    "Poignets / Avant-bras": ["wrist", "forearm", "poignet", "avant-bras"],
+    "Hernie discale / Rachis": ["herniated", "hernie", "sciatica", "sciatique", "disc", "discale", "rachis", "colonne"],
+    "Aucune": [],
+}
+
+EQUIPMENT_KEYS = [
+    "Barbell", "Dumbbell", "Kettlebell", "Machine", "Cable",
+    "Bench", "Pull-up Bar", "Treadmill", "Rower", "Bands",
+    "Foam Roll", "Bodyweight"
+]
+
+# Matériel toujours considéré comme disponible (cf. filtre Neo4j historique)
+ALWAYS_AVAILABLE_EQUIPMENT = ["none", "bodyweight"]
@@ -0,0 +1,228 @@
+"""
+Lecture incrémentale du JSON de séance renvoyé en streaming par le LLM.
+
+Le parseur suit la structure JSON caractère par caractère et émet un
+événement dès qu'un élément utile est complet, sans attendre la fin :
+  ("strategie", None, "phrase")
+  ("exercise", "echauffement" | "corps" | "retour_calme", {...})
+  ("mot_fin", None, "texte")
+"""
+
+import json
+import re
+
+# Noms de sections acceptés -> nom normalisé
+SECTION_ALIASES = {
+    "echauffement": "echauffement",
+    "corps": "corps",
+    "corps_de_seance": "corps",
+    "retour_calme": "retour_calme",
+    "retour_au_calme": "retour_calme",
+}
+
+
+class _Frame:
+    __slots__ = ("kind", "path", "start", "key", "index", "expect_key")
+
+    def __init__(self, kind: str, path: tuple, start: int):
+        self.kind = kind          # "obj" ou "arr"
+        self.path = path          # chemin depuis la racine, ex: ("seance", "corps", 2)
+        self.start = start        # position de l'accolade / du crochet ouvrant
+        self.key = None           # dernière clé lue (objets)
+        self.index = 0            # indice de l'élément courant (tableaux)
+        self.expect_key = True    # prochaine chaîne = clé (objets)
+
+
+class StreamingPlanParser:
+    """Parseur incrémental : `feed()` renvoie les événements complétés par le morceau reçu."""
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._string_is_key = False
+
+    def feed(self, chunk: str) -> list:
+        self.text += chunk
+        events = []
+        text = self.text
+        while self._pos < len(text):
+            ch = text[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_string_end(events)
+            elif ch == '"':
+                top = self._stack[-1] if self._stack else None
+                self._in_string = True
+                self._string_start = self._pos
+                self._string_is_key = top is not None and top.kind == "obj" and top.expect_key
+            elif ch in "{[":
+                kind = "obj" if ch == "{" else "arr"
+                self._stack.append(_Frame(kind, self._child_path(), self._pos))
+            elif ch in "}]":
+                if self._stack:
+                    frame = self._stack.pop()
+                    if ch == "}":
+                        self._on_object_end(frame, events)
+            elif ch == "," and self._stack:
+                top = self._stack[-1]
+                if top.kind == "arr":
+                    top.index += 1
+                else:
+                    top.expect_key = True
+            elif ch == ":" and self._stack:
+                self._stack[-1].expect_key = False
+            self._pos += 1
+        return events
+
+    # ---------- interne ----------
+
+    def _child_path(self) -> tuple:
+        if not self._stack:
+            return ()
+        top = self._stack[-1]
+        return top.path + ((top.key,) if top.kind == "obj" else (top.index,))
+
+    def _on_string_end(self, events: list):
+        value = json.loads(self.text[self._string_start:self._pos + 1])
+        if self._string_is_key:
+            self._stack[-1].key = value
+            return
+
+        path = self._child_path()
+        if path[:1] == ("strategie",) and len(path) <= 2:
+            events.append(("strategie", None, value))
+        elif path == ("mot_fin",):
+            events.append(("mot_fin", None, value))
+
+    def _on_object_end(self, frame: _Frame, events: list):
+        path = frame.path
+        section = None
+        if len(path) == 3 and path[0] == "seance" and isinstance(path[2], int):
+            section = SECTION_ALIASES.get(path[1])
+        elif len(path) == 2 and path[0] == "seance" and isinstance(path[1], int):
+            # Séance renvoyée sous forme de liste : tout est considéré comme corps de séance
+            section = "corps"
+        if section is None:
+            return
+        try:
+            exercise = json.loads(self.text[frame.start:self._pos + 1])
+        except ValueError:
+            return
+        events.append(("exercise", section, exercise))
+
+
+# ========================= RÉPARATION (JSON TRONQUÉ / MAL FORMÉ) =========================
+
+# ```json ... ``` autour de la réponse (fence fermante absente si la réponse est tronquée)
+_CODE_FENCE = re.compile(r"```[\w-]*\s*(.*?)\s*(?:```)?\s*$", re.DOTALL)
+
+
+def strip_code_fences(text: str) -> str:
+    """Contenu d'une réponse entourée de ``` ; texte inchangé sinon."""
+    stripped = text.strip()
+    if not stripped.startswith("```"):
+        return text
+    return _CODE_FENCE.match(stripped).group(1)
+
+
+def close_truncated_json(text: str) -> str:
+    """
+    JSON coupé en cours de route -> JSON fermé : le dernier élément incomplet
+    (chaîne, nombre, clé sans valeur) est retiré, puis les tableaux et objets
+    encore ouverts sont refermés. Le texte avant la première accolade
+    (``` json, phrase d'introduction) est ignoré.
+    """
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("Aucun objet JSON dans la réponse")
+
+    stack = []         # [fermant, prochaine chaîne = clé ?] par conteneur ouvert
+    safe = None        # (fin du texte gardé, fermants à ajouter)
+    in_string = escape = is_key = False
+
+    def mark_safe(end: int):
+        nonlocal safe
+        safe = (end, "".join(closer for closer, _ in reversed(stack)))
+
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                if not is_key:
+                    mark_safe(i + 1)
+        elif ch == '"':
+            in_string = True
+            is_key = bool(stack) and stack[-1][0] == "}" and stack[-1][1]
+        elif ch in "{[":
+            stack.append(["}" if ch == "{" else "]", True])
+            mark_safe(i + 1)
+        elif ch in "}]":
+            if not stack:
+                break  # texte après l'objet racine
+            stack.pop()
+            mark_safe(i + 1)
+            if not stack:
+                break
+        elif ch == "," and stack:
+            mark_safe(i)  # la valeur précédente est complète
+            stack[-1][1] = True
+        elif ch == ":" and stack:
+            stack[-1][1] = False
+
+    if safe is None:
+        raise ValueError("JSON vide")
+    end, closers = safe
+    return text[start:end] + closers
+
+
+def repair_plan_json(text: str) -> tuple:
+    """
+    (plan, issue) avec issue = "ok" (JSON valide, éventuellement entre ```)
+    ou "repaired". Réparation : structure refermée (stratégie, mot de fin...)
+    et séance reconstruite avec les seuls exercices complets (cf.
+    StreamingPlanParser). ValueError si le corps de séance n'a aucun exercice
+    complet : une séance sans corps n'en est pas une (repli local).
+    """
+    text = strip_code_fences(text)
+    try:
+        plan = json.loads(text)
+        if isinstance(plan, dict):
+            return plan, "ok"
+    except ValueError:
+        pass
+
+    try:
+        plan = json.loads(close_truncated_json(text))
+    except ValueError:
+        plan = None
+    if not isinstance(plan, dict):
+        plan = {}
+
+    seance = {}
+    strategie = []
+    for kind, section, payload in StreamingPlanParser().feed(text[text.find("{"):]):
+        if kind == "exercise":
+            seance.setdefault(section, []).append(payload)
+        elif kind == "strategie":
+            strategie.append(payload)
+    if not seance.get("corps"):
+        raise ValueError("Séance illisible : aucun exercice complet dans le corps de séance")
+
+    plan["seance"] = seance
+    if not isinstance(plan.get("strategie"), list):
+        plan["strategie"] = strategie
+    return plan, "repaired"
@@ -0,0 +1,157 @@
+"""
+Chronométrage des étapes (requêtes Neo4j, appels LLM, parsing, rendu).
+
+Chaque étape est un span : nom + durée + tags (page, modèle, lignes,
+tokens...). Les spans alimentent :
+  - un histogramme par étape, exporté au format texte Prometheus
+    (`prometheus_text()`, servi par `serve_metrics()` si un port est donné),
+  - un journal JSON lines optionnel (une ligne par span),
+  - la liste de la session en cours, si une session est liée au contexte
+    courant (`tracer.session(...)`) : c'est elle qu'affiche le panneau.
+D'autres briques peuvent ajouter leurs jauges / compteurs à l'export
+Prometheus (`add_metric`), lus au moment du scrape.
+"""
+
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bornes des histogrammes (secondes) : de la requête en mémoire à la génération LLM
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Spans de la session liée au contexte courant + tags communs (page, ...)
+_session = contextvars.ContextVar("coach_trace_session", default=None)
+
+
+class Span:
+    __slots__ = ("name", "tags", "started_at", "duration_sec")
+
+    def __init__(self, name: str, tags: dict):
+        self.name = name
+        self.tags = tags
+        self.started_at = time.time()
+        self.duration_sec = 0.0
+
+    def tag(self, **tags):
+        """Ajoute des tags connus seulement en fin d'étape (lignes, tokens...)."""
+        self.tags.update(tags)
+
+    def to_dict(self) -> dict:
+        return {
+            "ts": round(self.started_at, 3),
+            "name": self.name,
+            "duration_ms": round(self.duration_sec * 1000, 2),
+            "tags": self.tags,
+        }
+
+
+class Tracer:
+    """Collecteur process-wide (histogrammes + journal JSON lines optionnel)."""
+
+    def __init__(self, jsonl_path: str | None = None, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._histograms = {}  # nom -> [compteurs par borne, somme, nombre]
+        self._metrics = {}     # nom -> (aide, type, fonction de lecture)
+        self._log = open(jsonl_path, "a", buffering=1, encoding="utf-8") if jsonl_path else None
+
+    @contextmanager
+    def session(self, spans: list | None, **tags):
+        """
+        Lie la liste `spans` (et des tags communs) aux spans ouverts dans ce
+        contexte ; `spans` None : tags seuls, rien n'est gardé par session.
+        """
+        token = _session.set((spans, tags))
+        try:
+            yield
+        finally:
+            _session.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **tags):
+        bound = _session.get()
+        if bound is not None:
+            tags = {**bound[1], **tags}
+        span = Span(name, tags)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            # Erreur, ou contrôle de flux Streamlit (st.rerun -> RerunException)
+            span.tags["exit"] = type(e).__name__
+            raise
+        finally:
+            span.duration_sec = time.perf_counter() - started
+            self.record(span)
+            if bound is not None and bound[0] is not None:
+                bound[0].append(span.to_dict())
+
+    def record(self, span: Span):
+        with self._lock:
+            hist = self._histograms.setdefault(span.name, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if span.duration_sec <= bound:
+                    hist[0][i] += 1
+            hist[1] += span.duration_sec
+            hist[2] += 1
+            if self._log is not None:
+                self._log.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+    def add_metric(self, name: str, help_text: str, read, kind: str = "gauge"):
+        """Métrique lue à chaque export (`read()` -> nombre), ex: utilisation d'un pool."""
+        with self._lock:
+            self._metrics[name] = (help_text, kind, read)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {"count": count, "avg_ms": round(total / count * 1000, 2) if count else 0.0}
+                for name, (_, total, count) in self._histograms.items()
+            }
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP coach_stage_duration_seconds Durée des étapes instrumentées du coach.",
+            "# TYPE coach_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name, (counts, total, count) in sorted(self._histograms.items()):
+                for bound, n in zip(self.buckets, counts):
+                    lines.append(f'coach_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {n}')
+                lines.append(f'coach_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+                lines.append(f'coach_stage_duration_seconds_sum{{stage="{name}"}} {total:.6f}')
+                lines.append(f'coach_stage_duration_seconds_count{{stage="{name}"}} {count}')
+            metrics = sorted(self._metrics.items())
+        for name, (help_text, kind, read) in metrics:
+            try:
+                value = float(read())
+            except Exception:
+                continue  # une métrique illisible ne doit pas casser tout l'export
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(tracer: Tracer, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Expose GET /metrics (texte Prometheus) sur un thread de fond."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = tracer.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # pas de log par requête de scrape
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="coach-metrics", daemon=True).start()
+    return server
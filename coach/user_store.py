@@ -0,0 +1,268 @@
+"""
+Profil et historique persistants des utilisateurs (profil, dernier
+feedback, nombre de séances, programme de la semaine), indexés par un
+identifiant utilisateur.
+
+Deux backends : SQLite (local, par défaut) ou Neo4j (nœuds :User).
+`UserStore` les enveloppe :
+  - lectures servies par un cache LRU mémoire (une requête au plus par
+    utilisateur tant qu'il reste dans le cache),
+  - écritures "write-behind" : la mise à jour est visible tout de suite
+    dans le cache, puis écrite par lots sur un thread de fond.
+"""
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Champs persistés (même nom que dans st.session_state)
+USER_FIELDS = ("user_profile", "last_feedback", "sessions_done", "weekly_program")
+
+
+def _dumps(value) -> str:
+    # Séances du programme gardées en Plan (coach/plan.py) : forme JSON au stockage
+    return json.dumps(value, ensure_ascii=False, default=lambda obj: obj.to_dict())
+
+
+def _record(user_profile, last_feedback, sessions_done, weekly_program=None) -> dict:
+    return {
+        "user_profile": json.loads(user_profile) if user_profile else {},
+        "last_feedback": json.loads(last_feedback) if last_feedback else None,
+        "sessions_done": int(sessions_done or 0),
+        "weekly_program": json.loads(weekly_program) if weekly_program else None,
+    }
+
+
+# ========================= BACKENDS =========================
+
+class SQLiteUserBackend:
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id       TEXT    PRIMARY KEY,
+        user_profile  TEXT,
+        last_feedback TEXT,
+        sessions_done INTEGER NOT NULL DEFAULT 0,
+        weekly_program TEXT,
+        updated_at    REAL    NOT NULL
+    )
+    """
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(self.SCHEMA)
+        # Base créée avant le programme de la semaine : colonne ajoutée en place
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(users)")}
+        if "weekly_program" not in columns:
+            self._conn.execute("ALTER TABLE users ADD COLUMN weekly_program TEXT")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def load(self, user_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT user_profile, last_feedback, sessions_done, weekly_program FROM users WHERE user_id = ?",
+                (user_id,),
+            ).fetchone()
+        return _record(*row) if row else None
+
+    def save_many(self, records: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO users (user_id, user_profile, last_feedback, sessions_done, weekly_program, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    user_profile = excluded.user_profile,
+                    last_feedback = excluded.last_feedback,
+                    sessions_done = excluded.sessions_done,
+                    weekly_program = excluded.weekly_program,
+                    updated_at = excluded.updated_at
+                """,
+                [
+                    (
+                        uid,
+                        _dumps(r["user_profile"]),
+                        _dumps(r["last_feedback"]),
+                        r["sessions_done"],
+                        _dumps(r.get("weekly_program")),
+                        now,
+                    )
+                    for uid, r in records.items()
+                ],
+            )
+            self._conn.commit()
+
+
+class Neo4jUserBackend:
+    """(:User {id}) avec profil / feedback en JSON (Neo4j ne stocke pas de maps)."""
+
+    LOAD_QUERY = """
+    MATCH (u:User {id: $user_id})
+    RETURN u.user_profile AS user_profile, u.last_feedback AS last_feedback,
+           u.sessions_done AS sessions_done, u.weekly_program AS weekly_program
+    """
+
+    SAVE_QUERY = """
+    UNWIND $rows AS r
+    MERGE (u:User {id: r.user_id})
+    SET u.user_profile = r.user_profile,
+        u.last_feedback = r.last_feedback,
+        u.sessions_done = r.sessions_done,
+        u.weekly_program = r.weekly_program,
+        u.updated_at = datetime()
+    """
+
+    def __init__(self, client):
+        self._client = client  # coach.neo4j_client.Neo4jClient
+
+    def load(self, user_id: str):
+        rows = self._client.read(self.LOAD_QUERY, {"user_id": user_id})
+        return _record(**rows[0]) if rows else None
+
+    def save_many(self, records: dict):
+        self._client.write(self.SAVE_QUERY, {"rows": [
+            {
+                "user_id": uid,
+                "user_profile": _dumps(r["user_profile"]),
+                "last_feedback": _dumps(r["last_feedback"]),
+                "sessions_done": r["sessions_done"],
+                "weekly_program": _dumps(r.get("weekly_program")),
+            }
+            for uid, r in records.items()
+        ]})
+
+
+# ========================= CACHE + WRITE-BEHIND =========================
+
+class UserStore:
+    """Cache LRU en lecture, écritures regroupées et différées (thread de fond)."""
+
+    def __init__(self, backend, flush_interval_sec: float = 2.0, max_batch: int = 200, cache_size: int = 2048):
+        self.backend = backend
+        self.flush_interval_sec = flush_interval_sec
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # user_id -> record (ou None = inconnu)
+        self._pending = {}           # user_id -> dernier record à écrire
+        self._inflight = {}          # lot en cours d'écriture (encore lisible pendant l'écriture)
+        self._wake = threading.Event()
+        self._closed = False
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+        self._thread = threading.Thread(target=self._run, name="coach-user-store", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ---------- lecture ----------
+
+    def get(self, user_id: str):
+        """Record {"user_profile", "last_feedback", "sessions_done", "weekly_program"} ou None si inconnu."""
+        with self._lock:
+            if user_id in self._cache:
+                self._cache.move_to_end(user_id)
+                self.hits += 1
+                record = self._cache[user_id]
+                return dict(record) if record is not None else None
+            self.misses += 1
+
+        record = self.backend.load(user_id)
+        with self._lock:
+            # Une écriture en attente (ou en cours) est plus récente que la base
+            record = self._pending.get(user_id) or self._inflight.get(user_id) or record
+            self._remember(user_id, record)
+        return dict(record) if record is not None else None
+
+    # ---------- écriture ----------
+
+    def put(self, user_id: str, **fields):
+        """
+        Met à jour le cache immédiatement ; l'écriture en base est différée.
+        Les champs absents reprennent la dernière valeur connue en mémoire.
+        """
+        unknown = set(fields) - set(USER_FIELDS)
+        if unknown:
+            raise ValueError(f"Champs inconnus : {sorted(unknown)}")
+        with self._lock:
+            known = self._cache.get(user_id) or self._pending.get(user_id) or self._inflight.get(user_id)
+            record = dict(known or {"user_profile": {}, "last_feedback": None, "sessions_done": 0, "weekly_program": None})
+            record.update(fields)
+            self._remember(user_id, record)
+            self._pending[user_id] = record
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Écrit tout ce qui est en attente (lots de `max_batch`)."""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                batch = dict(list(self._pending.items())[:self.max_batch])
+                for uid in batch:
+                    del self._pending[uid]
+                self._inflight = batch
+            try:
+                self.backend.save_many(batch)
+                with self._lock:
+                    self._inflight = {}
+                    self.flushes += 1
+            except Exception as e:
+                logger.warning("Écriture de %d profil(s) impossible, nouvel essai plus tard : %s", len(batch), e)
+                with self._lock:
+                    self._inflight = {}
+                    self.flush_errors += 1
+                    # Remettre le lot sans écraser une mise à jour arrivée entre-temps
+                    for uid, record in batch.items():
+                        self._pending.setdefault(uid, record)
+                return
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    # ---------- interne ----------
+
+    def _remember(self, user_id: str, record):
+        self._cache[user_id] = record
+        self._cache.move_to_end(user_id)
+        # Une entrée évincée mais pas encore écrite reste lisible via _pending (cf. get)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval_sec)
+            self._wake.clear()
+            self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cached": len(self._cache),
+                "pending": len(self._pending),
+                "hits": self.hits,
+                "misses": self.misses,
+                "flushes": self.flushes,
+                "flush_errors": self.flush_errors,
+            }
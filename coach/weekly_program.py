@@ -0,0 +1,166 @@
+"""
+Programme de la semaine : les `sessions_per_week` séances générées d'un
+coup (sous-requêtes en parallèle, une par séance, chacune avec son focus
+pour équilibrer la semaine), stockées et versionnées avec le profil.
+
+Au check-in, la séance du jour n'est plus générée : `adjust_plan` adapte
+localement (quelques µs) la séance prévue à l'état du jour :
+  - douleurs : exercices devenus interdits retirés,
+  - énergie  : séries / repos décalés comme dans le planificateur local,
+  - temps    : corps de séance raccourci (moins d'exercices) ou allongé
+               (une série de plus).
+Si l'ajustement ne tient pas (corps de séance vide), le check-in repasse
+par la génération habituelle.
+
+Un programme est valable pour une semaine ISO et un profil donnés
+(`profile_fingerprint`) ; chaque régénération incrémente `version`.
+En mémoire, ses séances sont des Plan partagés (ids d'exercices, cf.
+coach/plan.py) ; la forme JSON n'existe qu'au stockage (`to_dict()`).
+"""
+
+import datetime
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+from coach.local_planner import MIN_MAIN, section_sizes, session_volume
+from coach.plan import ExerciseItem, Plan, Section, intern_plan, parse_plan
+
+# Contexte de référence des séances du programme (celui du check-in par défaut)
+PROGRAM_CONTEXT = {"time": 30, "energy": 6, "daily_pain": ["Aucune"], "note": ""}
+
+# Répartition de la semaine selon le nombre de séances
+WEEK_FOCUS = {
+    1: ("Corps entier",),
+    2: ("Corps entier, dominante haut du corps", "Corps entier, dominante bas du corps"),
+    3: ("Haut du corps", "Bas du corps", "Corps entier"),
+    4: ("Haut du corps", "Bas du corps", "Haut du corps (variante)", "Bas du corps et gainage"),
+    5: ("Haut du corps", "Bas du corps", "Gainage et mobilité", "Haut du corps (variante)", "Bas du corps (variante)"),
+}
+MAX_SESSIONS = 7
+LONGER_SESSION_RATIO = 1.4  # temps du jour >= 1,4 x temps prévu : une série de plus
+
+
+def week_focuses(sessions_per_week) -> tuple:
+    """Focus de chaque séance de la semaine (1 à 7 séances)."""
+    n = max(1, min(MAX_SESSIONS, int(sessions_per_week or 3)))
+    if n in WEEK_FOCUS:
+        return WEEK_FOCUS[n]
+    return WEEK_FOCUS[5] + ("Corps entier", "Mobilité et récupération active")[: n - 5]
+
+
+def current_week(today: datetime.date | None = None) -> str:
+    """Semaine ISO, ex: '2026-W42'."""
+    year, week, _ = (today or datetime.date.today()).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def profile_fingerprint(profile: dict) -> str:
+    """Hash des champs du profil qui changent les séances."""
+    parts = {
+        "level": profile.get("level"),
+        "goals": sorted(profile.get("goals") or []),
+        "equipment": sorted(profile.get("equipment") or []),
+        "injuries": sorted(profile.get("injuries") or []),
+        "sessions_per_week": profile.get("sessions_per_week"),
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def build_program(profile: dict, generate, previous: dict | None = None, week: str | None = None) -> dict:
+    """
+    Génère les séances de la semaine en parallèle. `generate(context, day)`
+    renvoie (Plan ou None, source) ; une séance manquante fait échouer le
+    programme (ValueError) plutôt que de laisser un trou dans la semaine.
+    """
+    focuses = week_focuses(profile.get("sessions_per_week"))
+    contexts = [{**PROGRAM_CONTEXT, "focus": focus} for focus in focuses]
+    with ThreadPoolExecutor(max_workers=len(contexts), thread_name_prefix="coach-week") as pool:
+        results = list(pool.map(generate, contexts, range(len(contexts))))
+    if any(plan is None for plan, _ in results):
+        raise ValueError("Programme incomplet : au moins une séance n'a pas pu être générée")
+    return {
+        "version": (previous or {}).get("version", 0) + 1,
+        "week": week or current_week(),
+        "profile": profile_fingerprint(profile),
+        "created_at": time.time(),
+        "context": dict(PROGRAM_CONTEXT),
+        "sessions": [
+            {"focus": ctx["focus"], "source": source, "plan": plan}
+            for ctx, (plan, source) in zip(contexts, results)
+        ],
+        "next": 0,
+    }
+
+
+def program_plans(program: dict | None) -> dict | None:
+    """Programme relu du stockage (séances en JSON) -> séances en Plan partagés ; déjà converti : inchangé."""
+    if not isinstance(program, dict):
+        return program
+    sessions = [
+        {**session, "plan": session["plan"] if isinstance(session["plan"], Plan) else parse_plan(session["plan"])}
+        for session in program.get("sessions") or []
+    ]
+    return {**program, "sessions": sessions}
+
+
+def is_current(program: dict | None, profile: dict, week: str | None = None) -> bool:
+    """Programme de cette semaine, pour ce profil, avec encore au moins une séance à faire."""
+    return (
+        isinstance(program, dict)
+        and program.get("week") == (week or current_week())
+        and program.get("profile") == profile_fingerprint(profile)
+        and program.get("next", 0) < len(program.get("sessions") or [])
+    )
+
+
+def _retuned(ex: ExerciseItem, sets_delta: int, rest_delta: int) -> ExerciseItem:
+    if ex.sets is None:
+        return ex
+    rest_sec = max(30, ex.rest_sec + rest_delta) if ex.rest_sec is not None else None
+    return replace(ex, sets=max(1, ex.sets + sets_delta), rest_sec=rest_sec)
+
+
+def adjust_plan(plan: Plan, planned: dict, context: dict, level: str, safe_names) -> Plan | None:
+    """
+    Séance prévue (contexte `planned`) -> séance du jour (`context`).
+    `safe_names` : noms des exercices sûrs avec les douleurs du jour.
+    None si le corps de séance ne tient plus (tout est devenu interdit).
+    """
+    safe_names = set(safe_names)
+    planned_volume = session_volume(level, planned.get("energy"))
+    volume = session_volume(level, context.get("energy"))
+    sets_delta = volume["sets"] - planned_volume["sets"]
+    rest_delta = volume["rest_sec"] - planned_volume["rest_sec"]
+
+    planned_time = int(planned.get("time") or 30)
+    time_min = int(context.get("time") or planned_time)
+    if time_min >= planned_time * LONGER_SESSION_RATIO:
+        sets_delta += 1
+    # Même écart de taille que le planificateur local entre les deux durées
+    main_delta = section_sizes(time_min, volume)[1] - section_sizes(planned_time, volume)[1]
+
+    sections, removed = [], 0
+    for section in plan.sections:
+        exercises = [ex for ex in section.exercises if ex.name in safe_names]
+        removed += len(section.exercises) - len(exercises)
+        if section.key == "corps":
+            if not exercises:
+                return None
+            if main_delta < 0:
+                exercises = exercises[: max(MIN_MAIN, len(exercises) + main_delta)]
+            exercises = [_retuned(ex, sets_delta, rest_delta) for ex in exercises]
+        sections.append(Section(section.key, tuple(exercises)))
+
+    notes = []
+    if removed:
+        notes.append(f"{removed} exercice(s) retiré(s) pour ménager tes douleurs du jour.")
+    if sets_delta < 0:
+        notes.append("Une série de moins et des repos allongés pour ton énergie du jour.")
+    elif sets_delta > 0:
+        notes.append("Une série de plus par exercice aujourd'hui.")
+    if time_min != planned_time:
+        notes.append(f"Séance adaptée à {time_min} min.")
+    return intern_plan(Plan(strategie=plan.strategie + tuple(notes), sections=tuple(sections), mot_fin=plan.mot_fin))
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests lancés avec `pytest` depuis n'importe où : le paquet coach/ est à la racine du dépôt
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
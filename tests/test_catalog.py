@@ -0,0 +1,141 @@
+"""Snapshot mémoire (coach/catalog.py) : même résultat que la requête Cypher, cache des exercices sûrs."""
+
+import random
+
+import pytest
+
+from benchmarks.fakes import synthetic_catalog
+from coach.catalog import EXERCISE_FIELDS, CatalogSnapshot, SafeExerciseCache
+from coach.graph import safe_query_params
+from coach.reference import EQUIPMENT_KEYS, INJURY_KEYS, INJURY_MAP
+
+
+def cypher_safe_exercises(rows: list, params: dict) -> list:
+    """SAFE_EXERCISES_QUERY en Python, null compris (toLower(null) IN ... -> null -> ligne écartée)."""
+    equipment, banned = params["equipment"], params["banned_terms"]
+    out = []
+    for row in rows:
+        primary = row["equipment"]
+        if primary is None or primary.lower() not in equipment:
+            continue
+        secondary = row["equipment_secondary"] if row["equipment_secondary"] is not None else ["none"]
+        if not all(sec is not None and (sec.lower() in equipment or sec.lower() == "none") for sec in secondary):
+            continue
+        parts = [part.lower() for part in row["body_parts"] if part is not None]
+        if any(term in part for part in parts for term in banned):
+            continue
+        out.append(tuple(row[k] for k in EXERCISE_FIELDS))
+    # RETURN DISTINCT ... ORDER BY name
+    return sorted(dict.fromkeys(out), key=lambda ex: ex[0])
+
+
+def catalog_rows() -> list:
+    """Catalogue synthétique + cas limites, trié par nom comme CATALOG_QUERY."""
+    rows = synthetic_catalog(300, seed=7)
+    base = {"name_fr": None, "video": None, "image_url": None}
+    rows += [
+        {**base, "name": "Edge Upper Case", "equipment": "DUMBBELL", "equipment_secondary": ["BENCH"],
+         "body_parts": ["Chest"]},
+        {**base, "name": "Edge No Equipment", "equipment": None, "equipment_secondary": None,
+         "body_parts": ["abdominals"]},
+        {**base, "name": "Edge Null Secondary", "equipment": "Bodyweight", "equipment_secondary": ["Bench", None],
+         "body_parts": ["triceps"]},
+        {**base, "name": "Edge Empty Secondary", "equipment": "Kettlebell", "equipment_secondary": [],
+         "body_parts": ["hamstrings"]},
+        {**base, "name": "Edge None Secondary", "equipment": "Barbell", "equipment_secondary": ["NONE"],
+         "body_parts": ["Lower Back", None]},
+        {**base, "name": "Edge Unknown Equipment", "equipment": "TRX", "equipment_secondary": None,
+         "body_parts": ["lats"]},
+    ]
+    rows.append(dict(rows[0]))  # ligne en double : RETURN DISTINCT
+    return sorted(rows, key=lambda row: row["name"])
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return catalog_rows()
+
+
+@pytest.fixture(scope="module")
+def snapshot(rows):
+    return CatalogSnapshot(rows, INJURY_MAP, EQUIPMENT_KEYS)
+
+
+def test_snapshot_matches_cypher_filter_on_random_profiles(rows, snapshot):
+    rng = random.Random(0)
+    for _ in range(300):
+        equipment = rng.sample(EQUIPMENT_KEYS, rng.randint(0, len(EQUIPMENT_KEYS)))
+        pains = rng.sample(INJURY_KEYS, rng.randint(0, 3))
+        expected = cypher_safe_exercises(rows, safe_query_params(equipment, pains, materialized=False))
+        got = [tuple(ex[k] for k in EXERCISE_FIELDS) for ex in snapshot.safe_exercises(equipment, pains, limit=None)]
+        assert got == expected, (equipment, pains)
+
+
+def test_snapshot_edge_rows(snapshot):
+    names = {ex["name"] for ex in snapshot.safe_exercises(EQUIPMENT_KEYS, [], limit=None)}
+    assert {"Edge Upper Case", "Edge Empty Secondary", "Edge None Secondary"} <= names
+    assert not names & {"Edge No Equipment", "Edge Null Secondary", "Edge Unknown Equipment"}
+
+    backs = {ex["name"] for ex in snapshot.safe_exercises(EQUIPMENT_KEYS, ["Mal de dos (Lombaires)"], limit=None)}
+    assert "Edge None Secondary" not in backs
+
+
+def test_safe_exercises_limit_keeps_catalog_order(snapshot):
+    everything = snapshot.safe_exercises(["Dumbbell", "Bench"], ["Genoux"], limit=None)
+    assert snapshot.safe_exercises(["Dumbbell", "Bench"], ["Genoux"], limit=5) == everything[:5]
+
+
+# ---------- SafeExerciseCache ----------
+
+def compute_once(result):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [dict(ex) for ex in result]
+
+    return compute, calls
+
+
+def test_cache_key_ignores_order_case_duplicates_and_neutral_values():
+    cache = SafeExerciseCache(INJURY_MAP)
+    key = cache.make_key(["Dumbbell", "Bench"], ["Genoux", "Épaules"])
+    assert cache.make_key(["bench", "DUMBBELL", "Bench", "Bodyweight", "none"], ["Épaules", "Genoux", "Aucune"]) == key
+    assert cache.make_key(["Dumbbell"], ["Genoux", "Épaules"]) != key
+    assert cache.make_key(["Dumbbell", "Bench"], ["Genoux"]) != key
+
+
+def test_cache_hit_returns_copies():
+    cache = SafeExerciseCache(INJURY_MAP)
+    compute, calls = compute_once([{"name": "Push Up"}])
+    first = cache.get_or_compute("tag", "v1", ["Bench"], ["Genoux"], compute)
+    first[0]["name"] = "modifié"
+    again = cache.get_or_compute("tag", "v1", ["bench"], ["Genoux", "Aucune"], compute)
+    assert again == [{"name": "Push Up"}]
+    assert len(calls) == 1 and cache.hits == 1
+
+
+def test_cache_separates_ranking_parameters():
+    cache = SafeExerciseCache(INJURY_MAP)
+    compute, calls = compute_once([{"name": "Push Up"}])
+    cache.get_or_compute("tag", "v1", ["Bench"], [], compute, ranking=("w", 12))
+    cache.get_or_compute("tag", "v1", ["Bench"], [], compute, ranking=("w", 18))
+    cache.get_or_compute("tag", "v1", ["Bench"], [], compute, ranking=None)
+    assert len(calls) == 3
+
+
+def test_cache_scope_change_invalidates():
+    cache = SafeExerciseCache(INJURY_MAP)
+    compute, calls = compute_once([{"name": "Push Up"}])
+    cache.get_or_compute("tag", "v1", ["Bench"], [], compute)
+    cache.get_or_compute("tag", "v2", ["Bench"], [], compute)
+    cache.get_or_compute("other", "v2", ["Bench"], [], compute)
+    assert len(calls) == 3 and cache.invalidations == 2
+
+
+def test_cache_does_not_keep_empty_results():
+    cache = SafeExerciseCache(INJURY_MAP)
+    compute, calls = compute_once([])
+    cache.get_or_compute("tag", "v1", ["Bench"], [], compute)
+    cache.get_or_compute("tag", "v1", ["Bench"], [], compute)
+    assert len(calls) == 2
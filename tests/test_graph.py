@@ -0,0 +1,89 @@
+"""Requêtes exercices sûrs et maintenance (coach/graph.py)."""
+
+import os
+import random
+from unittest import mock
+
+import pytest
+
+from coach.catalog import EXERCISE_FIELDS, load_catalog_snapshot
+from coach.graph import (
+    SAFE_EXERCISES_MATERIALIZED_QUERY,
+    SAFE_EXERCISES_QUERY,
+    SCHEMA_STATEMENTS,
+    injury_map_version,
+    is_materialized,
+    materialize,
+    safe_query_params,
+)
+from coach.reference import EQUIPMENT_KEYS, GRAPH_TAG, INJURY_KEYS, INJURY_MAP, NEO4J_DB
+
+
+def test_safe_query_params():
+    historic = safe_query_params(["Dumbbell"], ["Genoux", "Aucune"], materialized=False)
+    assert historic["equipment"][0] == "dumbbell" and "bodyweight" in historic["equipment"]
+    assert historic["banned_terms"] == [t.lower() for t in INJURY_MAP["Genoux"]]
+
+    materialized = safe_query_params(["Dumbbell"], ["Genoux", "Aucune"], materialized=True)
+    assert materialized["zones"] == ["Genoux"]
+
+
+def test_materialize_rebuilds_in_one_write_transaction():
+    session, tx = mock.MagicMock(), mock.MagicMock()
+    session.execute_write.side_effect = lambda work, *args: work(tx, *args)
+    tx.run.return_value.consume.return_value.counters.relationships_created = 3
+
+    stats = materialize(session)
+
+    assert stats == {"zones": sum(1 for terms in INJURY_MAP.values() if terms), "unsafe_for_edges": 3}
+    # Seul le schéma passe hors transaction
+    assert [c.args[0] for c in session.run.call_args_list] == SCHEMA_STATEMENTS
+    session.execute_write.assert_called_once()
+    queries = [c.args[0] for c in tx.run.call_args_list]
+    assert "REMOVE m.injury_map_version" in queries[0]
+    assert "DELETE r" in queries[-3] and "MERGE (e)-[:UNSAFE_FOR]->(zone)" in queries[-2]
+    assert "SET m.injury_map_version" in queries[-1]
+    assert tx.run.call_args_list[-1].args[1]["version"] == injury_map_version()
+
+
+def test_is_materialized_checks_injury_map_version():
+    assert is_materialized(lambda q, p: [{"version": injury_map_version()}])
+    assert not is_materialized(lambda q, p: [{"version": "ancienne"}])
+    assert not is_materialized(lambda q, p: [])
+
+
+# ---------- Neo4j réel (optionnel) ----------
+
+@pytest.fixture(scope="module")
+def neo4j_read():
+    uri = os.environ.get("NEO4J_TEST_URI")
+    if not uri:
+        pytest.skip("NEO4J_TEST_URI non défini : pas de Neo4j de test")
+    from neo4j import GraphDatabase
+
+    auth = (os.environ.get("NEO4J_TEST_USER", "neo4j"), os.environ.get("NEO4J_TEST_PASSWORD", ""))
+    with GraphDatabase.driver(uri, auth=auth) as driver:
+        def read(query, params):
+            with driver.session(database=os.environ.get("NEO4J_TEST_DB", NEO4J_DB)) as session:
+                return session.run(query, params).data()
+        yield read
+
+
+def test_snapshot_matches_cypher_queries_on_live_graph(neo4j_read):
+    snapshot = load_catalog_snapshot(neo4j_read, GRAPH_TAG, INJURY_MAP, EQUIPMENT_KEYS)
+    queries = [(SAFE_EXERCISES_QUERY, False)]
+    if is_materialized(neo4j_read):
+        queries.append((SAFE_EXERCISES_MATERIALIZED_QUERY, True))
+
+    rng = random.Random(0)
+    for _ in range(50):
+        equipment = rng.sample(EQUIPMENT_KEYS, rng.randint(0, len(EQUIPMENT_KEYS)))
+        pains = rng.sample(INJURY_KEYS, rng.randint(0, 3))
+        expected = [
+            tuple(ex[k] for k in EXERCISE_FIELDS)
+            for ex in snapshot.safe_exercises(equipment, pains, limit=None)
+        ]
+        for query, materialized in queries:
+            rows = neo4j_read(query, safe_query_params(equipment, pains, materialized))
+            got = list(dict.fromkeys(tuple(r[k] for k in EXERCISE_FIELDS) for r in rows))
+            assert got == expected, (materialized, equipment, pains)
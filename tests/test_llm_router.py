@@ -0,0 +1,150 @@
+"""Routeur de modèles LLM et disjoncteur (coach/llm_router.py)."""
+
+import pytest
+
+from coach import llm_router
+from coach.llm_router import CLOSED, HALF_OPEN, OPEN, ModelRouter, NoFallback, call_with_fallback
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_router.time, "time", clock)
+    return clock
+
+
+def make_router(**kwargs):
+    options = {"error_rate": 0.5, "min_calls": 4, "max_consecutive_failures": 3, "open_sec": 30.0, **kwargs}
+    return ModelRouter({"session": ["a", "b"]}, **options)
+
+
+def state(router, model):
+    return router.stats()[model]["state"]
+
+
+def test_consecutive_failures_open_the_circuit(clock):
+    router = make_router()
+    for _ in range(2):
+        router.record("a", 0.1, ok=False)
+    assert state(router, "a") == CLOSED
+    router.record("a", 0.1, ok=False)
+    assert state(router, "a") == OPEN
+    assert router.candidates("session") == ["b"]
+    assert router.open_circuits() == 1
+
+
+def test_error_rate_opens_after_min_calls(clock):
+    router = make_router(max_consecutive_failures=10)
+    for ok in (True, True, False):
+        router.record("a", 0.1, ok=ok)
+    assert state(router, "a") == CLOSED
+    router.record("a", 0.1, ok=False)  # 2 échecs sur 4 = 50 %
+    assert state(router, "a") == OPEN
+
+
+def test_half_open_allows_a_single_trial_then_closes_on_success(clock):
+    router = make_router()
+    for _ in range(3):
+        router.record("a", 0.1, ok=False)
+    clock.now += 29
+    assert router.candidates("session") == ["b"]
+    clock.now += 1
+    assert router.candidates("session") == ["b", "a"]   # essai après les modèles sains
+    assert state(router, "a") == HALF_OPEN
+    assert router.candidates("session") == ["b"]        # un seul essai à la fois
+    router.record("a", 0.2, ok=True)
+    assert state(router, "a") == CLOSED
+    assert router.stats()["a"]["calls"] == 1            # fenêtre repartie de l'essai
+
+
+def test_failed_trial_reopens(clock):
+    router = make_router()
+    for _ in range(3):
+        router.record("a", 0.1, ok=False)
+    clock.now += 30
+    router.candidates("session")
+    router.record("a", 0.1, ok=False)
+    assert state(router, "a") == OPEN
+    clock.now += 29
+    assert router.candidates("session") == ["b"]
+
+
+def test_release_returns_the_trial_slot(clock):
+    router = make_router()
+    for _ in range(3):
+        router.record("a", 0.1, ok=False)
+    clock.now += 30
+    assert "a" in router.candidates("session")
+    router.release(["a"])
+    assert "a" in router.candidates("session")
+
+
+def test_candidates_fastest_first_unmeasured_before_measured(clock):
+    router = ModelRouter({"session": ["slow", "fast", "new"]})
+    router.record("slow", 2.0, ok=True)
+    router.record("fast", 0.5, ok=True)
+    assert router.candidates("session") == ["new", "fast", "slow"]
+
+
+def test_call_with_fallback_tries_next_model(clock):
+    router = make_router()
+
+    def call(model):
+        if model == "a":
+            raise TimeoutError("lent")
+        return f"réponse de {model}"
+
+    assert call_with_fallback(router, "session", call) == ("réponse de b", "b")
+    assert router.stats()["a"]["error_rate"] == 1.0
+
+
+def test_no_fallback_reraises_the_cause_without_trying_next(clock):
+    router = make_router()
+    tried = []
+
+    def call(model):
+        tried.append(model)
+        try:
+            raise ValueError("flux coupé")
+        except ValueError as e:
+            raise NoFallback() from e
+
+    with pytest.raises(ValueError, match="flux coupé"):
+        call_with_fallback(router, "session", call)
+    assert tried == ["a"]
+
+
+class Interrupted(BaseException):
+    """Comme StopException / RerunException de Streamlit : hors de `Exception`."""
+
+
+def test_interrupted_trial_returns_the_slot(clock):
+    router = ModelRouter({"session": ["a"]}, max_consecutive_failures=3, open_sec=30.0)
+    for _ in range(3):
+        router.record("a", 0.1, ok=False)
+    clock.now += 30
+
+    def call(model):
+        raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        call_with_fallback(router, "session", call)
+    assert state(router, "a") == HALF_OPEN
+    assert router.candidates("session") == ["a"]   # nouvel essai possible
+
+
+def test_all_circuits_open_raises(clock):
+    router = make_router()
+    for model in ("a", "b"):
+        for _ in range(3):
+            router.record(model, 0.1, ok=False)
+    with pytest.raises(RuntimeError, match="Aucun modèle"):
+        call_with_fallback(router, "session", lambda model: "jamais appelé")
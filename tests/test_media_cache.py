@@ -0,0 +1,90 @@
+"""Cache des images d'exercices (coach/media_cache.py)."""
+
+import pytest
+
+from coach import media_cache
+from coach.media_cache import MediaCache
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_cache, "_thumbnail", lambda data, width: data)
+    return MediaCache(str(tmp_path / "media"), retry_sec=60)
+
+
+@pytest.fixture
+def image_url(tmp_path):
+    path = tmp_path / "squat.png"
+    path.write_bytes(PNG)
+    return path.as_uri()
+
+
+class Deferred:
+    """`submit` qui garde les tâches : le test décide quand elles tournent."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def __call__(self, fn, *args):
+        self.jobs.append((fn, args))
+
+    def run(self):
+        jobs, self.jobs = self.jobs, []
+        for fn, args in jobs:
+            fn(*args)
+
+
+def test_peek_miss_returns_none_and_fetches_once_in_background(cache, image_url):
+    submit = Deferred()
+    assert cache.peek(image_url, submit) is None
+    assert cache.peek(image_url, submit) is None
+    assert len(submit.jobs) == 1                     # un seul téléchargement par URL
+    submit.run()
+    path = cache.peek(image_url, submit)
+    assert path is not None and open(path, "rb").read() == PNG
+    assert submit.jobs == []
+    assert cache.stats()["hits"] == 1
+
+
+def test_failed_url_is_not_retried_before_retry_sec(cache, tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(media_cache.time, "time", lambda: now[0])
+    dead = (tmp_path / "absent.png").as_uri()
+    submit = Deferred()
+    cache.peek(dead, submit)
+    submit.run()
+    assert cache.stats()["errors"] == 1
+
+    assert cache.peek(dead, submit) is None
+    assert submit.jobs == []                         # échec récent : pas de nouvel essai
+    assert cache.get(dead) is None and cache.stats()["errors"] == 1
+    assert cache.stats()["skipped"] == 2
+
+    now[0] += 60
+    cache.peek(dead, submit)
+    assert len(submit.jobs) == 1
+
+
+def test_success_clears_the_failure(cache, tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(media_cache.time, "time", lambda: now[0])
+    path = tmp_path / "late.png"
+    url = path.as_uri()
+    assert cache.get(url) is None
+    path.write_bytes(PNG)
+    now[0] += 60
+    assert cache.get(url) is not None
+    now[0] += 1
+    assert cache.get(url) is not None                # servi par l'index, plus par la ligne d'échec
+
+
+def test_submit_failure_frees_the_url(cache, image_url):
+    def refuse(fn, *args):
+        raise RuntimeError("executor arrêté")
+
+    assert cache.peek(image_url, refuse) is None
+    submit = Deferred()
+    cache.peek(image_url, submit)
+    assert len(submit.jobs) == 1
@@ -0,0 +1,88 @@
+"""Parseur incrémental et réparation du JSON de séance (coach/streaming.py)."""
+
+import json
+
+import pytest
+
+from coach.streaming import StreamingPlanParser, close_truncated_json, repair_plan_json, strip_code_fences
+
+PLAN = {
+    "strategie": ["Séance de musculation progressive.", "Repos respectés."],
+    "seance": {
+        "echauffement": [{"id": 1, "sets": None, "reps": None, "duration_min": 3, "rest_sec": None, "instruction": "a"}],
+        "corps": [
+            {"id": 2, "sets": 3, "reps": "10", "duration_min": None, "rest_sec": 60, "instruction": "b"},
+            {"id": 3, "sets": 3, "reps": "12", "duration_min": None, "rest_sec": 60, "instruction": "c"},
+        ],
+        "retour_calme": [{"id": 4, "sets": None, "reps": None, "duration_min": 2, "rest_sec": None, "instruction": "d"}],
+    },
+    "mot_fin": "Bravo !",
+}
+TEXT = json.dumps(PLAN, ensure_ascii=False)
+
+
+def cut_after(marker: str, extra: int = 0) -> str:
+    return TEXT[: TEXT.index(marker) + len(marker) + extra]
+
+
+def test_valid_json_is_ok():
+    assert repair_plan_json(TEXT) == (PLAN, "ok")
+
+
+@pytest.mark.parametrize("wrapped", [f"```json\n{TEXT}\n```", f"```\n{TEXT}```", f"  ```json {TEXT} ```  "])
+def test_fenced_json_is_a_clean_parse(wrapped):
+    assert repair_plan_json(wrapped) == (PLAN, "ok")
+
+
+def test_strip_code_fences_leaves_plain_text():
+    assert strip_code_fences(TEXT) is TEXT
+    assert strip_code_fences("```json\n{\"a\": 1") == "{\"a\": 1"
+
+
+def test_truncated_in_main_block_keeps_complete_exercises():
+    plan, outcome = repair_plan_json(cut_after('"id": 3'))
+    assert outcome == "repaired"
+    assert [ex["id"] for ex in plan["seance"]["corps"]] == [2]
+    assert [ex["id"] for ex in plan["seance"]["echauffement"]] == [1]
+    assert "retour_calme" not in plan["seance"]
+    assert plan["strategie"] == PLAN["strategie"]
+
+
+def test_truncated_fenced_response_is_repaired():
+    plan, outcome = repair_plan_json("```json\n" + cut_after('"mot_fin"'))
+    assert outcome == "repaired"
+    assert len(plan["seance"]["corps"]) == 2 and len(plan["seance"]["retour_calme"]) == 1
+
+
+@pytest.mark.parametrize("text", [
+    cut_after('"corps": [', 5),          # échauffement seul : pas de corps de séance
+    cut_after('"echauffement": [', 20),  # aucun exercice complet
+    cut_after('"strategie"'),
+    "Désolé, je ne peux pas répondre.",
+    "",
+])
+def test_repair_without_main_block_is_rejected(text):
+    with pytest.raises(ValueError):
+        repair_plan_json(text)
+
+
+def test_list_shaped_session_counts_as_main_block():
+    text = json.dumps({"strategie": ["x"], "seance": [{"id": 1}, {"id": 2}, {"id": 3}]})[:-20]
+    plan, outcome = repair_plan_json(text)
+    assert outcome == "repaired" and plan["seance"]["corps"]
+
+
+def test_close_truncated_json_drops_incomplete_value():
+    assert json.loads(close_truncated_json('{"a": [1, 2], "b": "tron')) == {"a": [1, 2]}
+    assert json.loads(close_truncated_json('Voici : {"a": {"b": 1, "c"')) == {"a": {"b": 1}}
+
+
+def test_streaming_parser_emits_elements_as_they_complete():
+    parser = StreamingPlanParser()
+    events = []
+    for i in range(0, len(TEXT), 7):
+        events += parser.feed(TEXT[i:i + 7])
+    assert [kind for kind, _, _ in events] == ["strategie", "strategie"] + ["exercise"] * 4 + ["mot_fin"]
+    assert [(section, payload["id"]) for kind, section, payload in events if kind == "exercise"] == [
+        ("echauffement", 1), ("corps", 2), ("corps", 3), ("retour_calme", 4),
+    ]